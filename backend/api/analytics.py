@@ -0,0 +1,197 @@
+from datetime import date, timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import ProductBacklogItem, Task, TaskStatusTransition
+
+# Códigos compactos de status usados nos arrays
+NONE, TODO, IN_PROGRESS, DONE = -1, 0, 1, 2
+STATUS_CODES = {None: NONE, 'TODO': TODO, 'IN_PROGRESS': IN_PROGRESS, 'DONE': DONE}
+
+DAY = 86400
+EPOCH = date(1970, 1, 1)
+PERCENTILES = (50, 75, 85, 95)
+CACHE_TIMEOUT = 600
+
+
+def _percentiles(days):
+    if days.size == 0:
+        return {'count': 0, **{f'p{p}': None for p in PERCENTILES}}
+    values = np.percentile(days, PERCENTILES)
+    return {'count': int(days.size), **{f'p{p}': round(float(v), 2) for p, v in zip(PERCENTILES, values)}}
+
+
+def _cfd(first_day, last_day, moves):
+    """
+    moves: {coluna: (dias_de_entrada, dias_de_saida)}. Devolve a contagem no fim
+    de cada dia por coluna, com bincount + cumsum (sem laço por linha).
+    """
+    size = last_day - first_day + 1
+    counts = {}
+    for column, (enter, leave) in moves.items():
+        enter = np.clip(enter - first_day, 0, size - 1)
+        leave = np.clip(leave - first_day, 0, size - 1)
+        delta = np.bincount(enter, minlength=size) - np.bincount(leave, minlength=size)
+        counts[column] = np.cumsum(delta)
+    return counts
+
+
+def _series(first_day, last_day, counts, window):
+    start = max(first_day, last_day - window + 1)
+    series = []
+    for day in range(start, last_day + 1):
+        i = day - first_day
+        series.append({
+            'date': EPOCH + timedelta(days=day),
+            **{column: int(values[i]) for column, values in counts.items()},
+        })
+    return series
+
+
+def _load_transitions(project_id):
+    # Uma consulta; vira arrays colunares ordenados por (tarefa, instante)
+    rows = list(
+        TaskStatusTransition.objects.filter(project_id=project_id)
+        .order_by('task_id', 'changed_at', 'id')
+        .values_list('task_id', 'from_status', 'to_status', 'changed_at')
+    )
+    n = len(rows)
+    task = np.fromiter((r[0] for r in rows), np.int64, n)
+    frm = np.fromiter((STATUS_CODES[r[1]] for r in rows), np.int8, n)
+    to = np.fromiter((STATUS_CODES[r[2]] for r in rows), np.int8, n)
+    ts = np.fromiter((r[3].timestamp() for r in rows), np.float64, n)
+    return task, frm, to, ts
+
+
+def compute_project_analytics(project_id, window=90):
+    task, frm, to, ts = _load_transitions(project_id)
+    today = int(timezone.now().timestamp() // DAY)
+
+    items = list(ProductBacklogItem.objects.filter(project_id=project_id).values_list('id', 'created_at'))
+    item_ids = np.fromiter((i[0] for i in items), np.int64, len(items))
+    item_created = np.fromiter((i[1].timestamp() for i in items), np.float64, len(items))
+
+    live = list(Task.objects.filter(project_id=project_id).values_list('id', 'backlog_item_id', 'status'))
+    live_ids = np.fromiter((t[0] for t in live), np.int64, len(live))
+    live_item = np.fromiter((t[1] for t in live), np.int64, len(live))
+    live_status = np.fromiter((STATUS_CODES[t[2]] for t in live), np.int8, len(live))
+
+    first_day = today
+    if ts.size:
+        first_day = min(first_day, int(ts.min() // DAY))
+    if item_created.size:
+        first_day = min(first_day, int(item_created.min() // DAY))
+
+    result = {'tasks': _task_metrics(task, frm, to, ts, first_day, today, window)}
+    result['backlog_items'] = _item_metrics(
+        task, to, ts, item_ids, item_created, live_ids, live_item, live_status, first_day, today, window
+    )
+    return result
+
+
+def _segments(task):
+    # As linhas vêm agrupadas por tarefa: início e fim de cada grupo
+    if task.size == 0:
+        return task, task, task
+    ids, first = np.unique(task, return_index=True)
+    last = np.r_[first[1:] - 1, task.size - 1]
+    return ids, first, last
+
+
+def _task_metrics(task, frm, to, ts, first_day, today, window):
+    day = (ts // DAY).astype(np.int64)
+    moves = {
+        'todo': (day[to == TODO], day[frm == TODO]),
+        'in_progress': (day[to == IN_PROGRESS], day[frm == IN_PROGRESS]),
+        'done': (day[to == DONE], day[frm == DONE]),
+    }
+    counts = _cfd(first_day, today, moves)
+
+    ids, first, last = _segments(task)
+    if ids.size:
+        started = np.where((to == IN_PROGRESS) | (to == DONE), ts, np.inf)
+        start_ts = np.minimum.reduceat(started, first)
+        done = to[last] == DONE
+        lead = (ts[last] - ts[first])[done] / DAY
+        with_start = done & np.isfinite(start_ts)
+        cycle = (ts[last] - start_ts)[with_start] / DAY
+    else:
+        lead = cycle = np.empty(0)
+
+    cfd = _series(first_day, today, counts, window)
+    return {
+        'cfd': cfd,
+        'wip': [{'date': row['date'], 'count': row['in_progress']} for row in cfd],
+        'lead_time_days': _percentiles(lead),
+        'cycle_time_days': _percentiles(cycle),
+    }
+
+
+def _item_metrics(task, to, ts, item_ids, item_created, live_ids, live_item, live_status, first_day, today, window):
+    n_items = item_ids.size
+    start = np.full(n_items, np.inf)
+    finish = np.full(n_items, -np.inf)
+    done = np.zeros(n_items, dtype=bool)
+
+    if n_items and live_ids.size:
+        # item de cada tarefa viva (tarefas apagadas não contam para o item)
+        order = np.argsort(item_ids)
+        pos = order[np.searchsorted(item_ids, live_item, sorter=order)]
+        total = np.bincount(pos, minlength=n_items)
+        done_count = np.bincount(pos[live_status == DONE], minlength=n_items)
+        done = (total > 0) & (total == done_count)
+
+        ids, first, last = _segments(task)
+        if ids.size:
+            started = np.where((to == IN_PROGRESS) | (to == DONE), ts, np.inf)
+            task_start = np.minimum.reduceat(started, first)
+            task_end = ts[last]
+            # cruza o histórico com as tarefas vivas
+            live_order = np.argsort(live_ids)
+            idx = np.searchsorted(live_ids, ids, sorter=live_order)
+            idx = np.clip(idx, 0, live_ids.size - 1)
+            matched = live_ids[live_order[idx]] == ids
+            task_pos = pos[live_order[idx[matched]]]
+            np.minimum.at(start, task_pos, task_start[matched])
+            np.maximum.at(finish, task_pos, task_end[matched])
+
+    completed = done & np.isfinite(finish)
+    lead = (finish - item_created)[completed] / DAY
+    with_start = completed & np.isfinite(start)
+    cycle = (finish - start)[with_start] / DAY
+
+    created_day = (item_created // DAY).astype(np.int64)
+    start_day = (start[np.isfinite(start)] // DAY).astype(np.int64)
+    finish_day = (finish[completed] // DAY).astype(np.int64)
+    never = np.empty(0, dtype=np.int64)
+    counts = _cfd(first_day, today, {
+        'todo': (created_day, start_day),
+        'in_progress': (start_day, finish_day),
+        'done': (finish_day, never),
+    })
+
+    cfd = _series(first_day, today, counts, window)
+    return {
+        'cfd': cfd,
+        'wip': [{'date': row['date'], 'count': row['in_progress']} for row in cfd],
+        'lead_time_days': _percentiles(lead),
+        'cycle_time_days': _percentiles(cycle),
+    }
+
+
+def project_analytics(project_id, window=90):
+    """
+    Resultado em cache até chegar uma transição nova ou mudar o backlog;
+    a verificação custa duas consultas agregadas.
+    """
+    version = TaskStatusTransition.objects.filter(project_id=project_id).aggregate(last=Max('id'))['last']
+    backlog = ProductBacklogItem.objects.filter(project_id=project_id).aggregate(last=Max('id'), n=Count('id'))
+    key = f"analytics:{project_id}:{window}:{version}:{backlog['last']}:{backlog['n']}:{timezone.now().date()}"
+    result = cache.get(key)
+    if result is None:
+        result = compute_project_analytics(project_id, window)
+        cache.set(key, result, CACHE_TIMEOUT)
+    return result
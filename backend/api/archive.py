@@ -0,0 +1,186 @@
+import json
+import zlib
+from datetime import date
+from functools import lru_cache
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from .models import (
+    Project, ProjectArchive, UserStory, ProductBacklogItem, Sprint, SprintBurndown, SprintSnapshot,
+    Task, TaskStatusTransition
+)
+
+User = get_user_model()
+
+FORMAT_VERSION = 1
+
+# (chave no arquivo, model, filtro pelo projeto). Restaurar segue esta ordem;
+# apagar segue a ordem inversa, pra não disparar cascatas.
+ARCHIVED_MODELS = (
+    ('user_stories', UserStory, 'project_id'),
+    ('sprints', Sprint, 'project_id'),
+    ('sprint_snapshots', SprintSnapshot, 'project_id'),
+    ('backlog', ProductBacklogItem, 'project_id'),
+    ('tasks', Task, 'project_id'),
+    ('task_transitions', TaskStatusTransition, 'project_id'),
+    ('sprint_burndown', SprintBurndown, 'sprint__project_id'),
+)
+
+# FKs para usuário que viram null se o usuário tiver sido apagado depois do arquivamento
+USER_FIELDS = ('created_by_id', 'assigned_to_id')
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def _encode(value):
+    # isoformat completo: o DjangoJSONEncoder corta os microssegundos
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Tipo não suportado no arquivo: {type(value).__name__}")
+
+
+def archive_project(project):
+    """
+    Serializa histórias, sprints, itens e tarefas do projeto num blob
+    compactado e remove essas linhas das tabelas vivas. Membros continuam
+    ativos para o controle de acesso às leituras do arquivo.
+    """
+    if project.status != Project.Status.CONCLUDED:
+        raise ArchiveError("Apenas projetos encerrados podem ser arquivados.")
+    if project.archived_at:
+        raise ArchiveError("Este projeto já está arquivado.")
+
+    with transaction.atomic():
+        data = {}
+        row_count = 0
+        for key, model, lookup in ARCHIVED_MODELS:
+            rows = list(model.objects.filter(**{lookup: project.id}).order_by('id').values())
+            data[key] = rows
+            row_count += len(rows)
+
+        payload = zlib.compress(json.dumps(data, default=_encode).encode(), 9)
+        archive = ProjectArchive.objects.create(
+            project=project,
+            format_version=FORMAT_VERSION,
+            payload=payload,
+            row_count=row_count,
+        )
+
+        for key, model, lookup in reversed(ARCHIVED_MODELS):
+            model.objects.filter(**{lookup: project.id}).delete()
+
+        project.archived_at = timezone.now()
+        project.save(update_fields=['archived_at'])
+    return archive
+
+
+@lru_cache(maxsize=16)
+def _decode(archive_id, created_at):
+    # arquivos são imutáveis (restaurar apaga o registro); created_at entra na
+    # chave só pra um id reaproveitado depois de um rollback não pegar cache velho
+    payload = ProjectArchive.objects.values_list('payload', flat=True).get(pk=archive_id)
+    data = json.loads(zlib.decompress(bytes(payload)))
+    decoded = {}
+    for key, model, _ in ARCHIVED_MODELS:
+        fields = {f.attname: f for f in model._meta.concrete_fields}
+        decoded[key] = tuple(
+            {name: fields[name].to_python(value) for name, value in row.items() if name in fields}
+            for row in data[key]
+        )
+    return decoded
+
+
+def load_rows(archive):
+    return _decode(archive.pk, archive.created_at)
+
+
+def get_archive(project):
+    """Registro do arquivo sem carregar o payload (o payload só é lido no cache)."""
+    return ProjectArchive.objects.only('id', 'project_id', 'created_at').filter(project=project).first()
+
+
+class ArchivedGraph:
+    """
+    Instâncias (não salvas) montadas a partir do arquivo, com as relações já
+    ligadas em memória. Os serializers usam isso sem tocar nas tabelas vivas.
+    """
+
+    def __init__(self, archive):
+        rows = load_rows(archive)
+        user_ids = {
+            row[name] for key in rows for row in rows[key] for name in USER_FIELDS if row.get(name)
+        }
+        users = User.objects.in_bulk(user_ids)
+
+        def build(model, row):
+            obj = model(**row)
+            if 'created_by_id' in row:
+                obj.created_by = users.get(row['created_by_id'])
+            return obj
+
+        self.user_stories = [build(UserStory, row) for row in rows['user_stories']]
+        self.sprints = [build(Sprint, row) for row in rows['sprints']]
+        stories = {story.id: story for story in self.user_stories}
+
+        self.backlog = []
+        for row in rows['backlog']:
+            item = build(ProductBacklogItem, row)
+            item.user_story = stories.get(row['user_story_id'])
+            self.backlog.append(item)
+        items = {item.id: item for item in self.backlog}
+
+        self.tasks = []
+        for row in rows['tasks']:
+            task = build(Task, row)
+            task.backlog_item = items.get(row['backlog_item_id'])
+            task.assigned_to = users.get(row['assigned_to_id'])
+            self.tasks.append(task)
+
+
+def restore_project(project):
+    """
+    Recria as linhas arquivadas com os ids originais e apaga o arquivo.
+    """
+    archive = get_archive(project)
+    if archive is None:
+        raise ArchiveError("Este projeto não está arquivado.")
+
+    rows = load_rows(archive)
+    user_ids = {row[name] for key in rows for row in rows[key] for name in USER_FIELDS if row.get(name)}
+    existing_users = set(User.objects.filter(id__in=user_ids).values_list('id', flat=True))
+
+    with transaction.atomic():
+        for key, model, _ in ARCHIVED_MODELS:
+            objs = []
+            has_project = any(f.attname == 'project_id' for f in model._meta.concrete_fields)
+            for row in rows[key]:
+                row = dict(row)
+                if has_project:
+                    # arquivos antigos não tinham Task.project
+                    row.setdefault('project_id', project.id)
+                for name in USER_FIELDS:
+                    if row.get(name) and row[name] not in existing_users:
+                        row[name] = None
+                objs.append(model(**row))
+            # bulk_create preenche auto_now/auto_now_add com "agora"; devolve as datas originais
+            stamped = [
+                f.attname for f in model._meta.concrete_fields
+                if getattr(f, 'auto_now', False) or getattr(f, 'auto_now_add', False)
+            ]
+            original = [[getattr(obj, name) for name in stamped] for obj in objs]
+            model.objects.bulk_create(objs)
+            if stamped and objs:
+                for obj, values in zip(objs, original):
+                    for name, value in zip(stamped, values):
+                        # arquivos antigos não têm updated_at: fica o "agora" do bulk_create
+                        if value is not None:
+                            setattr(obj, name, value)
+                model.objects.bulk_update(objs, stamped, batch_size=500)
+
+        archive.delete()
+        project.archived_at = None
+        project.save(update_fields=['archived_at'])
@@ -0,0 +1,200 @@
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import F
+from rest_framework import permissions
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import ProjectMembership
+
+User = get_user_model()
+
+TOKEN_VERSION_CLAIM = 'tv'
+ROLES_CLAIM = 'roles'
+# campos do usuário que vão assinados no token; o resto fica adiado no request.user
+CLAIM_FIELDS = ('username', 'is_superuser', 'is_staff')
+
+
+class UserCache:
+    """
+    Usuários completos por AUTH_USER_CACHE_TIMEOUT segundos, por processo.
+    Quem recebe um usuário do cache recebe uma cópia (pode alterar à vontade).
+    """
+
+    def __init__(self):
+        self._users = {}
+        self._lock = threading.Lock()
+
+    def peek(self, user_id):
+        """Usuário em cache e ainda válido, ou None (nunca consulta o banco)."""
+        entry = self._users.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return copy.copy(entry[1])
+
+    def get(self, user_id):
+        user = self.peek(user_id)
+        if user is None:
+            user = User.objects.filter(pk=user_id).first()
+            if user is not None:
+                self.set(user)
+        return user
+
+    def set(self, user):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._users) >= settings.AUTH_USER_CACHE_MAX_ENTRIES:
+                self._users = {pk: entry for pk, entry in self._users.items() if entry[0] >= now}
+                if len(self._users) >= settings.AUTH_USER_CACHE_MAX_ENTRIES:
+                    self._users.clear()
+            self._users[user.pk] = (now + settings.AUTH_USER_CACHE_TIMEOUT, copy.copy(user))
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+
+user_cache = UserCache()
+
+
+def user_claims(user):
+    claims = {name: getattr(user, name) for name in CLAIM_FIELDS}
+    claims[TOKEN_VERSION_CLAIM] = user.token_version
+    if settings.JWT_PROJECT_ROLES_CLAIM:
+        # informativo para o front; a API continua conferindo a membership no banco
+        claims[ROLES_CLAIM] = {
+            str(project_id): role
+            for project_id, role in ProjectMembership.objects.filter(user=user).values_list('project_id', 'role')
+        }
+    return claims
+
+
+def revoke_tokens(user):
+    """
+    Invalida todos os tokens já emitidos para o usuário (logout em todos os
+    dispositivos). Também é o passo final para desativar alguém: salve
+    is_active=False e chame revoke_tokens.
+    """
+    User.objects.filter(pk=user.pk).update(token_version=F('token_version') + 1)
+    # o usuário recarregado (versão nova) fica no cache em vez de sair dele:
+    # as leituras deste processo conferem o token contra ele na hora
+    user = User.objects.get(pk=user.pk)
+    user_cache.set(user)
+    return user
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """Refresh (e o access derivado dele) com os claims de user_claims."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim, value in user_claims(user).items():
+            token[claim] = value
+        return token
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = ClaimsRefreshToken
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Confere no banco se o refresh não foi revogado e emite o access com os
+    claims atuais do usuário (username, is_staff... podem ter mudado).
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.filter(pk=refresh.payload.get(api_settings.USER_ID_CLAIM)).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+        if refresh.payload.get(TOKEN_VERSION_CLAIM, 0) != user.token_version:
+            raise AuthenticationFailed("Token revogado. Faça login novamente.", 'token_revoked')
+        user_cache.set(user)
+
+        for claim, value in user_claims(user).items():
+            refresh[claim] = value
+        data = {'access': str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data['refresh'] = str(refresh)
+        return data
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT sem consultar o usuário a cada requisição: leituras confiam nos
+    claims assinados e request.user é um User montado deles (serve em filtros
+    e FKs; os outros campos ficam adiados e, se lidos, vêm do banco). Quem
+    precisa da linha completa usa user_cache.get(request.user.pk).
+
+    Escritas recebem o usuário completo do user_cache (no máximo uma consulta
+    a cada AUTH_USER_CACHE_TIMEOUT segundos) e conferem User.token_version e
+    is_active: revoke_tokens derruba os tokens nas escritas e no refresh na
+    hora, e nas leituras do processo que revogou (e dos que têm o usuário em
+    cache). Nos outros processos as leituras só param quando o access
+    expira: por isso ACCESS_TOKEN_LIFETIME fica curto (5 minutos).
+    """
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is None or request.method in permissions.SAFE_METHODS:
+            return result
+
+        claims_user, token = result
+        user = user_cache.get(claims_user.pk)
+        self.check_current(user, token)
+        return user, token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = int(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, ValueError) as e:
+            raise InvalidToken("O token não identifica o usuário.") from e
+
+        if TOKEN_VERSION_CLAIM not in validated_token:
+            # token emitido antes dos claims: caminho antigo, com consulta
+            user = super().get_user(validated_token)
+            self.check_current(user, validated_token)
+            return user
+
+        cached = user_cache.peek(user_id)
+        if cached is not None:
+            self.check_current(cached, validated_token)
+
+        values = {
+            'id': user_id,
+            # tokens só são emitidos para usuários ativos; a desativação vale
+            # pelo cache acima ou quando o access expira
+            'is_active': True,
+            'token_version': validated_token[TOKEN_VERSION_CLAIM],
+            **{name: validated_token.get(name) for name in CLAIM_FIELDS},
+        }
+        fields = [f.attname for f in User._meta.concrete_fields if f.attname in values]
+        user = User.from_db(DEFAULT_DB_ALIAS, fields, [values[name] for name in fields])
+        user.token_roles = validated_token.get(ROLES_CLAIM)
+        return user
+
+    def check_current(self, user, token):
+        if user is None:
+            raise AuthenticationFailed("Usuário não encontrado.", code='user_not_found')
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed("Usuário inativo.", code='user_inactive')
+        if token.get(TOKEN_VERSION_CLAIM, 0) != user.token_version:
+            raise AuthenticationFailed("Token revogado. Faça login novamente.", code='token_revoked')
@@ -0,0 +1,108 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import counters
+from .models import SprintBurndown, TaskStatusTransition
+
+STATUS_COLUMNS = {'TODO': 'todo', 'IN_PROGRESS': 'in_progress', 'DONE': 'done'}
+
+
+def transition(task, project_id, from_status, to_status, user=None):
+    return TaskStatusTransition(
+        task_id=task.id,
+        project_id=project_id,
+        sprint_id=task.sprint_id,
+        from_status=from_status,
+        to_status=to_status,
+        changed_by=user if user is not None and user.is_authenticated else None,
+    )
+
+
+def record_transitions(transitions):
+    """
+    Grava as transições (um único INSERT) e aplica os deltas no burndown de
+    cada sprint/dia afetado. O custo depende de quantos dias/sprints mudaram,
+    não de quantas tarefas a sprint tem.
+
+    É o ponto único de mudança de status das tarefas, então também atualiza
+    os contadores open/done de projeto e sprint.
+    """
+    transitions = [t for t in transitions if t.from_status != t.to_status]
+    if not transitions:
+        return
+
+    deltas = defaultdict(lambda: defaultdict(int))
+    for t in transitions:
+        day = timezone.localdate(t.changed_at)
+        if t.from_status:
+            deltas[(t.sprint_id, day)][STATUS_COLUMNS[t.from_status]] -= 1
+        if t.to_status:
+            deltas[(t.sprint_id, day)][STATUS_COLUMNS[t.to_status]] += 1
+
+    with transaction.atomic():
+        TaskStatusTransition.objects.bulk_create(transitions)
+        counters.apply_task_transitions(transitions)
+        for (sprint_id, day), delta in deltas.items():
+            changes = {column: F(column) + value for column, value in delta.items() if value}
+            if not changes:
+                continue
+            _ensure_day(sprint_id, day)
+            # dias seguintes (se houver) também carregam a mudança
+            SprintBurndown.objects.filter(sprint_id=sprint_id, day__gte=day).update(**changes)
+
+
+def _ensure_day(sprint_id, day):
+    if SprintBurndown.objects.filter(sprint_id=sprint_id, day=day).exists():
+        return
+    # O dia começa com a contagem do último dia registrado antes dele
+    previous = SprintBurndown.objects.filter(sprint_id=sprint_id, day__lt=day).order_by('-day').first()
+    try:
+        with transaction.atomic():
+            SprintBurndown.objects.create(
+                sprint_id=sprint_id,
+                day=day,
+                todo=previous.todo if previous else 0,
+                in_progress=previous.in_progress if previous else 0,
+                done=previous.done if previous else 0,
+            )
+    except IntegrityError:
+        pass  # outra requisição criou o mesmo dia antes
+
+
+def record_deleted_tasks(tasks, project_id, user=None):
+    """
+    Registra a saída das tarefas que vão ser apagadas em cascata (item,
+    história...). Deve ser chamado antes do delete.
+    """
+    record_transitions([
+        transition(task, project_id, task.status, None, user)
+        for task in tasks.only('id', 'sprint_id', 'status')
+    ])
+
+
+def burndown_series(sprint):
+    """
+    Série diária de start_date até end_date (ou hoje, o que vier antes),
+    repetindo a contagem do último dia registrado nos dias sem mudanças.
+    """
+    end = min(sprint.end_date, timezone.localdate())
+    rows = SprintBurndown.objects.filter(sprint=sprint, day__lte=end).order_by('day').values(
+        'day', 'todo', 'in_progress', 'done'
+    )
+
+    current = {'todo': 0, 'in_progress': 0, 'done': 0}
+    series = []
+    day = sprint.start_date
+    for row in rows:
+        while day < row['day']:
+            series.append({'date': day, **current, 'remaining': current['todo'] + current['in_progress']})
+            day += timedelta(days=1)
+        current = {'todo': row['todo'], 'in_progress': row['in_progress'], 'done': row['done']}
+    while day <= end:
+        series.append({'date': day, **current, 'remaining': current['todo'] + current['in_progress']})
+        day += timedelta(days=1)
+    return series
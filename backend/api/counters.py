@@ -0,0 +1,129 @@
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, Q
+
+from .models import Project, ProjectMembership, ProductBacklogItem, Sprint, Task
+
+OPEN_STATUSES = ('TODO', 'IN_PROGRESS')
+
+PROJECT_COUNTERS = Project.COUNTER_FIELDS
+SPRINT_COUNTERS = Sprint.COUNTER_FIELDS
+
+
+def _bucket(task_status):
+    if task_status in OPEN_STATUSES:
+        return 'open_task_count'
+    if task_status == 'DONE':
+        return 'done_task_count'
+    return None
+
+
+def _apply(model, deltas):
+    # Um UPDATE com F() por linha alterada; nada de ler-e-regravar
+    for pk, changes in deltas.items():
+        changes = {name: F(name) + value for name, value in changes.items() if value}
+        if changes:
+            model.objects.filter(pk=pk).update(**changes)
+
+
+def apply_task_transitions(transitions):
+    """
+    Ajusta open/done de projeto e sprint a partir das transições de status
+    (criação, mudança e exclusão) já gravadas por record_transitions.
+    """
+    projects = defaultdict(Counter)
+    sprints = defaultdict(Counter)
+    for t in transitions:
+        for task_status, sign in ((t.from_status, -1), (t.to_status, 1)):
+            bucket = _bucket(task_status)
+            if bucket:
+                projects[t.project_id][bucket] += sign
+                sprints[t.sprint_id][bucket] += sign
+    _apply(Project, projects)
+    _apply(Sprint, sprints)
+
+
+def items_added(project_id, count, sprint_counts=None):
+    """Itens de backlog criados (sprint_counts: {sprint_id: quantos desses já vêm numa sprint})."""
+    _apply(Project, {project_id: {'backlog_count': count}})
+    _apply(Sprint, {sprint_id: {'item_count': n} for sprint_id, n in (sprint_counts or {}).items() if sprint_id})
+
+
+def items_removed(project_id, count, sprint_counts=None):
+    items_added(project_id, -count, {sprint_id: -n for sprint_id, n in (sprint_counts or {}).items()})
+
+
+def item_moved(old_sprint_id, new_sprint_id, count=1):
+    if old_sprint_id == new_sprint_id:
+        return
+    _apply(Sprint, {
+        **({old_sprint_id: {'item_count': -count}} if old_sprint_id else {}),
+        **({new_sprint_id: {'item_count': count}} if new_sprint_id else {}),
+    })
+
+
+def sprint_removed(sprint):
+    """As tarefas da sprint saem em cascata: desconta do projeto usando os próprios contadores da sprint."""
+    _apply(Project, {sprint.project_id: {
+        'open_task_count': -sprint.open_task_count,
+        'done_task_count': -sprint.done_task_count,
+    }})
+
+
+def members_changed(project_id, delta):
+    _apply(Project, {project_id: {'member_count': delta}})
+
+
+def actual_counters(project_ids):
+    """
+    Contagens reais (consultas agrupadas) para os projetos e suas sprints:
+    ({project_id: {...}}, {sprint_id: {...}}).
+    """
+    projects = {pk: dict.fromkeys(PROJECT_COUNTERS, 0) for pk in project_ids}
+    sprints = {
+        pk: dict.fromkeys(SPRINT_COUNTERS, 0)
+        for pk in Sprint.objects.filter(project_id__in=project_ids).values_list('id', flat=True)
+    }
+
+    for row in ProductBacklogItem.objects.filter(project_id__in=project_ids).values('project_id').annotate(n=Count('id')).order_by():
+        projects[row['project_id']]['backlog_count'] = row['n']
+    for row in ProjectMembership.objects.filter(project_id__in=project_ids).values('project_id').annotate(n=Count('id')).order_by():
+        projects[row['project_id']]['member_count'] = row['n']
+    for row in ProductBacklogItem.objects.filter(sprint_id__in=sprints.keys()).values('sprint_id').annotate(n=Count('id')).order_by():
+        sprints[row['sprint_id']]['item_count'] = row['n']
+
+    tasks = Task.objects.filter(project_id__in=project_ids).values('sprint_id', 'project_id').annotate(
+        open=Count('id', filter=Q(status__in=OPEN_STATUSES)),
+        done=Count('id', filter=Q(status='DONE')),
+    ).order_by()
+    for row in tasks:
+        for target in (projects[row['project_id']], sprints[row['sprint_id']]):
+            target['open_task_count'] += row['open']
+            target['done_task_count'] += row['done']
+    return projects, sprints
+
+
+def reconcile(project_ids, fix=False):
+    """
+    Compara os contadores gravados com as contagens reais. Devolve a lista de
+    divergências [(model, pk, campo, gravado, real)] e corrige se fix=True.
+    """
+    actual_projects, actual_sprints = actual_counters(project_ids)
+    drift = []
+    for model, actual, fields in (
+        (Project, actual_projects, PROJECT_COUNTERS),
+        (Sprint, actual_sprints, SPRINT_COUNTERS),
+    ):
+        stored = model.objects.filter(pk__in=actual.keys()).values('pk', *fields)
+        for row in stored:
+            wrong = {f: actual[row['pk']][f] for f in fields if row[f] != actual[row['pk']][f]}
+            for field, value in wrong.items():
+                drift.append((model.__name__, row['pk'], field, row[field], value))
+            if fix and wrong:
+                model.objects.filter(pk=row['pk']).update(**wrong)
+    return drift
+
+
+def refresh(project_id):
+    """Recalcula os contadores de um projeto e das suas sprints (depois de exclusões em cascata)."""
+    reconcile([project_id], fix=True)
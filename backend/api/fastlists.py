@@ -0,0 +1,165 @@
+import zlib
+from functools import lru_cache
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+
+from .fragments import fragment_cache
+
+# Campos cujo to_representation devolve o próprio valor vindo do banco
+PLAIN_FIELDS = (
+    serializers.CharField, serializers.IntegerField, serializers.BooleanField,
+    serializers.ChoiceField, serializers.PrimaryKeyRelatedField,
+)
+# pk__in das buscas de fragmentos que faltam
+FETCH_BATCH_SIZE = 500
+
+
+class _Level:
+    """
+    Um serializer do plano (o da lista ou um aninhado). entries tem, na ordem
+    dos campos, (nome, índice da coluna, conversão, sub-nível); índice None
+    marca campo que vem do fragmento em cache.
+
+    Modelos com updated_at são "em cache": a consulta principal traz só pk e
+    updated_at deles, e os campos próprios (texto, datas...) saem do
+    fragment_cache ou de uma busca só das linhas que faltam. FKs e relações
+    aninhadas continuam na consulta principal: um UPDATE em massa (sprint de
+    um item) ou um SET_NULL não mudam o updated_at e não podem ficar velhos.
+    """
+
+    def __init__(self, serializer, prefix, columns, levels, pk_index=None):
+        model = serializer.Meta.model
+        self.cached = any(f.name == 'updated_at' for f in model._meta.concrete_fields)
+        self.entries = []
+        self.own = []
+        if self.cached:
+            self.model = model
+            if pk_index is None:
+                columns.append(prefix + 'pk')
+                pk_index = len(columns) - 1
+            columns.append(prefix + 'updated_at')
+            self.pk_index, self.version_index = pk_index, len(columns) - 1
+
+        for field in serializer._readable_fields:
+            source = field.source
+            if source == '*' or '.' in source or isinstance(field, (
+                serializers.ListSerializer, serializers.ManyRelatedField, serializers.SerializerMethodField
+            )):
+                raise ImproperlyConfigured(
+                    f"{type(serializer).__name__}.{field.field_name} não pode ser montado a partir de values()"
+                )
+
+            convert = None if isinstance(field, PLAIN_FIELDS) else field.to_representation
+            if self.cached and not isinstance(field, (serializers.BaseSerializer, serializers.PrimaryKeyRelatedField)):
+                self.own.append((field.field_name, source, convert))
+                self.entries.append((field.field_name, None, None, None))
+                continue
+
+            columns.append(prefix + source)
+            index = len(columns) - 1
+            if isinstance(field, serializers.BaseSerializer):
+                nested = _Level(field, f"{prefix}{source}__", columns, levels, pk_index=index)
+                self.entries.append((field.field_name, index, None, nested))
+            else:
+                self.entries.append((field.field_name, index, convert, None))
+
+        if self.cached:
+            # a versão do serializer muda junto com os campos do fragmento
+            shape = repr([(name, source, type(serializer.fields[name]).__name__) for name, source, _ in self.own])
+            self.label = f"{type(serializer).__qualname__}:{zlib.crc32(shape.encode()):08x}"
+            levels.append(self)
+
+    def fetch(self, pks):
+        """Fragmentos das linhas que não estavam no cache (e guarda no cache)."""
+        lookups = [source for _, source, _ in self.own]
+        fetched, fresh = {}, {}
+        for start in range(0, len(pks), FETCH_BATCH_SIZE):
+            rows = self.model.objects.filter(pk__in=pks[start:start + FETCH_BATCH_SIZE]).values_list(
+                'pk', 'updated_at', *lookups
+            )
+            for pk, version, *values in rows:
+                fragment = {
+                    name: value if value is None or convert is None else convert(value)
+                    for (name, _, convert), value in zip(self.own, values)
+                }
+                fetched[pk] = fresh[(self.label, pk, version)] = fragment
+        fragment_cache.set_many(fresh)
+        return fetched
+
+
+@lru_cache(maxsize=None)
+def list_plan(serializer_class):
+    """Colunas, nível raiz e níveis em cache de um serializer, calculados uma vez por classe."""
+    columns, levels = [], []
+    root = _Level(serializer_class(), '', columns, levels)
+    return tuple(columns), root, levels
+
+
+def _resolve(levels, rows):
+    # {nível: {pk: fragmento}}: uma consulta por nível, só se faltar algo no cache
+    resolved = {}
+    for level in levels:
+        keys = {
+            row[level.pk_index]: (level.label, row[level.pk_index], row[level.version_index])
+            for row in rows if row[level.pk_index] is not None
+        }
+        found = fragment_cache.get_many(list(keys.values()))
+        fragments = {pk: found[key] for pk, key in keys.items() if key in found}
+        missing = [pk for pk in keys if pk not in fragments]
+        if missing:
+            fragments.update(level.fetch(missing))
+        resolved[level] = fragments
+    return resolved
+
+
+def _build(level, row, resolved):
+    # linha apagada entre as duas consultas: campos próprios ficam None
+    own = resolved[level].get(row[level.pk_index], {}) if level.cached else None
+    obj = {}
+    for name, index, convert, nested in level.entries:
+        if index is None:
+            obj[name] = own.get(name)
+            continue
+        value = row[index]
+        if value is None:
+            obj[name] = None
+        elif nested is not None:
+            obj[name] = _build(nested, row, resolved)
+        elif convert is not None:
+            obj[name] = convert(value)
+        else:
+            obj[name] = value
+    return obj
+
+
+def serialize_values(queryset, serializer_class):
+    """
+    Mesma saída de serializer_class(queryset, many=True).data, montada direto
+    das tuplas de um único values_list (com os JOINs das relações aninhadas),
+    sem instanciar modelo nem serializer por linha. Histórias e itens saem
+    do cache de fragmentos (api/fragments.py) quando não mudaram.
+    """
+    columns, root, levels = list_plan(serializer_class)
+    rows = list(queryset.values_list(*columns))
+    resolved = _resolve(levels, rows)
+    return [_build(root, row, resolved) for row in rows]
+
+
+def iter_values(queryset, serializer_class, chunk_size):
+    """
+    Como serialize_values, mas em lotes de chunk_size dicts lidos de um
+    iterator() (cursor no servidor): a memória fica no tamanho do lote, não
+    do resultado.
+    """
+    columns, root, levels = list_plan(serializer_class)
+    batch = []
+    for row in queryset.values_list(*columns).iterator(chunk_size=chunk_size):
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            resolved = _resolve(levels, batch)
+            yield [_build(root, row, resolved) for row in batch]
+            batch = []
+    if batch:
+        resolved = _resolve(levels, batch)
+        yield [_build(root, row, resolved) for row in batch]
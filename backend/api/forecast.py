@@ -0,0 +1,96 @@
+import math
+import zlib
+from datetime import timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import ProductBacklogItem, SprintSnapshot
+
+PERCENTILES = (50, 85, 95)
+BATCH_SIZE = 5000
+MAX_HORIZON = 1000
+CACHE_TIMEOUT = 24 * 60 * 60
+
+
+class ForecastError(Exception):
+    pass
+
+
+def simulate_sprints_needed(throughput, remaining, simulations, rng):
+    """
+    Quantas sprints cada simulação leva para entregar `remaining` itens,
+    sorteando (com reposição) a vazão das sprints passadas. Roda em lotes de
+    BATCH_SIZE simulações pra memória não crescer com o número de simulações.
+    Simulações que não terminam dentro do horizonte contam como o horizonte.
+    """
+    throughput = np.asarray(throughput, dtype=np.int32)
+    horizon = min(MAX_HORIZON, math.ceil(3 * remaining / throughput.mean()) + 5)
+
+    results = np.empty(simulations, dtype=np.int32)
+    for start in range(0, simulations, BATCH_SIZE):
+        size = min(BATCH_SIZE, simulations - start)
+        draws = rng.choice(throughput, size=(size, horizon))
+        reached = np.cumsum(draws, axis=1, dtype=np.int64) >= remaining
+        needed = reached.argmax(axis=1) + 1
+        needed[~reached[:, -1]] = horizon
+        results[start:start + size] = needed
+    return results
+
+
+def forecast_backlog(project, priorities=None, simulations=10000):
+    """
+    Previsão Monte Carlo de quando o backlog restante (ou só as prioridades
+    pedidas) termina, usando os itens entregues por sprint dos SprintSnapshots.
+    O resultado fica em cache até o histórico de sprints ou o backlog mudar.
+    """
+    snapshots = list(
+        SprintSnapshot.objects.filter(project=project).order_by('closed_at')
+        .values('id', 'items_done', 'done_item_ids', 'start_date', 'end_date')
+    )
+    if not snapshots:
+        raise ForecastError("O projeto ainda não tem sprints encerradas para basear a previsão.")
+
+    throughput = [s['items_done'] for s in snapshots]
+    if not any(throughput):
+        raise ForecastError("Nenhuma sprint encerrada entregou itens; não há vazão para simular.")
+
+    delivered = {item_id for s in snapshots for item_id in s['done_item_ids']}
+    backlog = ProductBacklogItem.objects.filter(project=project)
+    if priorities:
+        backlog = backlog.filter(priority__in=priorities)
+    remaining = backlog.exclude(id__in=delivered).count()
+
+    history_key = f"{len(snapshots)}:{snapshots[-1]['id']}"
+    key = f"forecast:{project.id}:{history_key}:{','.join(sorted(priorities or []))}:{remaining}:{simulations}"
+    result = cache.get(key)
+    if result is not None:
+        return result
+
+    lengths = [(s['end_date'] - s['start_date']).days + 1 for s in snapshots]
+    sprint_length = int(np.median(lengths))
+    start = max(snapshots[-1]['end_date'], timezone.localdate())
+
+    forecast = []
+    if remaining:
+        rng = np.random.default_rng(zlib.crc32(key.encode()))
+        needed = simulate_sprints_needed(throughput, remaining, simulations, rng)
+        for p in PERCENTILES:
+            sprints = int(np.ceil(np.percentile(needed, p)))
+            forecast.append({
+                'percentile': p,
+                'sprints': sprints,
+                'date': start + timedelta(days=sprints * sprint_length),
+            })
+
+    result = {
+        'remaining_items': remaining,
+        'history_sprints': len(snapshots),
+        'average_throughput': round(sum(throughput) / len(throughput), 2),
+        'sprint_length_days': sprint_length,
+        'simulations': simulations,
+        'forecast': forecast,
+    }
+    cache.set(key, result, CACHE_TIMEOUT)
+    return result
@@ -0,0 +1,63 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class FragmentCache:
+    """
+    LRU em memória (por processo) dos fragmentos serializados das linhas:
+    chave (serializer + versão, pk, updated_at) -> dict dos campos próprios.
+    Linha alterada ganha outro updated_at, então nunca há invalidação: a
+    versão antiga só deixa de ser lida e sai pelo fim da fila. O tamanho
+    máximo é FRAGMENT_CACHE_MAX_ENTRIES (0 desliga o cache).
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get_many(self, keys):
+        found = {}
+        with self._lock:
+            for key in keys:
+                value = self._entries.get(key)
+                if value is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = value
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, fragments):
+        limit = settings.FRAGMENT_CACHE_MAX_ENTRIES
+        if limit <= 0:
+            return
+        with self._lock:
+            self._entries.update(fragments)
+            for key in fragments:
+                self._entries.move_to_end(key)
+            while len(self._entries) > limit:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': settings.FRAGMENT_CACHE_MAX_ENTRIES,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+fragment_cache = FragmentCache()
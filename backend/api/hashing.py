@@ -0,0 +1,13 @@
+from django.utils.module_loading import import_string
+
+
+def hash_chunk(hasher_path, passwords):
+    """
+    Hasheia um pedaço das senhas no processo filho do provisionamento.
+
+    Este módulo não importa modelos nem chama get_user_model(): com spawn
+    (macOS) ou forkserver (padrão do Linux a partir do Python 3.14) o filho
+    importa só isto, sem django.setup(). O hasher não lê settings ao gerar o hash.
+    """
+    hasher = import_string(hasher_path)()
+    return [hasher.encode(password, hasher.salt()) for password in passwords]
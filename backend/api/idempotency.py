@@ -0,0 +1,130 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.uploadedfile import UploadedFile
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+# Trava da primeira execução; só precisa durar o tempo de uma requisição
+LOCK_TIMEOUT = 60
+
+
+class IdempotencyConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Uma requisição com esta Idempotency-Key ainda está em andamento."
+    default_code = 'idempotency_in_progress'
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "Esta Idempotency-Key já foi usada em outra requisição."
+    default_code = 'idempotency_key_reused'
+
+
+class _Replay(Exception):
+    def __init__(self, stored):
+        self.stored = stored
+
+
+def _file_digest(upload):
+    # O repr de um arquivo enviado só mostra o nome: entra o conteúdo
+    digest = hashlib.sha256()
+    for chunk in upload.chunks():
+        digest.update(chunk)
+    upload.seek(0)
+    return (upload.name, upload.size, digest.hexdigest())
+
+
+def _fingerprint(request):
+    # Mesma chave só vale para o mesmo método, caminho e corpo
+    digest = hashlib.sha256(f"{request.method} {request.get_full_path()} ".encode())
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = sorted(
+            (field, [_file_digest(value) if isinstance(value, UploadedFile) else value for value in values])
+            for field, values in data.lists()
+        )
+    digest.update(repr(data).encode())
+    return digest.hexdigest()
+
+
+class IdempotencyMixin:
+    """
+    POST com o cabeçalho Idempotency-Key: a primeira resposta de sucesso
+    fica guardada por (usuário, chave) no cache IDEMPOTENCY_CACHE (com
+    tamanho máximo e expiração) e as repetições recebem a mesma resposta, com
+    Idempotent-Replayed: true, sem rodar validação nem tocar nas tabelas.
+
+    A busca acontece antes do resto do initial (papéis, projeto arquivado):
+    só autentica o usuário. Enquanto a primeira execução não termina, as
+    repetições recebem 409. Reusar a chave com outro caminho ou corpo dá 422.
+    Erros não são guardados: a repetição roda de novo.
+
+    Com idempotency_anonymous, requisições sem usuário (cadastro) também
+    valem, todas no escopo 'anon': só repete quem manda o mesmo corpo.
+    """
+
+    idempotency_key = None
+    idempotency_anonymous = False
+
+    def initial(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        authenticated = request.user.is_authenticated
+        if key and request.method == 'POST' and (authenticated or self.idempotency_anonymous):
+            if len(key) > MAX_KEY_LENGTH:
+                raise ValidationError({HEADER: f"Use no máximo {MAX_KEY_LENGTH} caracteres."})
+            scope = request.user.pk if authenticated else 'anon'
+            cache_key = f"idempotency:{scope}:{hashlib.sha256(key.encode()).hexdigest()}"
+            fingerprint = _fingerprint(request)
+            store = caches[settings.IDEMPOTENCY_CACHE]
+            stored = store.get(cache_key)
+            if stored is not None:
+                if stored['fingerprint'] != fingerprint:
+                    raise IdempotencyKeyReused()
+                raise _Replay(stored)
+            if not store.add(f"{cache_key}:lock", True, LOCK_TIMEOUT):
+                raise IdempotencyConflict()
+            self.idempotency_key = (cache_key, fingerprint)
+        super().initial(request, *args, **kwargs)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, _Replay):
+            return Response(exc.stored['data'], status=exc.stored['status'], headers={REPLAYED_HEADER: 'true'})
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.idempotency_key and status.is_success(response.status_code) and not response.streaming:
+            cache_key, fingerprint = self.idempotency_key
+            caches[settings.IDEMPOTENCY_CACHE].set(cache_key, {
+                'fingerprint': fingerprint,
+                'status': response.status_code,
+                'data': response.data,
+            })
+        return response
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            if self.idempotency_key:
+                caches[settings.IDEMPOTENCY_CACHE].delete(f"{self.idempotency_key[0]}:lock")
+
+
+def idempotent(anonymous=False):
+    """
+    IdempotencyMixin para views de função: vai por fora do @api_view.
+
+        @idempotent()
+        @api_view(["POST"])
+        def view(request): ...
+    """
+    def decorator(view):
+        cls = type(view.cls.__name__, (IdempotencyMixin, view.cls), {'idempotency_anonymous': anonymous})
+        return cls.as_view(**view.initkwargs)
+    return decorator
@@ -0,0 +1,338 @@
+import csv
+import io
+import json
+from collections import Counter
+from datetime import date
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, transaction
+
+from . import counters
+from .burndown import record_transitions, transition
+from .models import ProjectMembership, UserStory, ProductBacklogItem, Sprint, Task
+
+User = get_user_model()
+
+DEFAULT_BATCH_SIZE = 500
+
+# Cabeçalhos aceitos (já normalizados) -> campo interno.
+# Cobre os nomes usados nas exportações do Jira e do Trello e os nossos próprios.
+COLUMN_ALIASES = {
+    'type': 'type', 'issue type': 'type', 'tipo': 'type', 'card type': 'type',
+    'title': 'title', 'summary': 'title', 'name': 'title', 'card name': 'title', 'titulo': 'title',
+    'description': 'description', 'desc': 'description', 'card description': 'description',
+    'acceptance criteria': 'acceptance_criteria', 'criterios de aceitacao': 'acceptance_criteria',
+    'priority': 'priority', 'prioridade': 'priority',
+    'user story': 'user_story', 'story': 'user_story', 'epic': 'user_story', 'epic link': 'user_story',
+    'backlog item': 'backlog_item', 'parent': 'backlog_item', 'parent summary': 'backlog_item',
+    'sprint': 'sprint', 'list name': 'sprint',
+    'start date': 'start_date', 'end date': 'end_date', 'due date': 'end_date',
+    'status': 'status',
+    'assignee': 'assignee', 'assignee email': 'assignee', 'assigned to': 'assignee', 'members': 'assignee',
+    'objective': 'objective',
+}
+
+ROW_TYPES = {
+    'story': 'story', 'user story': 'story', 'historia': 'story', 'epic': 'story',
+    'item': 'item', 'backlog item': 'item', 'pbi': 'item',
+    'sprint': 'sprint',
+    'task': 'task', 'sub task': 'task', 'subtask': 'task', 'tarefa': 'task',
+}
+
+PRIORITY_VALUES = {
+    'highest': 'HIGH', 'high': 'HIGH', 'alta': 'HIGH',
+    'medium': 'MEDIUM', 'media': 'MEDIUM', 'média': 'MEDIUM',
+    'low': 'LOW', 'lowest': 'LOW', 'baixa': 'LOW',
+}
+
+TASK_STATUS_VALUES = {
+    'to do': 'TODO', 'todo': 'TODO', 'open': 'TODO', 'a fazer': 'TODO', 'backlog': 'TODO',
+    'in progress': 'IN_PROGRESS', 'doing': 'IN_PROGRESS', 'em andamento': 'IN_PROGRESS',
+    'done': 'DONE', 'closed': 'DONE', 'resolved': 'DONE', 'concluido': 'DONE', 'concluído': 'DONE',
+}
+
+SPRINT_STATUS_VALUES = {
+    'planned': 'PLANNED', 'future': 'PLANNED', 'planejada': 'PLANNED',
+    'active': 'ACTIVE', 'ativa': 'ACTIVE',
+    'completed': 'COMPLETED', 'closed': 'COMPLETED', 'concluida': 'COMPLETED', 'concluída': 'COMPLETED',
+}
+
+# Ordem de inserção dentro de um lote: quem é referenciado vem antes
+TYPE_ORDER = ('sprint', 'story', 'item', 'task')
+
+
+def _normalize(value):
+    return ' '.join(str(value).strip().lower().replace('_', ' ').replace('-', ' ').split())
+
+
+def _map_record(record):
+    mapped = {}
+    for key, value in record.items():
+        field = COLUMN_ALIASES.get(_normalize(key or ''))
+        if field and value not in (None, ''):
+            mapped[field] = str(value).strip()
+    return mapped
+
+
+def iter_records(stream, fmt='csv'):
+    """
+    Lê o arquivo linha a linha e devolve um dicionário por registro.
+    Nunca carrega o arquivo inteiro em memória. Aceita stream binário ou texto.
+    """
+    if isinstance(stream, io.TextIOBase):
+        text = stream
+    else:
+        # UploadedFile do Django expõe o arquivo real em .file
+        text = io.TextIOWrapper(getattr(stream, 'file', stream), encoding='utf-8-sig', newline='')
+
+    if fmt == 'ndjson':
+        for line in text:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            yield record if isinstance(record, dict) else None
+    else:
+        yield from csv.DictReader(text)
+
+
+def detect_format(filename, explicit=None):
+    if explicit:
+        return 'ndjson' if explicit.lower() in ('ndjson', 'jsonl', 'json') else 'csv'
+    if filename and filename.lower().endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return 'csv'
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class ImportResult:
+    def __init__(self):
+        self.processed = 0
+        self.created = {'sprint': 0, 'story': 0, 'item': 0, 'task': 0}
+        self.error_count = 0
+
+    def as_dict(self):
+        return {
+            'processed': self.processed,
+            'created': dict(self.created),
+            'error_count': self.error_count,
+        }
+
+
+class BacklogImporter:
+    """
+    Importa histórias, itens de backlog, sprints e tarefas de um CSV/NDJSON
+    (formato parecido com exportações do Jira/Trello) para um projeto.
+
+    Cada lote roda na sua própria transação e usa bulk_create; referências
+    (história, item, sprint, responsável) são resolvidas com uma consulta por
+    tipo por lote, então a memória usada depende do tamanho do lote e não do arquivo.
+
+    Referências entre linhas são feitas pelo título (histórias/itens) ou nome (sprints).
+    Linhas com erro são reportadas em on_error(linha, mensagem) e não interrompem a importação.
+    """
+
+    def __init__(self, project, user, batch_size=DEFAULT_BATCH_SIZE, on_error=None, on_progress=None):
+        self.project = project
+        self.user = user
+        self.batch_size = batch_size
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.result = ImportResult()
+        # linhas do lote atual já reportadas (não entram no erro do lote inteiro)
+        self._rejected = set()
+
+    def run(self, records):
+        for batch in batched(enumerate(records, start=1), self.batch_size):
+            self._import_batch(batch)
+            self.result.processed += len(batch)
+            if self.on_progress:
+                self.on_progress(self.result)
+        return self.result
+
+    def _error(self, row, message):
+        self.result.error_count += 1
+        self._rejected.add(row)
+        if self.on_error:
+            self.on_error(row, message)
+
+    def _import_batch(self, batch):
+        self._rejected.clear()
+        by_type = {kind: [] for kind in TYPE_ORDER}
+        for row, record in batch:
+            if record is None:
+                self._error(row, "Registro inválido")
+                continue
+            data = _map_record(record)
+            kind = ROW_TYPES.get(_normalize(data.get('type', '')))
+            if not kind:
+                self._error(row, f"Tipo de linha desconhecido: '{data.get('type', '')}'")
+                continue
+            if not data.get('title'):
+                self._error(row, "O campo title é obrigatório")
+                continue
+            by_type[kind].append((row, data))
+
+        try:
+            with transaction.atomic():
+                created = {}
+                created['sprint'] = self._create_sprints(by_type['sprint'])
+                created['story'] = self._create_stories(by_type['story'])
+                created['item'] = self._create_items(by_type['item'])
+                created['task'] = self._create_tasks(by_type['task'])
+        except DatabaseError as e:
+            for kind in TYPE_ORDER:
+                for row, _ in by_type[kind]:
+                    if row not in self._rejected:
+                        self._error(row, f"Erro ao gravar o lote: {e}")
+            return
+
+        for kind, count in created.items():
+            self.result.created[kind] += count
+
+    def _create_sprints(self, rows):
+        if not rows:
+            return 0
+        names = {data['title'] for _, data in rows}
+        taken = set(
+            Sprint.objects.filter(project=self.project, name__in=names).values_list('name', flat=True)
+        )
+        sprints = []
+        for row, data in rows:
+            name = data['title']
+            if name in taken:
+                self._error(row, f"Já existe uma sprint com o nome '{name}' neste projeto")
+                continue
+            try:
+                start = date.fromisoformat(data['start_date'][:10])
+                end = date.fromisoformat(data['end_date'][:10])
+            except (KeyError, ValueError):
+                self._error(row, "Sprint precisa de start_date e end_date no formato AAAA-MM-DD")
+                continue
+            if start > end:
+                self._error(row, "A data de término deve ser posterior à data de início.")
+                continue
+            taken.add(name)
+            sprints.append(Sprint(
+                project=self.project,
+                name=name,
+                start_date=start,
+                end_date=end,
+                status=SPRINT_STATUS_VALUES.get(_normalize(data.get('status', '')), 'PLANNED'),
+                objective=data.get('objective', '') or data.get('description', ''),
+                created_by=self.user,
+            ))
+        Sprint.objects.bulk_create(sprints)
+        return len(sprints)
+
+    def _create_stories(self, rows):
+        stories = [
+            UserStory(
+                project=self.project,
+                title=data['title'][:200],
+                description=data.get('description', '') or data['title'],
+                acceptance_criteria=data.get('acceptance_criteria', ''),
+                created_by=self.user,
+            )
+            for _, data in rows
+        ]
+        UserStory.objects.bulk_create(stories)
+        return len(stories)
+
+    def _lookup(self, model, field, values):
+        # Primeira ocorrência ganha quando há títulos repetidos
+        found = {}
+        if values:
+            pairs = model.objects.filter(
+                project=self.project, **{f"{field}__in": values}
+            ).order_by('id').values_list(field, 'id')
+            for value, pk in pairs:
+                found.setdefault(value, pk)
+        return found
+
+    def _create_items(self, rows):
+        if not rows:
+            return 0
+        stories = self._lookup(UserStory, 'title', {d['user_story'] for _, d in rows if d.get('user_story')})
+        sprints = self._lookup(Sprint, 'name', {d['sprint'] for _, d in rows if d.get('sprint')})
+        items = []
+        for row, data in rows:
+            story_id = stories.get(data.get('user_story'))
+            if not story_id:
+                self._error(row, "História de usuário não encontrada neste projeto")
+                continue
+            sprint_id = None
+            if data.get('sprint'):
+                sprint_id = sprints.get(data['sprint'])
+                if not sprint_id:
+                    self._error(row, f"Sprint '{data['sprint']}' não encontrada neste projeto")
+                    continue
+            items.append(ProductBacklogItem(
+                project=self.project,
+                user_story_id=story_id,
+                sprint_id=sprint_id,
+                title=data['title'][:200],
+                description=data.get('description', '') or data['title'],
+                priority=PRIORITY_VALUES.get(_normalize(data.get('priority', '')), 'MEDIUM'),
+                created_by=self.user,
+            ))
+        ProductBacklogItem.objects.bulk_create(items)
+        counters.items_added(self.project.id, len(items), Counter(item.sprint_id for item in items))
+        return len(items)
+
+    def _create_tasks(self, rows):
+        if not rows:
+            return 0
+        backlog = self._lookup(ProductBacklogItem, 'title', {d['backlog_item'] for _, d in rows if d.get('backlog_item')})
+        sprints = self._lookup(Sprint, 'name', {d['sprint'] for _, d in rows if d.get('sprint')})
+
+        # Uma única consulta por lote resolve os responsáveis (apenas membros do
+        # projeto); email sem diferenciar maiúsculas, no índice de lower(email)
+        emails = {d['assignee'] for _, d in rows if d.get('assignee')}
+        assignees = {}
+        if emails:
+            member_ids = ProjectMembership.objects.filter(project=self.project).values('user_id')
+            for email, pk in User.objects.with_emails(emails).filter(id__in=member_ids).values_list('email', 'id'):
+                assignees[email.lower()] = pk
+
+        tasks = []
+        for row, data in rows:
+            item_id = backlog.get(data.get('backlog_item'))
+            if not item_id:
+                self._error(row, "Item do backlog não encontrado neste projeto")
+                continue
+            sprint_id = sprints.get(data.get('sprint'))
+            if not sprint_id:
+                self._error(row, "Sprint não encontrada neste projeto")
+                continue
+            assigned_to_id = None
+            if data.get('assignee'):
+                assigned_to_id = assignees.get(data['assignee'].lower())
+                if not assigned_to_id:
+                    self._error(row, f"'{data['assignee']}' não é membro do projeto")
+                    continue
+            tasks.append(Task(
+                sprint_id=sprint_id,
+                project_id=self.project.id,
+                backlog_item_id=item_id,
+                description=data.get('description', '') or data['title'],
+                assigned_to_id=assigned_to_id,
+                status=TASK_STATUS_VALUES.get(_normalize(data.get('status', '')), 'TODO'),
+                created_by=self.user,
+            ))
+        Task.objects.bulk_create(tasks)
+        record_transitions([transition(task, self.project.id, None, task.status, self.user) for task in tasks])
+        return len(tasks)
+
@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.archive import ArchiveError, archive_project
+from api.models import Project
+
+
+class Command(BaseCommand):
+    help = "Arquiva projetos encerrados há mais de N dias."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=90, help="Dias desde o encerramento (padrão: 90)")
+
+    def handle(self, *args, **options):
+        limit = timezone.now() - timedelta(days=options["days"])
+        projects = Project.objects.live().filter(
+            status=Project.Status.CONCLUDED,
+            concluded_at__lte=limit,
+            archived_at__isnull=True,
+        )
+        archived = 0
+        for project in projects.iterator():
+            try:
+                archive = archive_project(project)
+            except ArchiveError as e:
+                self.stderr.write(f"{project.name}: {e}")
+                continue
+            archived += 1
+            self.stdout.write(f"{project.name}: {archive.row_count} linha(s), {len(archive.payload)} bytes")
+        self.stdout.write(self.style.SUCCESS(f"{archived} projeto(s) arquivado(s)"))
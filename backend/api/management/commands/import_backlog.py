@@ -0,0 +1,61 @@
+import csv
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from api.importers import BacklogImporter, DEFAULT_BATCH_SIZE, detect_format, iter_records
+from api.models import Project
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Importa histórias, itens de backlog, sprints e tarefas de um CSV/NDJSON para um projeto."
+
+    def add_arguments(self, parser):
+        parser.add_argument("project_id", type=int)
+        parser.add_argument("path", help="Arquivo .csv, .ndjson ou .jsonl")
+        parser.add_argument("--user", required=True, help="username registrado como criador dos registros")
+        parser.add_argument("--format", choices=["csv", "ndjson"], default=None)
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument("--errors", help="Arquivo CSV onde gravar os erros por linha")
+
+    def handle(self, *args, **options):
+        try:
+            project = Project.objects.get(id=options["project_id"])
+        except Project.DoesNotExist:
+            raise CommandError(f"Projeto {options['project_id']} não encontrado")
+        try:
+            user = User.objects.get(username=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(f"Usuário '{options['user']}' não encontrado")
+
+        fmt = detect_format(options["path"], options["format"])
+        error_file = open(options["errors"], "w", newline="", encoding="utf-8") if options["errors"] else None
+        error_writer = None
+        if error_file:
+            error_writer = csv.writer(error_file)
+            error_writer.writerow(["row", "error"])
+
+        def on_error(row, message):
+            if error_writer:
+                error_writer.writerow([row, message])
+
+        def on_progress(result):
+            self.stdout.write(f"{result.processed} linhas processadas, {result.error_count} erro(s)")
+
+        importer = BacklogImporter(
+            project, user,
+            batch_size=options["batch_size"],
+            on_error=on_error,
+            on_progress=on_progress,
+        )
+        try:
+            with open(options["path"], "rb") as stream:
+                result = importer.run(iter_records(stream, fmt))
+        finally:
+            if error_file:
+                error_file.close()
+
+        created = ", ".join(f"{count} {kind}" for kind, count in result.created.items())
+        self.stdout.write(self.style.SUCCESS(f"Importação concluída: {created}; {result.error_count} erro(s)"))
@@ -0,0 +1,55 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.importers import DEFAULT_BATCH_SIZE, detect_format, iter_records
+from api.provisioning import UserProvisioner
+
+
+class Command(BaseCommand):
+    help = "Cria usuários em massa a partir de um CSV/NDJSON (senhas em texto ou já hasheadas)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Arquivo .csv, .ndjson ou .jsonl")
+        parser.add_argument("--format", choices=["csv", "ndjson"], default=None)
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument(
+            "--workers", type=int, default=None,
+            help="Processos para hashear senhas (padrão: USER_PROVISION_HASH_WORKERS; 0 = sem pool)",
+        )
+        parser.add_argument("--errors", help="Arquivo CSV onde gravar os erros por linha")
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size deve ser positivo")
+
+        fmt = detect_format(options["path"], options["format"])
+        error_file = open(options["errors"], "w", newline="", encoding="utf-8") if options["errors"] else None
+        error_writer = None
+        if error_file:
+            error_writer = csv.writer(error_file)
+            error_writer.writerow(["row", "error"])
+
+        def on_error(row, message):
+            if error_writer:
+                error_writer.writerow([row, message])
+
+        def on_progress(result):
+            self.stdout.write(f"{result.processed} linhas processadas, {result.error_count} erro(s)")
+
+        provisioner = UserProvisioner(
+            batch_size=options["batch_size"],
+            workers=options["workers"],
+            on_error=on_error,
+            on_progress=on_progress,
+        )
+        try:
+            with open(options["path"], "rb") as stream:
+                result = provisioner.run(iter_records(stream, fmt))
+        finally:
+            if error_file:
+                error_file.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Provisionamento concluído: {result.created} usuário(s) criado(s); {result.error_count} erro(s)"
+        ))
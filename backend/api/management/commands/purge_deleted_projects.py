@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from api.models import ProjectDeletion
+from api.purge import DEFAULT_BATCH_SIZE, DEFAULT_STALE_AFTER, purge_pending, reclaim_stale
+
+
+class Command(BaseCommand):
+    help = "Apaga em lotes os projetos marcados para exclusão."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument("--retry-failed", action="store_true", help="Tenta de novo as exclusões que falharam")
+        parser.add_argument(
+            "--stale-after", type=int, default=int(DEFAULT_STALE_AFTER.total_seconds() // 60),
+            help="Minutos sem lote novo para retomar uma exclusão em andamento (processo que caiu)",
+        )
+
+    def handle(self, *args, **options):
+        if options["retry_failed"]:
+            ProjectDeletion.objects.filter(status=ProjectDeletion.Status.FAILED).update(
+                status=ProjectDeletion.Status.PENDING, error="", finished_at=None
+            )
+        reclaim_stale(timedelta(minutes=options["stale_after"]))
+        processed = purge_pending(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"{processed} exclusão(ões) processada(s)"))
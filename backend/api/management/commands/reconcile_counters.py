@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from api.counters import reconcile
+from api.models import Project
+
+
+class Command(BaseCommand):
+    help = "Compara os contadores de Project/Sprint com as contagens reais e corrige divergências."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true", help="Grava os valores corretos (padrão: só relata)")
+        parser.add_argument("--project", type=int, help="Verifica só este projeto")
+        parser.add_argument("--batch-size", type=int, default=200)
+
+    def handle(self, *args, **options):
+        # projetos arquivados guardam os contadores do que está no arquivo
+        projects = Project.objects.live().filter(archived_at__isnull=True).order_by("id")
+        if options["project"]:
+            projects = projects.filter(id=options["project"])
+        ids = list(projects.values_list("id", flat=True))
+
+        found = 0
+        for start in range(0, len(ids), options["batch_size"]):
+            for model, pk, field, stored, actual in reconcile(ids[start:start + options["batch_size"]], fix=options["fix"]):
+                found += 1
+                self.stdout.write(f"{model} {pk}: {field} = {stored}, real = {actual}")
+
+        if not found:
+            self.stdout.write(self.style.SUCCESS("Nenhuma divergência encontrada"))
+        elif options["fix"]:
+            self.stdout.write(self.style.SUCCESS(f"{found} divergência(s) corrigida(s)"))
+        else:
+            self.stdout.write(self.style.WARNING(f"{found} divergência(s) encontrada(s); use --fix para corrigir"))
@@ -0,0 +1,128 @@
+import gzip
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # sem brotli, negocia só gzip
+    brotli = None
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    Escolhe 'br' ou 'gzip' a partir do Accept-Encoding, respeitando os pesos q
+    (q=0 recusa) e '*'. Com pesos iguais, br ganha. None se nenhum serve.
+    """
+    weights = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+
+    candidates = ('br', 'gzip') if brotli is not None else ('gzip',)
+    best, best_q = None, 0.0
+    for name in candidates:
+        q = weights.get(name, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+class _GzipStream:
+    def __init__(self):
+        self._z = zlib.compressobj(settings.RESPONSE_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, data):
+        return self._z.compress(data) + self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._z.flush()
+
+
+class _BrotliStream:
+    def __init__(self):
+        self._c = brotli.Compressor(quality=settings.RESPONSE_BROTLI_QUALITY)
+
+    def chunk(self, data):
+        return self._c.process(data) + self._c.flush()
+
+    def finish(self):
+        return self._c.finish()
+
+
+def _compress(encoding, content):
+    if encoding == 'br':
+        return brotli.compress(content, quality=settings.RESPONSE_BROTLI_QUALITY)
+    return gzip.compress(content, compresslevel=settings.RESPONSE_GZIP_LEVEL, mtime=0)
+
+
+def _stream(encoder, iterator):
+    for chunk in iterator:
+        data = encoder.chunk(chunk)
+        if data:
+            yield data
+    yield encoder.finish()
+
+
+async def _astream(encoder, iterator):
+    async for chunk in iterator:
+        data = encoder.chunk(chunk)
+        if data:
+            yield data
+    yield encoder.finish()
+
+
+class CompressionMiddleware:
+    """
+    Comprime as respostas com brotli ou gzip conforme o Accept-Encoding do
+    cliente. Respostas menores que RESPONSE_COMPRESSION_MIN_LENGTH vão sem
+    compressão (o ganho não paga a CPU); respostas em streaming são
+    comprimidas pedaço a pedaço, sem esperar o corpo inteiro.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.has_header('Content-Encoding'):
+            return response
+        if not response.streaming and len(response.content) < settings.RESPONSE_COMPRESSION_MIN_LENGTH:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            encoder = _BrotliStream() if encoding == 'br' else _GzipStream()
+            if response.is_async:
+                response.streaming_content = _astream(encoder, response.streaming_content)
+            else:
+                response.streaming_content = _stream(encoder, response.streaming_content)
+            del response['Content-Length']
+        else:
+            compressed = _compress(encoding, response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # O corpo mudou: um ETag forte deixa de valer (igual ao GZipMiddleware)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
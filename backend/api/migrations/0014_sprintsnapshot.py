@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_project_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SprintSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sprint_name', models.CharField(max_length=100)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('items_committed', models.PositiveIntegerField(default=0)),
+                ('items_done', models.PositiveIntegerField(default=0)),
+                ('committed_item_ids', models.JSONField(default=list)),
+                ('done_item_ids', models.JSONField(default=list)),
+                ('tasks_todo', models.PositiveIntegerField(default=0)),
+                ('tasks_in_progress', models.PositiveIntegerField(default=0)),
+                ('tasks_done', models.PositiveIntegerField(default=0)),
+                ('throughput', models.JSONField(default=list)),
+                ('closed_at', models.DateTimeField(auto_now_add=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sprint_snapshots', to='api.project')),
+                ('sprint', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='snapshot', to='api.sprint')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project', 'closed_at'], name='api_sprints_project_2e7e84_idx')],
+            },
+        ),
+    ]
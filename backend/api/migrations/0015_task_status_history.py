@@ -0,0 +1,85 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:07
+
+from collections import defaultdict
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+STATUS_COLUMNS = {'TODO': 'todo', 'IN_PROGRESS': 'in_progress', 'DONE': 'done'}
+BATCH_SIZE = 1000
+
+
+def backfill_history(apps, schema_editor):
+    # Tarefas de antes do histórico: uma criação (já no status atual) no
+    # created_at e o burndown acumulado a partir dela. Sem isso a primeira
+    # mudança de status tira de um balde vazio (todo: -1).
+    Task = apps.get_model('api', 'Task')
+    TaskStatusTransition = apps.get_model('api', 'TaskStatusTransition')
+    SprintBurndown = apps.get_model('api', 'SprintBurndown')
+
+    days = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
+    transitions = []
+    tasks = Task.objects.values_list('id', 'sprint_id', 'sprint__project_id', 'status', 'created_at')
+    for task_id, sprint_id, project_id, status, created_at in tasks.iterator(chunk_size=BATCH_SIZE):
+        transitions.append(TaskStatusTransition(
+            task_id=task_id, project_id=project_id, sprint_id=sprint_id,
+            from_status=None, to_status=status, changed_at=created_at,
+        ))
+        days[sprint_id][timezone.localdate(created_at)][STATUS_COLUMNS[status]] += 1
+        if len(transitions) >= BATCH_SIZE:
+            TaskStatusTransition.objects.bulk_create(transitions)
+            transitions = []
+    TaskStatusTransition.objects.bulk_create(transitions)
+
+    rows = []
+    for sprint_id, by_day in days.items():
+        current = {'todo': 0, 'in_progress': 0, 'done': 0}
+        for day in sorted(by_day):
+            for column, count in by_day[day].items():
+                current[column] += count
+            rows.append(SprintBurndown(sprint_id=sprint_id, day=day, **current))
+    SprintBurndown.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_sprintsnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SprintBurndown',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('todo', models.IntegerField(default=0)),
+                ('in_progress', models.IntegerField(default=0)),
+                ('done', models.IntegerField(default=0)),
+                ('sprint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='burndown', to='api.sprint')),
+            ],
+            options={
+                'unique_together': {('sprint', 'day')},
+            },
+        ),
+        migrations.CreateModel(
+            name='TaskStatusTransition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, choices=[('TODO', 'A fazer'), ('IN_PROGRESS', 'Em Andamento'), ('DONE', 'Concluído')], max_length=15, null=True)),
+                ('to_status', models.CharField(blank=True, choices=[('TODO', 'A fazer'), ('IN_PROGRESS', 'Em Andamento'), ('DONE', 'Concluído')], max_length=15, null=True)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('changed_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_transitions', to='api.project')),
+                ('sprint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_transitions', to='api.sprint')),
+                ('task', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='status_transitions', to='api.task')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project', 'changed_at'], name='api_tasksta_project_817699_idx'), models.Index(fields=['sprint', 'changed_at'], name='api_tasksta_sprint__b6c2d0_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_history, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:11
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count(queryset, group, **filters):
+    return Coalesce(Subquery(
+        queryset.filter(**{group: OuterRef('pk')}, **filters)
+        .values(group).annotate(c=Count('id')).values('c')[:1]
+    ), 0)
+
+
+def backfill_counters(apps, schema_editor):
+    Project = apps.get_model('api', 'Project')
+    Sprint = apps.get_model('api', 'Sprint')
+    ProductBacklogItem = apps.get_model('api', 'ProductBacklogItem')
+    ProjectMembership = apps.get_model('api', 'ProjectMembership')
+    Task = apps.get_model('api', 'Task')
+    is_open = {'status__in': ['TODO', 'IN_PROGRESS']}
+
+    Project.objects.update(
+        backlog_count=_count(ProductBacklogItem.objects.all(), 'project'),
+        member_count=_count(ProjectMembership.objects.all(), 'project'),
+        open_task_count=_count(Task.objects.all(), 'sprint__project', **is_open),
+        done_task_count=_count(Task.objects.all(), 'sprint__project', status='DONE'),
+    )
+    Sprint.objects.update(
+        item_count=_count(ProductBacklogItem.objects.all(), 'sprint'),
+        open_task_count=_count(Task.objects.all(), 'sprint', **is_open),
+        done_task_count=_count(Task.objects.all(), 'sprint', status='DONE'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_task_assignee_status_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='backlog_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='done_task_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='member_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='open_task_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='sprint',
+            name='done_task_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='sprint',
+            name='item_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='sprint',
+            name='open_task_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
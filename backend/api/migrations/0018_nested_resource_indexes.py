@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_denormalized_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productbacklogitem',
+            index=models.Index(fields=['project', 'sprint'], name='pbi_project_sprint_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectmembership',
+            index=models.Index(fields=['project', 'user', 'role'], name='membership_project_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sprint',
+            index=models.Index(fields=['project', '-start_date', 'end_date', 'status'], name='sprint_project_period_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sprint',
+            index=models.Index(fields=['project', 'created_at'], name='sprint_project_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['sprint', 'created_at'], name='task_sprint_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userstory',
+            index=models.Index(fields=['project', 'created_at'], name='story_project_created_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_task_project(apps, schema_editor):
+    Task = apps.get_model('api', 'Task')
+    Sprint = apps.get_model('api', 'Sprint')
+    Task.objects.update(project=Subquery(Sprint.objects.filter(pk=OuterRef('sprint_id')).values('project_id')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_nested_resource_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='project',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to='api.project'),
+        ),
+        migrations.RunPython(backfill_task_project, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='task',
+            name='project',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to='api.project'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'status'], name='task_project_status_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:45
+
+import api.models
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def check_duplicate_emails(apps, schema_editor):
+    # Falha com a lista dos emails repetidos em vez de um IntegrityError genérico
+    User = apps.get_model('api', 'User')
+    duplicates = list(
+        User.objects.exclude(email='').values(key=Lower('email')).annotate(n=Count('id')).filter(n__gt=1)
+        .values_list('key', flat=True)[:20]
+    )
+    if duplicates:
+        raise RuntimeError(
+            "Emails repetidos (sem diferenciar maiúsculas) impedem o índice único: " + ", ".join(duplicates)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_user_token_version'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', api.models.UserManager()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Lower('username'), name='user_username_lower_idx'),
+        ),
+        migrations.RunPython(check_duplicate_emails, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), condition=models.Q(('email', ''), _negated=True), name='user_email_lower_uniq'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0023_task_assignee_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productbacklogitem',
+            name='priority_rank',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(priority='HIGH', then=0), models.When(priority='MEDIUM', then=1), default=2, output_field=models.IntegerField()), output_field=models.IntegerField()),
+        ),
+        migrations.AddIndex(
+            model_name='productbacklogitem',
+            index=models.Index(fields=['project', 'priority_rank', '-created_at'], name='pbi_project_priority_idx'),
+        ),
+    ]
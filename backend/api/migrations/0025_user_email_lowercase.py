@@ -0,0 +1,33 @@
+from django.db import migrations
+
+
+def lowercase_emails(apps, schema_editor):
+    # O índice único de lower(email) só convertia A-Z: emails com acentos em
+    # maiúsculas passavam. Daqui em diante eles são gravados em minúsculas.
+    User = apps.get_model('api', 'User')
+    rows = list(User.objects.exclude(email='').values_list('id', 'email'))
+    seen = {}
+    duplicates = []
+    for pk, email in rows:
+        key = email.lower()
+        if key in seen:
+            duplicates.append(key)
+        seen[key] = pk
+    if duplicates:
+        raise RuntimeError(
+            "Emails repetidos (sem diferenciar maiúsculas) impedem a conversão: " + ", ".join(duplicates[:20])
+        )
+    for pk, email in rows:
+        if email != email.lower():
+            User.objects.filter(pk=pk).update(email=email.lower())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0024_backlog_priority_rank'),
+    ]
+
+    operations = [
+        migrations.RunPython(lowercase_emails, migrations.RunPython.noop),
+    ]
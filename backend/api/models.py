@@ -1,20 +1,120 @@
+import string
+
 from django.db import models
 from django.conf import settings
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager as DjangoUserManager
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+# Limite superior das buscas por prefixo: maior caractere Unicode
+PREFIX_END = '\U0010ffff'
+# O LOWER nativo do SQLite só converte A-Z
+DB_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+class UserQuerySet(models.QuerySet):
+    def with_emails(self, emails):
+        # lower(email) IN (...) no índice único parcial (por isso o email != '');
+        # os emails são gravados em minúsculas (UserManager.normalize_email)
+        return self.exclude(email='').alias(email_lower=Lower('email')).filter(
+            email_lower__in={str(email).lower() for email in emails}
+        )
+
+    def prefix_search(self, term, limit):
+        """
+        Usuários ativos cujo username ou email começa com term, sem diferenciar
+        maiúsculas. São duas consultas por faixa (lower(x) >= term AND < term +
+        PREFIX_END) nos índices de lower(username) e lower(email), cada uma
+        parando em limit linhas já na ordem do índice: o custo não cresce com
+        o número de usuários, ao contrário de um LIKE/icontains.
+
+        Emails já estão em minúsculas (com acentos); no username só A-Z são
+        convertidos, como faz o LOWER do SQLite: "Öm" acha "Ömer", "öm" não.
+        """
+        terms = {'username': term.translate(DB_LOWER), 'email': term.lower()}
+        users = {}
+        for field, key in terms.items():
+            matches = self.filter(is_active=True).alias(key=Lower(field)).filter(
+                key__gte=key, key__lt=key + PREFIX_END
+            )
+            if field == 'email':
+                matches = matches.exclude(email='')
+            for row in matches.order_by('key').values('id', 'username', 'email')[:limit]:
+                users[row['id']] = row
+        return sorted(users.values(), key=lambda row: row['username'].lower())[:limit]
+
+
+class UserManager(DjangoUserManager.from_queryset(UserQuerySet)):
+    @classmethod
+    def normalize_email(cls, email):
+        # Email inteiro em minúsculas (str.lower converte acentos; o LOWER do
+        # SQLite não): o índice único de lower(email) e with_emails comparam
+        # o que foi convertido aqui
+        return super().normalize_email(email).lower()
+
 
 class User(AbstractUser):
     bio = models.TextField(blank=True)
+    # vai no JWT; incrementar (api.authentication.revoke_tokens) invalida os tokens já emitidos
+    token_version = models.PositiveIntegerField(default=0)
     # birth_date = models.DateField(null=True, blank=True)
 
+    objects = UserManager()
+
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            # email único sem diferenciar maiúsculas; vazio continua permitido
+            # (usuários provisionados sem email)
+            models.UniqueConstraint(Lower('email'), condition=~models.Q(email=''), name='user_email_lower_uniq'),
+        ]
+        indexes = [
+            # typeahead de /api/users/search/ (prefixo de lower(username))
+            models.Index(Lower('username'), name='user_username_lower_idx'),
+        ]
+
     def __str__(self):
         return self.username
 
+class ProjectQuerySet(models.QuerySet):
+    def live(self):
+        # projetos em exclusão somem da API na hora, mesmo antes das linhas serem apagadas
+        return self.exclude(status=Project.Status.DELETING)
+
+    def visible_to(self, user):
+        # Sem JOIN + DISTINCT: "owner = ? OR id IN (projetos do usuário)" vira um
+        # MULTI-INDEX OR no SQLite (índice de owner + índice único (user, project)
+        # da membership), sem varrer projetos nem ordenar pra deduplicar.
+        # Ver scripts/bench_project_listing.py.
+        return self.filter(
+            models.Q(owner=user)
+            | models.Q(pk__in=ProjectMembership.objects.filter(user=user).values('project_id'))
+        )
+
+
+class CountersMixin:
+    """
+    Os contadores só mudam via UPDATE com F() (api/counters.py). Um save()
+    comum de uma instância já existente não regrava esses campos, senão o
+    valor lido no começo da requisição desfaria os incrementos feitos depois.
+    """
+    COUNTER_FIELDS = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+
 # um usuário pode ter vários projetos, e cada projeto pode ter vários usuários com papéis diferentes
 # ManyToManyFiled
-class Project(models.Model):
+class Project(CountersMixin, models.Model):
     class Status(models.TextChoices):
         ACTIVE = 'ACTIVE', 'Ativo'
         CONCLUDED = 'CONCLUDED', 'Concluído'
+        DELETING = 'DELETING', 'Em exclusão'
 
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True)
@@ -27,6 +127,16 @@ class Project(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     status = models.CharField(max_length=12, choices=Status.choices, default=Status.ACTIVE)
     concluded_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(null=True, blank=True)
+    # contadores mantidos com F() nas escritas (ver api/counters.py e reconcile_counters)
+    backlog_count = models.IntegerField(default=0)
+    open_task_count = models.IntegerField(default=0)
+    done_task_count = models.IntegerField(default=0)
+    member_count = models.IntegerField(default=0)
+
+    COUNTER_FIELDS = ('backlog_count', 'open_task_count', 'done_task_count', 'member_count')
+
+    objects = ProjectQuerySet.as_manager()
 
     def __str__(self):
         return self.name
@@ -44,6 +154,10 @@ class ProjectMembership(models.Model):
 
     class Meta:
         unique_together = ('user', 'project')  # não pode ter usuário duplicado no mesmo projeto
+        indexes = [
+            # checagens de papel: filter(project=..., user=..., role=...) sem ler a tabela
+            models.Index(fields=['project', 'user', 'role'], name='membership_project_user_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} como {self.get_role_display()} em {self.project.name}"
@@ -55,13 +169,20 @@ class UserStory(models.Model):
     description = models.TextField()
     acceptance_criteria = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # versão da linha para o cache de fragmentos (api/fragments.py)
+    updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['project', 'created_at'], name='story_project_created_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
 
-class Sprint(models.Model):
+class Sprint(CountersMixin, models.Model):
     STATUS_CHOICES = [
         ('PLANNED', 'Planejada'),
         ('ACTIVE', 'Ativa'),
@@ -79,10 +200,23 @@ class Sprint(models.Model):
     increment = models.TextField(blank=True)
     tech = models.TextField(blank=True)
     team = models.TextField(blank=True)
+    # contadores mantidos com F() nas escritas (ver api/counters.py e reconcile_counters)
+    item_count = models.IntegerField(default=0)
+    open_task_count = models.IntegerField(default=0)
+    done_task_count = models.IntegerField(default=0)
+
+    COUNTER_FIELDS = ('item_count', 'open_task_count', 'done_task_count')
 
     class Meta:
         unique_together = ('project', 'name')
-        
+        indexes = [
+            # sprints ativas: project = ? AND start_date <= hoje AND end_date >= hoje,
+            # a mais recente primeiro (resumo do portfólio)
+            models.Index(fields=['project', '-start_date', 'end_date', 'status'], name='sprint_project_period_idx'),
+            # listagem do projeto, mais recentes primeiro
+            models.Index(fields=['project', 'created_at'], name='sprint_project_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.project.name})"
 
@@ -101,7 +235,30 @@ class ProductBacklogItem(models.Model):
     description = models.TextField()
     priority = models.CharField(max_length=6, choices=PRIORITY_CHOICES, default='MEDIUM')
     created_at = models.DateTimeField(auto_now_add=True)
+    # versão da linha para o cache de fragmentos (api/fragments.py)
+    updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    # HIGH=0, MEDIUM=1, LOW=2, calculado pelo banco. Ordenar por um CASE na
+    # consulta não usa índice (o SQLite só casa índice de expressão com
+    # literais, e o Django manda os valores do CASE como parâmetros).
+    priority_rank = models.GeneratedField(
+        expression=models.Case(
+            models.When(priority='HIGH', then=0),
+            models.When(priority='MEDIUM', then=1),
+            output_field=models.IntegerField(),
+            default=2,
+        ),
+        output_field=models.IntegerField(),
+        db_persist=True,
+    )
+
+    class Meta:
+        indexes = [
+            # backlog do projeto fora de sprint (add-items) e por sprint
+            models.Index(fields=['project', 'sprint'], name='pbi_project_sprint_idx'),
+            # listagem do backlog: prioridade e depois os mais recentes
+            models.Index(fields=['project', 'priority_rank', '-created_at'], name='pbi_project_priority_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -115,6 +272,9 @@ class Task(models.Model):
     ]
 
     sprint = models.ForeignKey(Sprint, on_delete=models.CASCADE, related_name="tasks")
+    # cópia de sprint.project: permissões e agregações por projeto sem passar pela sprint
+    # (indexado pelo task_project_status_idx abaixo)
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="tasks", db_index=False)
     backlog_item = models.ForeignKey(ProductBacklogItem, on_delete=models.CASCADE, related_name="tasks")
     description = models.TextField()
     assigned_to = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="assigned_tasks")
@@ -122,9 +282,137 @@ class Task(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name="created_tasks")
 
+    class Meta:
+        indexes = [
+            # "minhas tarefas": filtra por responsável/status e pagina por created_at
+            models.Index(fields=['assigned_to', 'status', 'created_at'], name='task_assignee_status_idx'),
+            # "minhas tarefas" sem status ou com vários: lê na ordem da paginação
+            models.Index(fields=['assigned_to', 'created_at', 'id'], name='task_assignee_created_idx'),
+            # tarefas da sprint, mais recentes primeiro
+            models.Index(fields=['sprint', 'created_at'], name='task_sprint_created_idx'),
+            # contagens por projeto/status (resumo, contadores)
+            models.Index(fields=['project', 'status'], name='task_project_status_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.project_id is None and self.sprint_id:
+            self.project_id = self.sprint.project_id
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Task: {self.description[:50]} - {self.get_status_display()}"
 
+class TaskStatusTransition(models.Model):
+    """
+    Log append-only das mudanças de status das tarefas. from_status nulo é a
+    criação; to_status nulo é a exclusão. A tarefa não é FK de verdade (sem
+    constraint/cascata) pra o histórico sobreviver à exclusão da tarefa.
+    """
+    task = models.ForeignKey(
+        Task, on_delete=models.DO_NOTHING, db_constraint=False, related_name="status_transitions"
+    )
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="task_transitions")
+    sprint = models.ForeignKey(Sprint, on_delete=models.CASCADE, related_name="task_transitions")
+    from_status = models.CharField(max_length=15, choices=Task.STATUS_CHOICES, null=True, blank=True)
+    to_status = models.CharField(max_length=15, choices=Task.STATUS_CHOICES, null=True, blank=True)
+    changed_at = models.DateTimeField(default=timezone.now)
+    changed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name="+")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['project', 'changed_at']),
+            models.Index(fields=['sprint', 'changed_at']),
+        ]
+
+    def __str__(self):
+        return f"Task {self.task_id}: {self.from_status} -> {self.to_status}"
+
+
+class SprintBurndown(models.Model):
+    """
+    Contagem de tarefas por status no fim de cada dia da sprint, mantida de
+    forma incremental a partir do TaskStatusTransition.
+    """
+    sprint = models.ForeignKey(Sprint, on_delete=models.CASCADE, related_name="burndown")
+    day = models.DateField()
+    todo = models.IntegerField(default=0)
+    in_progress = models.IntegerField(default=0)
+    done = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('sprint', 'day')
+
+    def __str__(self):
+        return f"{self.sprint_id} em {self.day}"
+
+
+class SprintSnapshot(models.Model):
+    """
+    Fotografia do que a sprint entregou, gravada em end_sprint antes dos itens
+    voltarem para o backlog. O histórico de velocidade lê só desta tabela.
+    """
+    sprint = models.OneToOneField(Sprint, on_delete=models.CASCADE, related_name="snapshot")
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="sprint_snapshots")
+    sprint_name = models.CharField(max_length=100)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    items_committed = models.PositiveIntegerField(default=0)
+    items_done = models.PositiveIntegerField(default=0)
+    committed_item_ids = models.JSONField(default=list)
+    done_item_ids = models.JSONField(default=list)
+    tasks_todo = models.PositiveIntegerField(default=0)
+    tasks_in_progress = models.PositiveIntegerField(default=0)
+    tasks_done = models.PositiveIntegerField(default=0)
+    throughput = models.JSONField(default=list)  # [{"user_id", "username", "done"}]
+    closed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['project', 'closed_at'])]
+
+    def __str__(self):
+        return f"Snapshot de {self.sprint_name}"
+
+
+class ProjectDeletion(models.Model):
+    """
+    Acompanha a exclusão em lotes de um projeto. Guarda o id do projeto como
+    inteiro porque a linha do projeto é a última coisa a ser apagada.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pendente'
+        RUNNING = 'RUNNING', 'Em andamento'
+        DONE = 'DONE', 'Concluída'
+        FAILED = 'FAILED', 'Falhou'
+
+    project_id = models.BigIntegerField(db_index=True)
+    project_name = models.CharField(max_length=200)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name="project_deletions")
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    total_rows = models.PositiveIntegerField(default=0)
+    deleted_rows = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # atualizado a cada lote; RUNNING parado há muito tempo é de um processo que caiu
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Exclusão de {self.project_name} ({self.get_status_display()})"
+
+class ProjectArchive(models.Model):
+    """
+    Cópia compactada (JSON + zlib) de histórias, sprints, itens e tarefas de um
+    projeto concluído. Enquanto existir, essas linhas não ficam nas tabelas vivas.
+    """
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, related_name="archive")
+    format_version = models.PositiveSmallIntegerField(default=1)
+    payload = models.BinaryField()
+    row_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Arquivo de {self.project.name}"
+
 '''
 Aqui é bem importante, os models são só classes do python, que depois são 
 passados pra tabela no banco de dados. Cada atributo da classe vira uma coluna, e cada 
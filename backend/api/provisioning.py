@@ -0,0 +1,214 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import get_hasher, identify_hasher, make_password
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import DatabaseError, transaction
+from django.db.models import Q
+
+from .hashing import hash_chunk
+from .importers import DEFAULT_BATCH_SIZE, _normalize, batched
+
+User = get_user_model()
+
+# Cabeçalhos aceitos (já normalizados) -> campo interno
+COLUMN_ALIASES = {
+    'username': 'username', 'user': 'username', 'login': 'username', 'usuario': 'username', 'usuário': 'username',
+    'email': 'email', 'e mail': 'email', 'email address': 'email',
+    'password': 'password', 'senha': 'password',
+    'password hash': 'password_hash', 'hash': 'password_hash', 'hashed password': 'password_hash',
+    'first name': 'first_name', 'nome': 'first_name',
+    'last name': 'last_name', 'sobrenome': 'last_name',
+    'bio': 'bio',
+}
+
+# Abaixo disso não compensa subir processos: as senhas são hasheadas aqui mesmo
+MIN_PARALLEL_PASSWORDS = 8
+
+username_validator = UnicodeUsernameValidator()
+
+
+def _map_record(record):
+    mapped = {}
+    for key, value in record.items():
+        field = COLUMN_ALIASES.get(_normalize(key or ''))
+        if field and value not in (None, ''):
+            mapped[field] = str(value).strip()
+    return mapped
+
+
+class ProvisionResult:
+    def __init__(self):
+        self.processed = 0
+        self.created = 0
+        self.error_count = 0
+
+    def as_dict(self):
+        return {
+            'processed': self.processed,
+            'created': self.created,
+            'error_count': self.error_count,
+        }
+
+
+class UserProvisioner:
+    """
+    Cria usuários em massa a partir de um CSV/NDJSON (username, email,
+    password ou password_hash, first_name, last_name, bio).
+
+    Cada lote custa uma consulta de duplicados (username OU email já
+    cadastrados) e um bulk_create na sua própria transação. Senhas em texto
+    são hasheadas com o hasher padrão em um pool de `workers` processos
+    (0 hasheia no próprio processo; o filho só importa api.hashing, então
+    funciona com fork, spawn ou forkserver); password_hash é gravado como veio, desde
+    que seja de um hasher configurado. Sem nenhum dos dois o usuário fica com
+    senha inutilizável. Os validadores de senha não rodam aqui: quem
+    provisiona é administrador.
+
+    Linhas com erro são reportadas em on_error(linha, mensagem) e não interrompem o provisionamento.
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, workers=None, on_error=None, on_progress=None, mp_context=None):
+        self.batch_size = batch_size
+        self.mp_context = mp_context
+        self.workers = settings.USER_PROVISION_HASH_WORKERS if workers is None else workers
+        if self.workers is None:
+            self.workers = os.cpu_count() or 1
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.result = ProvisionResult()
+        self._pool = None
+
+    def run(self, records):
+        try:
+            for batch in batched(enumerate(records, start=1), self.batch_size):
+                self._provision_batch(batch)
+                self.result.processed += len(batch)
+                if self.on_progress:
+                    self.on_progress(self.result)
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+        return self.result
+
+    def _error(self, row, message):
+        self.result.error_count += 1
+        if self.on_error:
+            self.on_error(row, message)
+
+    def _validate(self, row, record):
+        if record is None:
+            self._error(row, "Registro inválido")
+            return None
+        data = _map_record(record)
+        username = data.get('username', '')
+        if not username:
+            self._error(row, "O campo username é obrigatório")
+            return None
+        try:
+            username_validator(username)
+        except ValidationError:
+            self._error(row, f"Username inválido: '{username}'")
+            return None
+        if len(username) > User._meta.get_field('username').max_length:
+            self._error(row, f"Username muito longo: '{username}'")
+            return None
+        if data.get('email'):
+            data['email'] = User.objects.normalize_email(data['email'])
+            try:
+                validate_email(data['email'])
+            except ValidationError:
+                self._error(row, f"Email inválido: '{data['email']}'")
+                return None
+        if data.get('password_hash'):
+            try:
+                identify_hasher(data['password_hash'])
+            except ValueError:
+                self._error(row, "password_hash não é de nenhum hasher configurado")
+                return None
+        return data
+
+    def _provision_batch(self, batch):
+        rows = []
+        for row, record in batch:
+            data = self._validate(row, record)
+            if data:
+                rows.append((row, data))
+        if not rows:
+            return
+
+        # Uma consulta para os duplicados do lote inteiro; email sem diferenciar
+        # maiúsculas, como no índice único de lower(email)
+        usernames = {data['username'] for _, data in rows}
+        emails = [data['email'] for _, data in rows if data.get('email')]
+        taken_usernames, taken_emails = set(), set()
+        existing = User.objects.filter(
+            Q(username__in=usernames) | Q(pk__in=User.objects.with_emails(emails).values('pk'))
+        ).values_list('username', 'email')
+        for username, email in existing:
+            taken_usernames.add(username)
+            taken_emails.add(email.lower())
+
+        accepted = []
+        for row, data in rows:
+            if data['username'] in taken_usernames:
+                self._error(row, f"Username '{data['username']}' já está em uso")
+                continue
+            if data.get('email') and data['email'].lower() in taken_emails:
+                self._error(row, f"Email '{data['email']}' já está em uso")
+                continue
+            taken_usernames.add(data['username'])
+            if data.get('email'):
+                taken_emails.add(data['email'].lower())
+            accepted.append((row, data))
+
+        plain = [data['password'] for _, data in accepted if data.get('password') and not data.get('password_hash')]
+        hashes = iter(self._hash_passwords(plain))
+        users = []
+        for _, data in accepted:
+            if data.get('password_hash'):
+                password = data['password_hash']
+            elif data.get('password'):
+                password = next(hashes)
+            else:
+                password = make_password(None)
+            users.append(User(
+                username=data['username'],
+                email=data.get('email', ''),
+                password=password,
+                first_name=data.get('first_name', '')[:150],
+                last_name=data.get('last_name', '')[:150],
+                bio=data.get('bio', ''),
+            ))
+
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create(users)
+        except DatabaseError as e:
+            for row, _ in accepted:
+                self._error(row, f"Erro ao gravar o lote: {e}")
+            return
+        self.result.created += len(users)
+
+    def _hash_passwords(self, passwords):
+        if not passwords:
+            return []
+        hasher = get_hasher()
+        hasher_path = f"{type(hasher).__module__}.{type(hasher).__qualname__}"
+        if self.workers <= 1 or len(passwords) < MIN_PARALLEL_PASSWORDS:
+            return hash_chunk(hasher_path, passwords)
+
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=self.mp_context)
+        size = -(-len(passwords) // self.workers)
+        chunks = [passwords[start:start + size] for start in range(0, len(passwords), size)]
+        hashed = []
+        for chunk in self._pool.map(partial(hash_chunk, hasher_path), chunks):
+            hashed.extend(chunk)
+        return hashed
@@ -0,0 +1,146 @@
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import (
+    Project, ProjectDeletion, ProjectMembership, UserStory, ProductBacklogItem, Sprint, SprintBurndown,
+    SprintSnapshot, Task, TaskStatusTransition,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+# RUNNING sem lote novo há mais que isso é retomado pelo comando
+DEFAULT_STALE_AFTER = timedelta(minutes=10)
+
+# Ordem importa: apagando de baixo pra cima cada lote só tem cascatas vazias
+# pra resolver, então o lock de escrita do SQLite fica preso por pouco tempo.
+# Histórico, burndown e snapshots vêm antes de Sprint/Task: senão a cascata
+# das sprints (e do projeto) apagaria todos eles de uma vez, numa transação só.
+PURGE_STEPS = (
+    (TaskStatusTransition, 'project_id'),
+    (SprintBurndown, 'sprint__project_id'),
+    (SprintSnapshot, 'project_id'),
+    (Task, 'project_id'),
+    (ProductBacklogItem, 'project_id'),
+    (Sprint, 'project_id'),
+    (UserStory, 'project_id'),
+    (ProjectMembership, 'project_id'),
+)
+
+_worker_lock = threading.Lock()
+_worker = None
+
+
+def count_rows(project_id):
+    return sum(model.objects.filter(**{lookup: project_id}).count() for model, lookup in PURGE_STEPS) + 1
+
+
+def purge_project(deletion, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Apaga as linhas do projeto em lotes pequenos, cada um na sua própria
+    transação, atualizando o progresso em ProjectDeletion a cada lote.
+    Quem chama já reservou a exclusão (claim_deletion).
+    """
+    for model, lookup in PURGE_STEPS:
+        while True:
+            ids = list(
+                model.objects.filter(**{lookup: deletion.project_id}).values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                model.objects.filter(id__in=ids).delete()
+                ProjectDeletion.objects.filter(pk=deletion.pk).update(
+                    deleted_rows=F('deleted_rows') + len(ids), heartbeat_at=timezone.now()
+                )
+
+    with transaction.atomic():
+        Project.objects.filter(id=deletion.project_id).delete()
+        ProjectDeletion.objects.filter(pk=deletion.pk).update(
+            status=ProjectDeletion.Status.DONE,
+            deleted_rows=F('total_rows'),
+            finished_at=timezone.now(),
+        )
+
+
+def claim_deletion(deletion):
+    """
+    Passa a exclusão de PENDING para RUNNING num UPDATE só. Com vários
+    processos web cada um tem sua thread: só quem mudou a linha trabalha nela.
+    """
+    return ProjectDeletion.objects.filter(pk=deletion.pk, status=ProjectDeletion.Status.PENDING).update(
+        status=ProjectDeletion.Status.RUNNING, heartbeat_at=timezone.now()
+    ) == 1
+
+
+def reclaim_stale(stale_after=DEFAULT_STALE_AFTER):
+    """
+    Devolve para PENDING as exclusões RUNNING sem lote novo há stale_after
+    (o processo que as reservou caiu); o lote seguinte continua de onde parou.
+    """
+    return ProjectDeletion.objects.filter(
+        status=ProjectDeletion.Status.RUNNING, heartbeat_at__lt=timezone.now() - stale_after
+    ).update(status=ProjectDeletion.Status.PENDING)
+
+
+def purge_pending(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Processa as exclusões pendentes. As que outro processo reservou primeiro
+    ficam com ele; as que ficaram pela metade voltam pela reclaim_stale.
+    """
+    processed = 0
+    while True:
+        deletion = ProjectDeletion.objects.filter(status=ProjectDeletion.Status.PENDING).order_by('created_at').first()
+        if deletion is None:
+            return processed
+        if not claim_deletion(deletion):
+            continue
+        try:
+            purge_project(deletion, batch_size=batch_size)
+        except Exception as e:
+            logger.exception("Falha ao excluir o projeto %s", deletion.project_id)
+            ProjectDeletion.objects.filter(pk=deletion.pk).update(
+                status=ProjectDeletion.Status.FAILED,
+                error=str(e),
+                finished_at=timezone.now(),
+            )
+        processed += 1
+
+
+def _run_worker():
+    global _worker
+    batch_size = getattr(settings, 'PROJECT_PURGE_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    try:
+        while True:
+            purge_pending(batch_size=batch_size)
+            # Confere a fila de novo com o lock antes de sair: uma exclusão
+            # enfileirada enquanto esta thread terminava viu o worker vivo e
+            # não disparou outro, então ela precisa ser pega aqui.
+            with _worker_lock:
+                if not ProjectDeletion.objects.filter(status=ProjectDeletion.Status.PENDING).exists():
+                    _worker = None
+                    return
+    finally:
+        connection.close()
+
+
+def schedule_purge():
+    """
+    Dispara (se ainda não estiver rodando) a thread que esvazia a fila de exclusões.
+    Com PROJECT_PURGE_IN_BACKGROUND desligado, a fila fica para o comando
+    `purge_deleted_projects` (cron, por exemplo).
+    """
+    global _worker
+    if not getattr(settings, 'PROJECT_PURGE_IN_BACKGROUND', True):
+        return
+    with _worker_lock:
+        if _worker is not None and _worker.is_alive():
+            return
+        _worker = threading.Thread(target=_run_worker, name="project-purge", daemon=True)
+        _worker.start()
@@ -0,0 +1,94 @@
+import datetime
+import decimal
+import uuid
+
+import msgpack
+import orjson
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from django.utils.http import parse_header_parameters
+from rest_framework.renderers import BaseRenderer
+
+
+def _default(obj):
+    # O que o orjson não serializa sozinho, com o mesmo resultado do encoder do DRF
+    if isinstance(obj, Promise):
+        return force_str(obj)
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, datetime.timedelta):
+        return str(obj.total_seconds())
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return obj.decode()
+    if hasattr(obj, 'tolist'):  # arrays e escalares do numpy
+        return obj.tolist()
+    if hasattr(obj, '__iter__'):
+        return list(obj)
+    raise TypeError(f"Tipo não serializável em JSON: {type(obj).__name__}")
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    Renderer JSON com orjson: mesma saída do JSONRenderer do DRF (datetime em
+    ISO 8601 com 'Z' para UTC, Decimal como número), só que codificado em C.
+    """
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+    options = orjson.OPT_UTC_Z | orjson.OPT_SERIALIZE_NUMPY
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        options = self.options
+        # Accept: application/json; indent=N pede saída indentada (o orjson só indenta com 2)
+        if accepted_media_type and parse_header_parameters(accepted_media_type)[1].get('indent'):
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=_default, option=options)
+
+
+def render_json_stream(batches):
+    """
+    Array JSON em pedaços: '[' sai na hora, depois cada lote de dicts
+    codificado pelo ORJSONRenderer (sem os colchetes) e separado por vírgula.
+    """
+    renderer = ORJSONRenderer()
+    yield b'['
+    separator = b''
+    for batch in batches:
+        yield separator + renderer.render(batch)[1:-1]
+        separator = b','
+    yield b']'
+
+
+def _msgpack_default(obj):
+    # Tipos que o orjson resolve sozinho, no mesmo formato do JSON
+    if isinstance(obj, datetime.datetime):
+        representation = obj.isoformat()
+        if representation.endswith('+00:00'):
+            representation = representation[:-6] + 'Z'
+        return representation
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    return _default(obj)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    application/msgpack para clientes de automação: os mesmos dados da
+    representação JSON (datas como string ISO, Decimal como número), só que
+    em binário e mais compacto.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_msgpack_default, use_bin_type=True)
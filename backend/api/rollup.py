@@ -0,0 +1,65 @@
+from collections import Counter, defaultdict
+
+from django.db.models import Count
+
+from .models import ProductBacklogItem, Task, UserStory
+
+TASK_STATUSES = ('TODO', 'IN_PROGRESS', 'DONE')
+ITEM_FIELDS = ('id', 'title', 'priority', 'sprint_id')
+
+
+def _progress(counts):
+    total = sum(counts[s] for s in TASK_STATUSES)
+    return {
+        'tasks': {**{s: counts[s] for s in TASK_STATUSES}, 'total': total},
+        'percent_complete': round(100 * counts['DONE'] / total, 1) if total else 0.0,
+    }
+
+
+def build_tree(stories, items, task_counts):
+    """
+    Monta a árvore história → itens com as contagens de tarefas por status.
+    O percentual de cada nível é tarefas DONE / total das tarefas abaixo dele.
+    task_counts: {item_id: Counter({status: n})}.
+    """
+    by_story = defaultdict(list)
+    for item in items:
+        by_story[item['user_story_id']].append(item)
+
+    project_counts = Counter()
+    tree = []
+    for story in stories:
+        story_counts = Counter()
+        children = []
+        for item in by_story.get(story['id'], ()):
+            counts = task_counts.get(item['id'], Counter())
+            story_counts.update(counts)
+            children.append({**{f: item[f] for f in ITEM_FIELDS}, **_progress(counts)})
+        project_counts.update(story_counts)
+        tree.append({'id': story['id'], 'title': story['title'], **_progress(story_counts), 'backlog_items': children})
+    return {**_progress(project_counts), 'user_stories': tree}
+
+
+def story_tree(project_id):
+    """Três consultas: histórias, itens e contagem de tarefas agrupada por (item, status)."""
+    stories = UserStory.objects.filter(project_id=project_id).order_by('id').values('id', 'title')
+    items = ProductBacklogItem.objects.filter(project_id=project_id).order_by('id').values('user_story_id', *ITEM_FIELDS)
+
+    task_counts = defaultdict(Counter)
+    rows = Task.objects.filter(project_id=project_id).values('backlog_item_id', 'status').annotate(n=Count('id')).order_by()
+    for row in rows:
+        task_counts[row['backlog_item_id']][row['status']] = row['n']
+    return build_tree(stories, items, task_counts)
+
+
+def archived_story_tree(graph):
+    """Mesma árvore a partir de um ArchivedGraph (projeto arquivado)."""
+    task_counts = defaultdict(Counter)
+    for task in graph.tasks:
+        task_counts[task.backlog_item_id][task.status] += 1
+    stories = sorted(({'id': s.id, 'title': s.title} for s in graph.user_stories), key=lambda s: s['id'])
+    items = sorted(
+        ({'user_story_id': i.user_story_id, **{f: getattr(i, f) for f in ITEM_FIELDS}} for i in graph.backlog),
+        key=lambda i: i['id']
+    )
+    return build_tree(stories, items, task_counts)
@@ -1,7 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from rest_framework.exceptions import ValidationError
-from .models import Project, ProjectMembership, UserStory, ProductBacklogItem, Sprint, Task
+from .models import Project, ProjectDeletion, ProjectMembership, UserStory, ProductBacklogItem, Sprint, SprintSnapshot, Task
 
 User = get_user_model()
 
@@ -24,19 +24,25 @@ class UserSerializer(serializers.ModelSerializer):
         return value
 
     def validate_email(self, value):
-        if value and User.objects.filter(email=value).exclude(id=self.instance.id).exists():
+        if value and User.objects.with_emails([value]).exclude(id=self.instance.id).exists():
             raise ValidationError("Este email já está em uso.")
-        return value 
+        return User.objects.normalize_email(value)
     
     def update(self, instance, validated_data):
+        # Grava só os campos enviados: o resto da linha (is_active,
+        # token_version, senha) pode ter mudado depois que a instância foi lida
         password = validated_data.pop('password', None)
-        update_instance = super().update(instance, validated_data)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        fields = list(validated_data)
 
         if password:
-            update_instance.set_password(password)
-            update_instance.save()
-        
-        return update_instance
+            instance.set_password(password)
+            fields.append('password')
+        if fields:
+            instance.save(update_fields=fields)
+
+        return instance
 
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -60,11 +66,17 @@ class ProjectSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Project
-        fields = ["id", "name", "description", "owner", "members", "status", "concluded_at", "created_at"]
-        read_only_fields = ["owner", "members", "status", "concluded_at", "created_at"]
+        fields = [
+            "id", "name", "description", "owner", "members", "status", "concluded_at", "archived_at", "created_at",
+            "backlog_count", "open_task_count", "done_task_count", "member_count"
+        ]
+        read_only_fields = [
+            "owner", "members", "status", "concluded_at", "archived_at", "created_at",
+            "backlog_count", "open_task_count", "done_task_count", "member_count"
+        ]
 
     def get_members(self, obj):
-        memberships = ProjectMembership.objects.filter(project=obj)
+        memberships = ProjectMembership.objects.filter(project=obj).select_related('user')
         return [{
             **UserSerializer(m.user).data,
             'role': m.role
@@ -72,6 +84,20 @@ class ProjectSerializer(serializers.ModelSerializer):
 
     
 
+class ProjectDeletionSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ProjectDeletion
+        fields = ["id", "project_id", "project_name", "status", "total_rows", "deleted_rows", "progress", "error", "created_at", "finished_at"]
+        read_only_fields = fields
+
+    def get_progress(self, obj):
+        if not obj.total_rows:
+            return 0
+        return round(100 * obj.deleted_rows / obj.total_rows, 1)
+
+
 class UserStorySerializer(serializers.ModelSerializer):
     created_by = UserSerializer(read_only=True)
     created_at = serializers.DateTimeField(read_only=True)
@@ -101,18 +127,20 @@ class UserStorySerializer(serializers.ModelSerializer):
         if not project_id:
             raise ValidationError({"detail": "ID do projeto não especificado"})
         
-        try:
-            project = Project.objects.get(id=project_id)
-        except Project.DoesNotExist:
-            raise ValidationError({"detail": f"Projeto {project_id} não encontrado"})
+        # a view já carregou projeto e membership na checagem de permissão
+        project = self.context.get('project')
+        if project is None:
+            try:
+                project = Project.objects.get(id=project_id)
+            except Project.DoesNotExist:
+                raise ValidationError({"detail": f"Projeto {project_id} não encontrado"})
         
-        membership = ProjectMembership.objects.filter(
-            user=request.user, 
-            project=project,
-            role='PO'
-        ).first()
+        if 'membership' in self.context:
+            membership = self.context['membership']
+        else:
+            membership = ProjectMembership.objects.filter(user=request.user, project=project).first()
         
-        if not membership:
+        if not membership or membership.role != 'PO':
             raise ValidationError({
                 "detail": "Apenas o Product Owner pode gerenciar histórias de usuário"
             })
@@ -142,16 +170,22 @@ class ProductBacklogItemSerializer(serializers.ModelSerializer):
         if not project:
             raise ValidationError("Projeto não especificado")
 
-        membership = ProjectMembership.objects.filter(user=request.user, project=project).first()
+        if 'membership' in self.context:
+            membership = self.context['membership']
+        else:
+            membership = ProjectMembership.objects.filter(user=request.user, project=project).first()
         if not membership or membership.role != "PO":
             raise ValidationError("Apenas o Product Owner pode gerenciar o backlog.")
 
-        user_story = UserStory.objects.filter(id=data['user_story_id'], project=project).first()
-        if not user_story:
-            raise ValidationError("História de usuário não encontrada neste projeto")
+        # a história carregada aqui vai direto para o save e para a resposta
+        if 'user_story_id' in data:
+            user_story = UserStory.objects.select_related('created_by').filter(id=data.pop('user_story_id'), project=project).first()
+            if not user_story:
+                raise ValidationError("História de usuário não encontrada neste projeto")
+            data['user_story'] = user_story
         
         sprint = data.get('sprint_id', None)
-        if sprint and sprint.project != project:
+        if sprint and sprint.project_id != project.id:
             raise ValidationError("Sprint does not belong to this project")
         
         return super().validate(data)
@@ -159,21 +193,15 @@ class ProductBacklogItemSerializer(serializers.ModelSerializer):
         #return data
     
     def create(self, validated_data):
-        sprint = validated_data.pop('sprint_id', None)
-        item = super().create(validated_data)
-        if sprint:
-            item.sprint = sprint
-            item.save()
-        return item
+        validated_data['sprint'] = validated_data.pop('sprint_id', None)
+        return super().create(validated_data)
     
     def update(self, instance, validated_data):
         sprint = validated_data.pop('sprint_id', None)
-        instance = super().update(instance, validated_data)
         if 'sprint_id' in self.initial_data:
             # se sprint_id enviado explicitamente, atualiza (pode ser null)
-            instance.sprint = sprint
-            instance.save()
-        return instance
+            validated_data['sprint'] = sprint
+        return super().update(instance, validated_data)
 
 class SprintSerializer(serializers.ModelSerializer):
     project = serializers.PrimaryKeyRelatedField(read_only=True)  # Virá da URL, não do body
@@ -183,9 +211,10 @@ class SprintSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'project', 'name',
             'start_date', 'end_date', 'status', 'created_at',
-            'objective', 'increment', 'tech', 'team'
+            'objective', 'increment', 'tech', 'team',
+            'item_count', 'open_task_count', 'done_task_count'
         ]
-        read_only_fields = ['id', 'project', 'created_at']
+        read_only_fields = ['id', 'project', 'created_at', 'item_count', 'open_task_count', 'done_task_count']
 
     def validate(self, data):
         # validação data de inicio e fim
@@ -198,7 +227,7 @@ class SprintSerializer(serializers.ModelSerializer):
         
         # Valida se não existe outra sprint com o mesmo nome no projeto
         project_id = self.context.get('project_id')
-        if project_id:
+        if project_id and 'name' in data:
             name = data.get('name')
             query = Sprint.objects.filter(project_id=project_id, name=name)
             # Se estiver atualizando, exclui a própria sprint da verificação
@@ -217,6 +246,18 @@ class SprintSerializer(serializers.ModelSerializer):
         return data
 
 
+class SprintSnapshotSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SprintSnapshot
+        fields = [
+            'sprint', 'sprint_name', 'start_date', 'end_date',
+            'items_committed', 'items_done', 'done_item_ids',
+            'tasks_todo', 'tasks_in_progress', 'tasks_done',
+            'throughput', 'closed_at'
+        ]
+        read_only_fields = fields
+
+
 class TaskSerializer(serializers.ModelSerializer):
     created_by = UserSerializer(read_only=True)
     assigned_to = UserSerializer(read_only=True)
@@ -233,72 +274,62 @@ class TaskSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'sprint', 'created_at', 'created_by']
 
     def validate(self, data):
-        request = self.context.get('request')
         sprint_id = self.context.get('sprint_id')
         
         if not sprint_id:
             raise ValidationError("Sprint não especificada")
+
+        # O projeto vem da própria tarefa (edição) ou da sprint (criação),
+        # comparando ids: nada de carregar Project só pra checar
+        if self.instance is not None:
+            project_id = self.instance.project_id
+        else:
+            sprint = Sprint.objects.only('id', 'project_id').filter(id=sprint_id).first()
+            if sprint is None:
+                raise ValidationError("Sprint não encontrada")
+            data['sprint'] = sprint
+            project_id = sprint.project_id
         
         # Verifica se o backlog item existe e pertence ao mesmo projeto da sprint
-        backlog_item_id = data.get('backlog_item_id')
+        backlog_item_id = data.pop('backlog_item_id', None)
         if backlog_item_id:
-            try:
-                sprint = Sprint.objects.get(id=sprint_id)
-                backlog_item = ProductBacklogItem.objects.get(id=backlog_item_id)
-                
-                # Verifica se o item do backlog pertence ao mesmo projeto da sprint
-                if backlog_item.project.id != sprint.project.id:
-                    raise ValidationError("O item do backlog deve pertencer ao mesmo projeto da sprint")
-            except ProductBacklogItem.DoesNotExist:
+            backlog_item = ProductBacklogItem.objects.select_related(
+                'created_by', 'user_story__created_by'
+            ).filter(id=backlog_item_id).first()
+            if backlog_item is None:
                 raise ValidationError("Item do backlog não encontrado")
-            except Sprint.DoesNotExist:
-                raise ValidationError("Sprint não encontrada")
+            if backlog_item.project_id != project_id:
+                raise ValidationError("O item do backlog deve pertencer ao mesmo projeto da sprint")
+            data['backlog_item'] = backlog_item
         
-        # Verifica se o assigned_to é membro do projeto (se fornecido)
-        assigned_to_id = data.get('assigned_to_id')
+        # Verifica se o assigned_to é membro do projeto (se fornecido); o
+        # usuário vem na mesma consulta que confere a membership
+        assigned_to_id = data.pop('assigned_to_id', None)
         if assigned_to_id:
-            try:
-                user = User.objects.get(id=assigned_to_id)
-                backlog_item = ProductBacklogItem.objects.get(id=backlog_item_id)
-                project = backlog_item.project
-                
-                if not ProjectMembership.objects.filter(user=user, project=project).exists():
-                    raise ValidationError("O usuário atribuído deve ser membro do projeto")
-            except User.DoesNotExist:
-                raise ValidationError("Usuário não encontrado")
+            user = User.objects.filter(id=assigned_to_id, projectmembership__project_id=project_id).first()
+            if user is None:
+                if not User.objects.filter(id=assigned_to_id).exists():
+                    raise ValidationError("Usuário não encontrado")
+                raise ValidationError("O usuário atribuído deve ser membro do projeto")
+            data['assigned_to'] = user
+        elif assigned_to_id is not None:
+            # 0 remove o responsável; null deixa como está
+            data['assigned_to'] = None
         
         return data
 
     def create(self, validated_data):
-        sprint_id = self.context.get('sprint_id')
-        sprint = Sprint.objects.get(id=sprint_id)
-        
-        assigned_to_id = validated_data.pop('assigned_to_id', None)
-        assigned_to = None
-        if assigned_to_id:
-            assigned_to = User.objects.get(id=assigned_to_id)
-        
-        backlog_item_id = validated_data.pop('backlog_item_id')
-        backlog_item = ProductBacklogItem.objects.get(id=backlog_item_id)
+        sprint = validated_data.pop('sprint')
         
         task = Task.objects.create(
             sprint=sprint,
-            backlog_item=backlog_item,
-            assigned_to=assigned_to,
+            project_id=sprint.project_id,
             created_by=self.context.get('request').user,
             **validated_data
         )
         return task
 
     def update(self, instance, validated_data):
-        assigned_to_id = validated_data.pop('assigned_to_id', None)
-        if assigned_to_id is not None:
-            instance.assigned_to = User.objects.get(id=assigned_to_id) if assigned_to_id else None
-        
-        backlog_item_id = validated_data.pop('backlog_item_id', None)
-        if backlog_item_id:
-            instance.backlog_item = ProductBacklogItem.objects.get(id=backlog_item_id)
-        
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         
@@ -0,0 +1,53 @@
+from django.db.models import Count
+
+from .models import ProductBacklogItem, SprintSnapshot, Task
+
+
+def capture_sprint_snapshot(sprint):
+    """
+    Grava o SprintSnapshot da sprint com três consultas agregadas:
+    itens comprometidos, tarefas por item/status e tarefas concluídas por responsável.
+
+    Um item conta como entregue quando tem tarefas nesta sprint e todas estão DONE.
+    """
+    committed = list(
+        ProductBacklogItem.objects.filter(sprint=sprint).order_by('id').values_list('id', flat=True)
+    )
+
+    task_counts = {'TODO': 0, 'IN_PROGRESS': 0, 'DONE': 0}
+    pending_items = set()
+    items_with_tasks = set()
+    rows = Task.objects.filter(sprint=sprint).values('backlog_item_id', 'status').annotate(n=Count('id')).order_by()
+    for row in rows:
+        task_counts[row['status']] = task_counts.get(row['status'], 0) + row['n']
+        items_with_tasks.add(row['backlog_item_id'])
+        if row['status'] != 'DONE':
+            pending_items.add(row['backlog_item_id'])
+    done = [item_id for item_id in committed if item_id in items_with_tasks and item_id not in pending_items]
+
+    throughput = [
+        {'user_id': row['assigned_to_id'], 'username': row['assigned_to__username'], 'done': row['n']}
+        for row in Task.objects.filter(sprint=sprint, status='DONE', assigned_to__isnull=False)
+        .values('assigned_to_id', 'assigned_to__username')
+        .annotate(n=Count('id'))
+        .order_by('-n', 'assigned_to_id')
+    ]
+
+    snapshot, _ = SprintSnapshot.objects.update_or_create(
+        sprint=sprint,
+        defaults={
+            'project_id': sprint.project_id,
+            'sprint_name': sprint.name,
+            'start_date': sprint.start_date,
+            'end_date': sprint.end_date,
+            'items_committed': len(committed),
+            'items_done': len(done),
+            'committed_item_ids': committed,
+            'done_item_ids': done,
+            'tasks_todo': task_counts['TODO'],
+            'tasks_in_progress': task_counts['IN_PROGRESS'],
+            'tasks_done': task_counts['DONE'],
+            'throughput': throughput,
+        }
+    )
+    return snapshot
@@ -1,8 +1,34 @@
+import gzip
+import io
+import json
+from datetime import timedelta
+from decimal import Decimal
+from unittest import skipUnless
+
+import msgpack
+import numpy as np
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
 from django.urls import reverse
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APITestCase, APIClient
 from django.contrib.auth import get_user_model
-from api.models import Project, ProjectMembership, ProductBacklogItem, Sprint, UserStory
+from api.counters import reconcile
+from api.forecast import simulate_sprints_needed
+from api.authentication import user_cache
+from api.fastlists import serialize_values
+from api.fragments import fragment_cache
+from api.importers import BacklogImporter, iter_records
+from api.middleware import brotli, negotiate_encoding
+from api.renderers import MessagePackRenderer, ORJSONRenderer
+from api.purge import purge_pending
+from api.views import my_tasks_queryset
+from api.serializers import ProductBacklogItemSerializer, SprintSerializer, TaskSerializer, UserStorySerializer
+from api.models import Project, ProjectDeletion, ProjectMembership, ProductBacklogItem, Sprint, SprintBurndown, SprintSnapshot, Task, TaskStatusTransition, UserStory
 
 User = get_user_model()
 
@@ -158,3 +184,1677 @@ class SprintFlowTests(APITestCase):
         data = {"items": "isso_nao_e_lista"}  # tipo errado
         response = self.client_sm.post(url, data, format="json")
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BacklogImportTests(APITestCase):
+    """
+    Testa a importação de backlog via CSV/NDJSON (endpoint e importador em lotes).
+    """
+
+    CSV = (
+        "Issue Type,Summary,Description,Priority,User Story,Backlog Item,Sprint,Start Date,End Date,Status,Assignee\n"
+        "Sprint,Sprint 1,,,,,,2025-11-10,2025-11-20,,\n"
+        "Story,Login,Como usuário quero entrar,,,,,,,,\n"
+        "Item,Tela de login,Formulário,Highest,Login,,Sprint 1,,,,\n"
+        "Task,Criar formulário,,,,Tela de login,Sprint 1,,,In Progress,Dev@Example.com\n"
+        "Task,Tarefa órfã,,,,Inexistente,Sprint 1,,,,\n"
+        "Bug,Desconhecido,,,,,,,,,\n"
+    )
+
+    def setUp(self):
+        self.po = User.objects.create_user(username="po", email="po@example.com")
+        self.dev = User.objects.create_user(username="dev", email="dev@example.com")
+        self.project = Project.objects.create(name="Projeto Import", owner=self.po)
+        ProjectMembership.objects.create(user=self.po, project=self.project, role="PO")
+        ProjectMembership.objects.create(user=self.dev, project=self.project, role="DEV")
+        self.url = reverse("projects-import-backlog", args=[self.project.id])
+
+    def upload(self, user, content, name="backlog.csv"):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client.post(self.url, {"file": SimpleUploadedFile(name, content.encode())}, format="multipart")
+
+    def test_po_imports_csv_and_gets_row_errors(self):
+        response = self.upload(self.po, self.CSV)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["created"], {"sprint": 1, "story": 1, "item": 1, "task": 1})
+        self.assertEqual(sorted(e["row"] for e in response.data["errors"]), [5, 6])
+
+        item = ProductBacklogItem.objects.get(title="Tela de login")
+        self.assertEqual(item.priority, "HIGH")
+        self.assertEqual(item.sprint.name, "Sprint 1")
+        task = Task.objects.get(backlog_item=item)
+        self.assertEqual((task.status, task.assigned_to), ("IN_PROGRESS", self.dev))
+
+    def test_dev_cannot_import(self):
+        response = self.upload(self.dev, self.CSV)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(UserStory.objects.filter(project=self.project).exists())
+
+    def test_ndjson_references_resolve_across_batches(self):
+        lines = [{"type": "story", "title": "US"}]
+        lines += [{"type": "item", "title": f"PBI {i}", "user_story": "US"} for i in range(5)]
+        content = "\n".join(json.dumps(line) for line in lines)
+
+        importer = BacklogImporter(self.project, self.po, batch_size=2)
+        result = importer.run(iter_records(io.BytesIO(content.encode()), "ndjson"))
+
+        self.assertEqual(result.processed, 6)
+        self.assertEqual(result.error_count, 0)
+        self.assertEqual(ProductBacklogItem.objects.filter(project=self.project).count(), 5)
+
+    def test_failed_batch_reports_each_row_once(self):
+        from unittest import mock
+        from django.db import DatabaseError
+
+        Sprint.objects.create(project=self.project, name="S1", start_date="2025-11-10", end_date="2025-11-20")
+        lines = [
+            {"type": "sprint", "title": "S1", "start_date": "2025-12-01", "end_date": "2025-12-10"},
+            {"type": "story", "title": "US"},
+        ]
+        content = "\n".join(json.dumps(line) for line in lines)
+        errors = []
+        importer = BacklogImporter(self.project, self.po, on_error=lambda row, message: errors.append((row, message)))
+
+        with mock.patch.object(BacklogImporter, "_create_tasks", side_effect=DatabaseError("disco cheio")):
+            result = importer.run(iter_records(io.BytesIO(content.encode()), "ndjson"))
+
+        self.assertEqual([row for row, _ in errors], [1, 2])
+        self.assertIn("Já existe uma sprint", errors[0][1])
+        self.assertIn("disco cheio", errors[1][1])
+        self.assertEqual(result.error_count, 2)
+        self.assertFalse(UserStory.objects.filter(project=self.project).exists())
+
+
+@override_settings(PROJECT_PURGE_IN_BACKGROUND=False)
+class ProjectDeletionTests(APITestCase):
+    """
+    Testa a exclusão de projetos: marcação imediata e remoção em lotes.
+    """
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", email="owner@example.com")
+        self.project = Project.objects.create(name="Projeto Grande", owner=self.owner)
+        ProjectMembership.objects.create(user=self.owner, project=self.project, role="SM")
+        story = UserStory.objects.create(project=self.project, title="US", description="d")
+        sprint = Sprint.objects.create(project=self.project, name="S1", start_date="2025-11-10", end_date="2025-11-20")
+        for i in range(3):
+            item = ProductBacklogItem.objects.create(project=self.project, user_story=story, title=f"I{i}", description="d")
+            Task.objects.create(sprint=sprint, backlog_item=item, description="t")
+        self.client.force_authenticate(user=self.owner)
+
+    def test_delete_hides_project_and_purges_in_batches(self):
+        response = self.client.delete(reverse("projects-detail", args=[self.project.id]))
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["total_rows"], 10)
+        self.assertEqual(self.client.get(reverse("projects-list")).data, [])
+        self.assertTrue(Task.objects.filter(sprint__project=self.project).exists())
+
+        self.assertEqual(purge_pending(batch_size=2), 1)
+
+        self.assertFalse(Project.objects.filter(id=self.project.id).exists())
+        self.assertFalse(Task.objects.exists())
+        self.assertFalse(UserStory.objects.exists())
+        progress = self.client.get(reverse("project-deletion", args=[self.project.id]))
+        self.assertEqual(progress.data["status"], ProjectDeletion.Status.DONE)
+        self.assertEqual(progress.data["progress"], 100)
+
+    def test_deletion_is_claimed_by_one_process(self):
+        from django.core.management import call_command
+        from api.purge import claim_deletion, reclaim_stale
+
+        self.client.delete(reverse("projects-detail", args=[self.project.id]))
+        deletion = ProjectDeletion.objects.get(project_id=self.project.id)
+        self.assertTrue(claim_deletion(deletion))
+        self.assertFalse(claim_deletion(deletion))
+
+        # reservada por outro processo (vivo): fica com ele
+        self.assertEqual(purge_pending(batch_size=2), 0)
+        self.assertEqual(reclaim_stale(), 0)
+        self.assertTrue(Project.objects.filter(id=self.project.id).exists())
+
+        # processo caiu: o comando retoma depois de stale_after
+        ProjectDeletion.objects.filter(pk=deletion.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        call_command("purge_deleted_projects", stdout=io.StringIO())
+        self.assertFalse(Project.objects.filter(id=self.project.id).exists())
+        self.assertEqual(ProjectDeletion.objects.get(pk=deletion.pk).status, ProjectDeletion.Status.DONE)
+
+    def test_worker_rechecks_queue_before_exiting(self):
+        from unittest import mock
+        from api import purge
+
+        original = purge.purge_pending
+        calls = []
+
+        def purge_pending(batch_size):
+            processed = original(batch_size=batch_size)
+            if not calls:
+                # exclusão enfileirada depois de a fila esvaziar, com o worker ainda vivo
+                # (o on_commit não roda no TestCase: schedule_purge não dispara outro)
+                self.client.delete(reverse("projects-detail", args=[self.project.id]))
+            calls.append(processed)
+            return processed
+
+        with mock.patch.object(purge, "purge_pending", purge_pending), mock.patch.object(purge, "connection"):
+            purge._run_worker()
+
+        self.assertEqual(calls, [0, 1])
+        self.assertFalse(Project.objects.filter(id=self.project.id).exists())
+        self.assertIsNone(purge._worker)
+
+    def test_history_rows_are_purged_in_their_own_batches(self):
+        from django.db.models.signals import pre_delete
+
+        sprint = Sprint.objects.get(project=self.project)
+        task = Task.objects.filter(sprint=sprint).first()
+        for _ in range(3):
+            TaskStatusTransition.objects.create(task=task, project=self.project, sprint=sprint, to_status="TODO")
+        SprintBurndown.objects.create(sprint=sprint, day="2025-11-10", todo=3)
+        SprintSnapshot.objects.create(sprint=sprint, project=self.project, sprint_name="S1", start_date="2025-11-10", end_date="2025-11-20")
+
+        response = self.client.delete(reverse("projects-detail", args=[self.project.id]))
+        self.assertEqual(response.data["total_rows"], 15)
+
+        # quando as sprints são apagadas, não sobra histórico para a cascata levar junto
+        left_for_cascade = []
+
+        def receiver(sender, instance, **kwargs):
+            left_for_cascade.append(
+                TaskStatusTransition.objects.filter(sprint=instance).count()
+                + SprintBurndown.objects.filter(sprint=instance).count()
+                + SprintSnapshot.objects.filter(sprint=instance).count()
+            )
+
+        pre_delete.connect(receiver, sender=Sprint)
+        self.addCleanup(pre_delete.disconnect, receiver, sender=Sprint)
+
+        purge_pending(batch_size=2)
+        self.assertEqual(left_for_cascade, [0])
+        for model in (TaskStatusTransition, SprintBurndown, SprintSnapshot):
+            self.assertFalse(model.objects.exists())
+        self.assertEqual(ProjectDeletion.objects.get(project_id=self.project.id).deleted_rows, 15)
+
+
+class ProjectArchiveTests(APITestCase):
+    """
+    Testa o arquivamento de projetos encerrados e a leitura a partir do arquivo.
+    """
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", email="owner@example.com")
+        self.project = Project.objects.create(name="Projeto Antigo", owner=self.owner)
+        ProjectMembership.objects.create(user=self.owner, project=self.project, role="PO")
+        story = UserStory.objects.create(project=self.project, title="US", description="d", created_by=self.owner)
+        self.sprint = Sprint.objects.create(project=self.project, name="S1", start_date="2025-11-10", end_date="2025-11-20")
+        item = ProductBacklogItem.objects.create(project=self.project, user_story=story, title="I", description="d", priority="HIGH")
+        Task.objects.create(sprint=self.sprint, backlog_item=item, description="t", assigned_to=self.owner)
+        self.client.force_authenticate(user=self.owner)
+        self.client.post(reverse("projects-close-project", args=[self.project.id]))
+
+    def nested_urls(self):
+        return [
+            reverse("project-user-stories-list", args=[self.project.id]),
+            reverse("project-backlog-list", args=[self.project.id]),
+            reverse("project-sprints-list", args=[self.project.id]),
+            reverse("sprint-tasks-list", args=[self.project.id, self.sprint.id]),
+        ]
+
+    def test_archive_serves_same_reads_and_restores(self):
+        before = [self.client.get(url).data for url in self.nested_urls()]
+
+        response = self.client.post(reverse("projects-archive-project", args=[self.project.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNotNone(response.data["archived_at"])
+        self.assertFalse(Task.objects.exists())
+        self.assertFalse(UserStory.objects.exists())
+
+        self.assertEqual([self.client.get(url).data for url in self.nested_urls()], before)
+        story_id = before[0][0]["id"]
+        detail = self.client.get(reverse("project-user-stories-detail", args=[self.project.id, story_id]))
+        self.assertEqual(detail.data, before[0][0])
+
+        response = self.client.post(self.nested_urls()[0], {"title": "Nova", "description": "d"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        response = self.client.post(reverse("projects-restore-project", args=[self.project.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Task.objects.count(), 1)
+        self.assertEqual([self.client.get(url).data for url in self.nested_urls()], before)
+
+    def test_restore_archive_without_updated_at(self):
+        # arquivos anteriores ao updated_at de histórias e itens
+        from api.models import ProjectArchive
+        import zlib
+
+        self.client.post(reverse("projects-archive-project", args=[self.project.id]))
+        archive = ProjectArchive.objects.get(project=self.project)
+        rows = json.loads(zlib.decompress(bytes(archive.payload)))
+        for key in ("user_stories", "backlog"):
+            for row in rows[key]:
+                del row["updated_at"]
+        archive.payload = zlib.compress(json.dumps(rows).encode())
+        archive.save()
+
+        response = self.client.post(reverse("projects-restore-project", args=[self.project.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(UserStory.objects.filter(updated_at__isnull=True).exists())
+
+    def test_active_project_cannot_be_archived(self):
+        self.project.status = Project.Status.ACTIVE
+        self.project.save()
+        response = self.client.post(reverse("projects-archive-project", args=[self.project.id]))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_archived_viewset_without_rows_key_fails_clearly(self):
+        from django.core.exceptions import ImproperlyConfigured
+        from api.views import ArchivedProjectMixin
+
+        class IncompleteView(ArchivedProjectMixin):
+            pass
+
+        with self.assertRaisesMessage(ImproperlyConfigured, "IncompleteView precisa definir archived_rows_key"):
+            IncompleteView().get_archived_rows(object())
+
+
+class SprintSnapshotTests(APITestCase):
+    """
+    Testa o snapshot gravado ao encerrar a sprint e o histórico de velocidade.
+    """
+
+    def setUp(self):
+        self.sm = User.objects.create_user(username="sm", email="sm@example.com")
+        self.dev = User.objects.create_user(username="dev", email="dev@example.com")
+        self.project = Project.objects.create(name="Projeto Velocidade", owner=self.sm)
+        ProjectMembership.objects.create(user=self.sm, project=self.project, role="SM")
+        ProjectMembership.objects.create(user=self.dev, project=self.project, role="DEV")
+        self.story = UserStory.objects.create(project=self.project, title="US", description="d")
+        self.client.force_authenticate(user=self.sm)
+
+    def make_sprint(self, name, statuses):
+        sprint = Sprint.objects.create(project=self.project, name=name, start_date="2025-11-10", end_date="2025-11-20")
+        for i, item_statuses in enumerate(statuses):
+            item = ProductBacklogItem.objects.create(
+                project=self.project, user_story=self.story, sprint=sprint, title=f"{name}-{i}", description="d"
+            )
+            for task_status in item_statuses:
+                Task.objects.create(sprint=sprint, backlog_item=item, description="t", status=task_status, assigned_to=self.dev)
+        return sprint
+
+    def end(self, sprint):
+        return self.client.post(reverse("project-sprints-end-sprint", args=[self.project.id, sprint.id]))
+
+    def test_end_sprint_records_snapshot(self):
+        sprint = self.make_sprint("S1", [["DONE", "DONE"], ["DONE", "TODO"], []])
+        self.assertEqual(self.end(sprint).status_code, status.HTTP_200_OK)
+
+        snapshot = SprintSnapshot.objects.get(sprint=sprint)
+        self.assertEqual((snapshot.items_committed, snapshot.items_done), (3, 1))
+        self.assertEqual((snapshot.tasks_todo, snapshot.tasks_in_progress, snapshot.tasks_done), (1, 0, 3))
+        self.assertEqual(snapshot.throughput, [{"user_id": self.dev.id, "username": "dev", "done": 3}])
+        self.assertFalse(ProductBacklogItem.objects.filter(sprint=sprint).exists())
+
+    def test_velocity_reads_snapshots_only(self):
+        self.end(self.make_sprint("S1", [["DONE"]]))
+        self.end(self.make_sprint("S2", [["DONE"], ["DONE"], ["TODO"]]))
+
+        url = reverse("projects-velocity", args=[self.project.id])
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {"sprints": 5})
+        self.assertEqual([s["sprint_name"] for s in response.data["sprints"]], ["S1", "S2"])
+        self.assertEqual(response.data["average_items_done"], 1.5)
+
+
+class BurndownTests(APITestCase):
+    """
+    Testa o histórico de status das tarefas e o burndown incremental.
+    """
+
+    def setUp(self):
+        self.dev = User.objects.create_user(username="dev", email="dev@example.com")
+        self.project = Project.objects.create(name="Projeto Burndown", owner=self.dev)
+        ProjectMembership.objects.create(user=self.dev, project=self.project, role="DEV")
+        story = UserStory.objects.create(project=self.project, title="US", description="d")
+        self.item = ProductBacklogItem.objects.create(project=self.project, user_story=story, title="I", description="d")
+        today = timezone.localdate()
+        self.sprint = Sprint.objects.create(
+            project=self.project, name="S1", start_date=today - timedelta(days=2), end_date=today + timedelta(days=5)
+        )
+        self.tasks_url = reverse("sprint-tasks-list", args=[self.project.id, self.sprint.id])
+        self.client.force_authenticate(user=self.dev)
+
+    def test_task_changes_are_logged_and_rolled_into_burndown(self):
+        ids = [
+            self.client.post(self.tasks_url, {"backlog_item_id": self.item.id, "description": f"t{i}"}, format="json").data["id"]
+            for i in range(3)
+        ]
+        detail = reverse("sprint-tasks-detail", args=[self.project.id, self.sprint.id, ids[0]])
+        self.client.patch(detail, {"status": "DONE"}, format="json")
+        self.client.delete(reverse("sprint-tasks-detail", args=[self.project.id, self.sprint.id, ids[1]]))
+
+        transitions = TaskStatusTransition.objects.filter(sprint=self.sprint).order_by("id")
+        self.assertEqual(
+            [(t.from_status, t.to_status) for t in transitions],
+            [(None, "TODO")] * 3 + [("TODO", "DONE"), ("TODO", None)]
+        )
+
+        response = self.client.get(reverse("project-sprints-burndown", args=[self.project.id, self.sprint.id]))
+        series = response.data["series"]
+        self.assertEqual(len(series), 3)
+        self.assertEqual(series[0]["remaining"], 0)
+        self.assertEqual((series[-1]["todo"], series[-1]["done"], series[-1]["remaining"]), (1, 1, 1))
+
+    def test_tasks_from_before_the_history_are_backfilled(self):
+        import importlib
+        from django.apps import apps
+
+        migration = importlib.import_module("api.migrations.0015_task_status_history")
+        tasks = [
+            Task.objects.create(sprint=self.sprint, project=self.project, backlog_item=self.item, description=f"t{i}")
+            for i in range(2)
+        ]
+        Task.objects.update(created_at=timezone.now() - timedelta(days=1))
+        migration.backfill_history(apps, None)
+        self.assertEqual(TaskStatusTransition.objects.filter(sprint=self.sprint, from_status=None).count(), 2)
+
+        detail = reverse("sprint-tasks-detail", args=[self.project.id, self.sprint.id, tasks[0].id])
+        self.client.patch(detail, {"status": "DONE"}, format="json")
+        response = self.client.get(reverse("project-sprints-burndown", args=[self.project.id, self.sprint.id]))
+        series = response.data["series"]
+        self.assertEqual([row["todo"] for row in series], [0, 2, 1])
+        self.assertEqual((series[-1]["done"], series[-1]["remaining"]), (1, 1))
+
+    def test_task_project_is_denormalized(self):
+        response = self.client.post(self.tasks_url, {"backlog_item_id": self.item.id, "description": "t"}, format="json")
+        task = Task.objects.get(id=response.data["id"])
+        self.assertEqual(task.project_id, self.project.id)
+
+        # a tarefa só é encontrada pela rota do próprio projeto
+        other = Project.objects.create(name="Outro", owner=self.dev)
+        ProjectMembership.objects.create(user=self.dev, project=other, role="DEV")
+        wrong = reverse("sprint-tasks-detail", args=[other.id, self.sprint.id, task.id])
+        self.assertEqual(self.client.get(wrong).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ProjectAnalyticsTests(APITestCase):
+    """
+    Testa o CFD e os percentis de lead/cycle time calculados a partir do histórico.
+    """
+
+    def setUp(self):
+        self.dev = User.objects.create_user(username="dev", email="dev@example.com")
+        self.project = Project.objects.create(name="Projeto Analytics", owner=self.dev)
+        ProjectMembership.objects.create(user=self.dev, project=self.project, role="DEV")
+        story = UserStory.objects.create(project=self.project, title="US", description="d")
+        self.item = ProductBacklogItem.objects.create(project=self.project, user_story=story, title="I", description="d")
+        self.sprint = Sprint.objects.create(project=self.project, name="S1", start_date="2025-11-10", end_date="2025-11-20")
+        self.client.force_authenticate(user=self.dev)
+
+    def log(self, task, moves, start):
+        TaskStatusTransition.objects.bulk_create([
+            TaskStatusTransition(
+                task=task, project=self.project, sprint=self.sprint,
+                from_status=frm, to_status=to, changed_at=start + timedelta(days=day)
+            )
+            for day, frm, to in moves
+        ])
+
+    def test_lead_cycle_and_cfd(self):
+        start = timezone.now() - timedelta(days=10)
+        ProductBacklogItem.objects.filter(id=self.item.id).update(created_at=start - timedelta(days=1))
+        done = Task.objects.create(sprint=self.sprint, backlog_item=self.item, description="a", status="DONE")
+        self.log(done, [(0, None, "TODO"), (1, "TODO", "IN_PROGRESS"), (3, "IN_PROGRESS", "DONE")], start)
+        doing = Task.objects.create(sprint=self.sprint, backlog_item=self.item, description="b", status="IN_PROGRESS")
+        self.log(doing, [(0, None, "TODO"), (2, "TODO", "IN_PROGRESS")], start)
+
+        response = self.client.get(reverse("projects-analytics", args=[self.project.id]), {"days": 30})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        tasks = response.data["tasks"]
+        self.assertEqual(tasks["lead_time_days"]["count"], 1)
+        self.assertAlmostEqual(tasks["lead_time_days"]["p50"], 3.0)
+        self.assertAlmostEqual(tasks["cycle_time_days"]["p50"], 2.0)
+        self.assertEqual(
+            {k: tasks["cfd"][-1][k] for k in ("todo", "in_progress", "done")},
+            {"todo": 0, "in_progress": 1, "done": 1}
+        )
+        self.assertEqual(tasks["wip"][-1]["count"], 1)
+
+        # item só fica pronto quando todas as tarefas terminam
+        self.assertEqual(response.data["backlog_items"]["lead_time_days"]["count"], 0)
+        self.assertEqual(response.data["backlog_items"]["cfd"][-1]["in_progress"], 1)
+
+
+class ForecastTests(APITestCase):
+    """
+    Testa a previsão Monte Carlo baseada nos snapshots das sprints.
+    """
+
+    def setUp(self):
+        self.sm = User.objects.create_user(username="sm", email="sm@example.com")
+        self.project = Project.objects.create(name="Projeto Previsão", owner=self.sm)
+        ProjectMembership.objects.create(user=self.sm, project=self.project, role="SM")
+        story = UserStory.objects.create(project=self.project, title="US", description="d")
+        self.items = [
+            ProductBacklogItem.objects.create(project=self.project, user_story=story, title=f"I{i}", description="d", priority=p)
+            for i, p in enumerate(["HIGH"] * 4 + ["LOW"] * 6)
+        ]
+        self.url = reverse("projects-forecast", args=[self.project.id])
+        self.client.force_authenticate(user=self.sm)
+
+    def snapshot(self, name, done_items):
+        sprint = Sprint.objects.create(project=self.project, name=name, start_date="2025-11-01", end_date="2025-11-14", status="COMPLETED")
+        SprintSnapshot.objects.create(
+            sprint=sprint, project=self.project, sprint_name=name,
+            start_date=sprint.start_date, end_date=sprint.end_date,
+            items_done=len(done_items), done_item_ids=[item.id for item in done_items],
+        )
+
+    def test_requires_history(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_constant_throughput_gives_exact_forecast(self):
+        self.snapshot("S1", self.items[:2])
+        self.snapshot("S2", self.items[2:4])
+
+        response = self.client.get(self.url, {"simulations": 1000})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["remaining_items"], 6)
+        self.assertEqual(response.data["sprint_length_days"], 14)
+        self.assertEqual([f["sprints"] for f in response.data["forecast"]], [3, 3, 3])
+
+        response = self.client.get(self.url, {"priority": "HIGH"})
+        self.assertEqual(response.data["remaining_items"], 0)
+        self.assertEqual(response.data["forecast"], [])
+
+    def test_simulation_batches_cover_all_runs(self):
+        needed = simulate_sprints_needed([0, 1, 2], 10, 12000, np.random.default_rng(0))
+        self.assertEqual(needed.shape, (12000,))
+        self.assertTrue((needed >= 5).all())
+
+
+class MyTasksTests(APITestCase):
+    """
+    Testa a listagem de tarefas do usuário em todos os projetos.
+    """
+
+    def setUp(self):
+        self.dev = User.objects.create_user(username="dev", email="dev@example.com")
+        other = User.objects.create_user(username="other", email="other@example.com")
+        for p in range(2):
+            project = Project.objects.create(name=f"Projeto {p}", owner=self.dev)
+            story = UserStory.objects.create(project=project, title="US", description="d")
+            item = ProductBacklogItem.objects.create(project=project, user_story=story, title=f"Item {p}", description="d")
+            sprint = Sprint.objects.create(project=project, name=f"Sprint {p}", start_date="2025-11-10", end_date="2025-11-20")
+            for i in range(3):
+                Task.objects.create(sprint=sprint, backlog_item=item, description=f"t{p}{i}", assigned_to=self.dev,
+                                    status="DONE" if i == 0 else "TODO")
+            Task.objects.create(sprint=sprint, backlog_item=item, description="alheia", assigned_to=other)
+        self.url = reverse("my-tasks")
+        self.client.force_authenticate(user=self.dev)
+
+    def test_keyset_pagination_across_projects(self):
+        seen = []
+        cursor = None
+        while True:
+            params = {"limit": 4, **({"cursor": cursor} if cursor else {})}
+            with self.assertNumQueries(1):
+                response = self.client.get(self.url, params)
+            seen += response.data["results"]
+            cursor = response.data["next_cursor"]
+            if not cursor:
+                break
+        self.assertEqual(len(seen), 6)
+        self.assertEqual(len({t["id"] for t in seen}), 6)
+        self.assertEqual({t["project_name"] for t in seen}, {"Projeto 0", "Projeto 1"})
+        self.assertIn("sprint_name", seen[0])
+
+    def test_status_filter(self):
+        response = self.client.get(self.url, {"status": "done"})
+        self.assertEqual(sorted(t["description"] for t in response.data["results"]), ["t00", "t10"])
+
+
+class ProjectSummaryTests(APITestCase):
+    """
+    Testa o resumo de portfólio: número fixo de consultas para qualquer quantidade de projetos.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="po", email="po@example.com")
+        self.client.force_authenticate(user=self.user)
+
+    def make_project(self, name):
+        project = Project.objects.create(name=name, owner=self.user)
+        ProjectMembership.objects.create(user=self.user, project=project, role="PO")
+        story = UserStory.objects.create(project=project, title="US", description="d")
+        item = ProductBacklogItem.objects.create(project=project, user_story=story, title="I", description="d", priority="HIGH")
+        ProductBacklogItem.objects.create(project=project, user_story=story, title="J", description="d", priority="LOW")
+        today = timezone.localdate()
+        sprint = Sprint.objects.create(project=project, name="Atual", start_date=today, end_date=today + timedelta(days=7))
+        Task.objects.create(sprint=sprint, backlog_item=item, description="t", status="DONE")
+        return project
+
+    def test_constant_queries(self):
+        url = reverse("projects-summary")
+        self.make_project("A")
+        with self.assertNumQueries(5):
+            self.client.get(url)
+
+        for name in "BCDE":
+            self.make_project(name)
+        with self.assertNumQueries(5):
+            response = self.client.get(url)
+
+        self.assertEqual(len(response.data), 5)
+        entry = response.data[0]
+        self.assertEqual(entry["backlog"], {"HIGH": 1, "MEDIUM": 0, "LOW": 1, "total": 2})
+        self.assertEqual(entry["tasks"]["DONE"], 1)
+        self.assertEqual(entry["active_sprint"]["name"], "Atual")
+
+
+class CounterTests(APITestCase):
+    """
+    Testa os contadores denormalizados de Project/Sprint e a reconciliação.
+    """
+
+    def setUp(self):
+        self.sm = User.objects.create_user(username="sm", email="sm@example.com")
+        self.po = User.objects.create_user(username="po", email="po@example.com")
+        self.dev = User.objects.create_user(username="dev", email="dev@example.com")
+        self.client.force_authenticate(user=self.sm)
+        response = self.client.post(reverse("projects-list"), {"name": "Projeto Contadores", "description": "d"}, format="json")
+        self.project = Project.objects.get(id=response.data["id"])
+        for email, role in (("po@example.com", "PO"), ("dev@example.com", "DEV")):
+            self.client.post(reverse("add-member", args=[self.project.id]), {"email": email, "role": role}, format="json")
+        self.story = UserStory.objects.create(project=self.project, title="US", description="d")
+        self.sprint = Sprint.objects.create(project=self.project, name="S1", start_date="2025-11-10", end_date="2025-11-20")
+
+    def counts(self, obj, *fields):
+        obj.refresh_from_db()
+        return tuple(getattr(obj, f) for f in fields)
+
+    def test_counters_follow_writes(self):
+        self.client.force_authenticate(user=self.po)
+        items_url = reverse("project-backlog-list", args=[self.project.id])
+        item_ids = [
+            self.client.post(items_url, {"user_story_id": self.story.id, "title": f"I{i}", "description": "d"}, format="json").data["id"]
+            for i in range(3)
+        ]
+        self.assertEqual(self.counts(self.project, "backlog_count", "member_count"), (3, 3))
+
+        self.client.force_authenticate(user=self.sm)
+        self.client.post(reverse("project-sprints-add-items", args=[self.project.id, self.sprint.id]), {"items": item_ids[:2]}, format="json")
+        self.assertEqual(self.counts(self.sprint, "item_count"), (2,))
+
+        self.client.force_authenticate(user=self.dev)
+        tasks_url = reverse("sprint-tasks-list", args=[self.project.id, self.sprint.id])
+        task_ids = [
+            self.client.post(tasks_url, {"backlog_item_id": item_ids[0], "description": f"t{i}"}, format="json").data["id"]
+            for i in range(3)
+        ]
+        self.client.patch(reverse("sprint-tasks-detail", args=[self.project.id, self.sprint.id, task_ids[0]]), {"status": "DONE"}, format="json")
+        self.client.delete(reverse("sprint-tasks-detail", args=[self.project.id, self.sprint.id, task_ids[1]]))
+        self.assertEqual(self.counts(self.project, "open_task_count", "done_task_count"), (1, 1))
+        self.assertEqual(self.counts(self.sprint, "open_task_count", "done_task_count"), (1, 1))
+
+        self.client.force_authenticate(user=self.po)
+        self.assertEqual(self.client.delete(reverse("project-backlog-detail", args=[self.project.id, item_ids[0]])).status_code, 204)
+        self.assertEqual(self.counts(self.project, "backlog_count", "open_task_count", "done_task_count"), (2, 0, 0))
+        self.assertEqual(self.counts(self.sprint, "item_count"), (1,))
+
+        self.client.force_authenticate(user=self.sm)
+        self.client.post(reverse("project-sprints-end-sprint", args=[self.project.id, self.sprint.id]))
+        self.assertEqual(self.counts(self.sprint, "item_count"), (0,))
+
+        self.assertEqual(reconcile([self.project.id]), [])
+        response = self.client.get(reverse("projects-detail", args=[self.project.id]))
+        self.assertEqual(response.data["backlog_count"], 2)
+
+    def test_reconcile_repairs_drift(self):
+        Project.objects.filter(id=self.project.id).update(backlog_count=7)
+        drift = reconcile([self.project.id], fix=True)
+        self.assertEqual(drift, [("Project", self.project.id, "backlog_count", 7, 0)])
+        self.assertEqual(reconcile([self.project.id]), [])
+
+
+class StoryTreeTests(APITestCase):
+    """
+    Testa a árvore de progresso história → itens → tarefas.
+    """
+
+    def setUp(self):
+        self.po = User.objects.create_user(username="po", email="po@example.com")
+        self.project = Project.objects.create(name="Projeto Árvore", owner=self.po)
+        ProjectMembership.objects.create(user=self.po, project=self.project, role="PO")
+        self.sprint = Sprint.objects.create(project=self.project, name="S1", start_date="2025-11-10", end_date="2025-11-20")
+        self.url = reverse("project-user-stories-tree", args=[self.project.id])
+        self.client.force_authenticate(user=self.po)
+
+    def make_story(self, title, items):
+        story = UserStory.objects.create(project=self.project, title=title, description="d")
+        for i, statuses in enumerate(items):
+            item = ProductBacklogItem.objects.create(project=self.project, user_story=story, title=f"{title}-{i}", description="d")
+            for task_status in statuses:
+                Task.objects.create(sprint=self.sprint, backlog_item=item, description="t", status=task_status)
+        return story
+
+    def test_rollup_at_every_level(self):
+        self.make_story("A", [["DONE", "DONE"], ["DONE", "TODO"]])
+        self.make_story("B", [["IN_PROGRESS"], []])
+        self.make_story("C", [])
+
+        with self.assertNumQueries(5):  # projeto, membro + 3 consultas da árvore
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["tasks"], {"TODO": 1, "IN_PROGRESS": 1, "DONE": 3, "total": 5})
+        self.assertEqual(response.data["percent_complete"], 60.0)
+
+        a, b, c = response.data["user_stories"]
+        self.assertEqual(a["percent_complete"], 75.0)
+        self.assertEqual([i["percent_complete"] for i in a["backlog_items"]], [100.0, 50.0])
+        self.assertEqual(b["tasks"]["IN_PROGRESS"], 1)
+        self.assertEqual(b["backlog_items"][1]["tasks"]["total"], 0)
+        self.assertEqual((c["percent_complete"], c["backlog_items"]), (0.0, []))
+
+    def test_non_member_is_denied(self):
+        self.client.force_authenticate(user=User.objects.create_user(username="x", email="x@example.com"))
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ProjectListingTests(APITestCase):
+    """
+    Testa a regra de visibilidade da listagem de projetos (dono ou membro).
+    """
+
+    def test_lists_owned_and_member_projects_once(self):
+        user = User.objects.create_user(username="u", email="u@example.com")
+        other = User.objects.create_user(username="o", email="o@example.com")
+        owned = Project.objects.create(name="Dono e membro", owner=user)
+        ProjectMembership.objects.create(user=user, project=owned, role="SM")
+        owned_only = Project.objects.create(name="Só dono", owner=user)
+        member = Project.objects.create(name="Só membro", owner=other)
+        ProjectMembership.objects.create(user=user, project=member, role="DEV")
+        Project.objects.create(name="Alheio", owner=other)
+        Project.objects.create(name="Em exclusão", owner=user, status=Project.Status.DELETING)
+
+        self.client.force_authenticate(user=user)
+        response = self.client.get(reverse("projects-list"))
+        self.assertEqual(sorted(p["id"] for p in response.data), sorted([owned.id, owned_only.id, member.id]))
+
+
+@skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN é específico do SQLite")
+class QueryPlanTests(TestCase):
+    """
+    As consultas quentes das rotas aninhadas precisam usar índice: falha se o
+    SQLite varrer a tabela inteira (SCAN) ou ordenar num B-tree temporário.
+    """
+
+    def plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertUsesIndex(self, queryset):
+        steps = self.plan(queryset)
+        bad = [s for s in steps if s.startswith("SCAN") or "TEMP B-TREE" in s]
+        self.assertFalse(bad, f"plano sem índice: {steps}")
+
+    def test_hot_queries_use_indexes(self):
+        today = timezone.localdate()
+        user = User(pk=1)
+        queries = {
+            # checagens de papel (todas as views)
+            "membership": ProjectMembership.objects.filter(user_id=1, project_id=1, role="SM"),
+            # UserStoryViewSet.get_queryset
+            "stories": UserStory.objects.filter(project_id=1).order_by("created_at"),
+            # SprintViewSet.get_queryset
+            "sprints": Sprint.objects.filter(project_id=1).order_by("-created_at"),
+            # SprintViewSet.active_sprints
+            "active sprints": Sprint.objects.filter(project_id=1, start_date__lte=today, end_date__gte=today).exclude(status="COMPLETED"),
+            # ProjectViewSet.summary (sprint ativa de cada projeto)
+            "summary sprints": Sprint.objects.filter(project_id__in=[1, 2], start_date__lte=today, end_date__gte=today)
+                .exclude(status="COMPLETED").order_by("project_id", "-start_date").values("id", "project_id"),
+            # SprintViewSet.add_items
+            "free backlog": ProductBacklogItem.objects.filter(id__in=[1, 2], project_id=1, sprint__isnull=True),
+            "unplanned backlog": ProductBacklogItem.objects.filter(project_id=1, sprint__isnull=True),
+            # ProductBacklogItemViewSet.get_queryset (HIGH -> MEDIUM -> LOW, mais recentes primeiro)
+            "backlog": ProductBacklogItem.objects.filter(project_id=1).order_by("priority_rank", "-created_at"),
+            # TaskViewSet.get_queryset
+            "tasks": Task.objects.filter(sprint_id=1).order_by("-created_at"),
+            # my_tasks_view: sem status (padrão), um status, vários e páginas seguintes
+            "my tasks": my_tasks_queryset(user, [])[:51],
+            "my tasks one status": my_tasks_queryset(user, ["TODO"])[:51],
+            "my tasks many statuses": my_tasks_queryset(user, ["TODO", "IN_PROGRESS"])[:51],
+            "my tasks next page": my_tasks_queryset(user, [], (timezone.now(), 10))[:51],
+        }
+        for name, queryset in queries.items():
+            with self.subTest(name):
+                self.assertUsesIndex(queryset)
+
+
+# Consultas por endpoint de escrita (inclui SAVEPOINT/RELEASE das transações).
+# Se um número subir, algum objeto relacionado voltou a ser buscado duas vezes.
+WRITE_QUERY_BUDGETS = {
+    "project_create": 9,
+    "story_create": 3,
+    "story_update": 4,
+    "story_delete": 23,
+    "item_create": 7,
+    "item_create_in_sprint": 9,
+    "item_update": 9,
+    "item_delete": 20,
+    "sprint_create": 4,
+    "sprint_update": 4,
+    "sprint_add_items": 7,
+    "sprint_end": 16,
+    "task_create": 19,
+    "task_update": 18,
+    "task_delete": 17,
+    "member_add": 8,
+    "member_remove": 7,
+}
+
+
+class WriteQueryBudgetTests(APITestCase):
+    """
+    Cada endpoint de escrita tem um orçamento fixo de consultas (WRITE_QUERY_BUDGETS).
+    """
+
+    def setUp(self):
+        self.po = User.objects.create_user(username="po", email="po@example.com")
+        self.sm = User.objects.create_user(username="sm", email="sm@example.com")
+        self.dev = User.objects.create_user(username="dev", email="dev@example.com")
+        self.project = Project.objects.create(name="Projeto Orçamento", owner=self.sm)
+        for user, role in ((self.po, "PO"), (self.sm, "SM"), (self.dev, "DEV")):
+            ProjectMembership.objects.create(user=user, project=self.project, role=role)
+        self.story = UserStory.objects.create(project=self.project, title="US", description="d")
+        self.sprint = Sprint.objects.create(project=self.project, name="S1", start_date="2025-11-10", end_date="2025-11-20")
+        self.item = ProductBacklogItem.objects.create(project=self.project, user_story=self.story, title="I", description="d")
+        self.task = Task.objects.create(sprint=self.sprint, backlog_item=self.item, description="t")
+
+    def assertBudget(self, name, user, method, url, data=None):
+        self.client.force_authenticate(user=user)
+        with self.assertNumQueries(WRITE_QUERY_BUDGETS[name]):
+            response = getattr(self.client, method)(url, data, format="json")
+        self.assertLess(response.status_code, 300, response.data)
+
+    def url(self, name, *args):
+        return reverse(name, args=[self.project.id, *args])
+
+    def test_project_create(self):
+        self.assertBudget("project_create", self.sm, "post", reverse("projects-list"), {"name": "Novo", "description": "d"})
+
+    def test_story_create(self):
+        self.assertBudget("story_create", self.po, "post", self.url("project-user-stories-list"), {"title": "t", "description": "d"})
+
+    def test_story_update(self):
+        url = self.url("project-user-stories-detail", self.story.id)
+        self.assertBudget("story_update", self.po, "put", url, {"title": "t2", "description": "d"})
+
+    def test_story_delete(self):
+        self.assertBudget("story_delete", self.po, "delete", self.url("project-user-stories-detail", self.story.id))
+
+    def test_item_create(self):
+        data = {"user_story_id": self.story.id, "title": "x", "description": "d"}
+        self.assertBudget("item_create", self.po, "post", self.url("project-backlog-list"), data)
+
+    def test_item_create_in_sprint(self):
+        data = {"user_story_id": self.story.id, "title": "x", "description": "d", "sprint_id": self.sprint.id}
+        self.assertBudget("item_create_in_sprint", self.po, "post", self.url("project-backlog-list"), data)
+
+    def test_item_update(self):
+        data = {"user_story_id": self.story.id, "title": "y", "sprint_id": self.sprint.id}
+        self.assertBudget("item_update", self.po, "patch", self.url("project-backlog-detail", self.item.id), data)
+
+    def test_item_delete(self):
+        self.assertBudget("item_delete", self.po, "delete", self.url("project-backlog-detail", self.item.id))
+
+    def test_sprint_create(self):
+        data = {"name": "S2", "start_date": "2025-12-01", "end_date": "2025-12-10"}
+        self.assertBudget("sprint_create", self.sm, "post", self.url("project-sprints-list"), data)
+
+    def test_sprint_update(self):
+        self.assertBudget("sprint_update", self.sm, "patch", self.url("project-sprints-detail", self.sprint.id), {"objective": "o"})
+
+    def test_sprint_add_items(self):
+        url = self.url("project-sprints-add-items", self.sprint.id)
+        self.assertBudget("sprint_add_items", self.sm, "post", url, {"items": [self.item.id]})
+
+    def test_sprint_end(self):
+        self.assertBudget("sprint_end", self.sm, "post", self.url("project-sprints-end-sprint", self.sprint.id))
+
+    def test_task_create(self):
+        data = {"backlog_item_id": self.item.id, "description": "t", "assigned_to_id": self.dev.id}
+        self.assertBudget("task_create", self.dev, "post", self.url("sprint-tasks-list", self.sprint.id), data)
+
+    def test_task_update(self):
+        url = self.url("sprint-tasks-detail", self.sprint.id, self.task.id)
+        self.assertBudget("task_update", self.dev, "patch", url, {"status": "DONE", "assigned_to_id": self.dev.id})
+
+    def test_task_delete(self):
+        self.assertBudget("task_delete", self.dev, "delete", self.url("sprint-tasks-detail", self.sprint.id, self.task.id))
+
+    def test_member_add(self):
+        User.objects.create_user(username="novo", email="novo@example.com")
+        url = reverse("add-member", args=[self.project.id])
+        self.assertBudget("member_add", self.sm, "post", url, {"email": "novo@example.com", "role": "DEV"})
+
+    def test_member_remove(self):
+        url = reverse("remove-member", args=[self.project.id])
+        self.assertBudget("member_remove", self.sm, "post", url, {"user_id": self.dev.id})
+
+
+class RenderingTests(APITestCase):
+    """
+    Renderer/parser orjson e compressão negociada das respostas.
+    """
+
+    def setUp(self):
+        self.po = User.objects.create_user(username="po", email="po@example.com")
+        self.project = Project.objects.create(name="Projeto JSON", owner=self.po)
+        ProjectMembership.objects.create(user=self.po, project=self.project, role="PO")
+        UserStory.objects.bulk_create([
+            UserStory(project=self.project, title=f"História {i}", description="descrição " * 20) for i in range(50)
+        ])
+        self.client.force_authenticate(user=self.po)
+        self.url = reverse("project-user-stories-list", args=[self.project.id])
+
+    def test_renderer_matches_drf_json(self):
+        from django.utils.translation import gettext_lazy
+
+        data = {
+            "quando": timezone.now(),
+            "dia": timezone.localdate(),
+            "valor": Decimal("1.50"),
+            "duracao": timedelta(hours=1),
+            "texto": gettext_lazy("ação"),
+            "lista": (1, 2),
+            "numpy": np.int64(3),
+        }
+        expected = json.loads(JSONRenderer().render({k: v for k, v in data.items() if k != "numpy"}))
+        rendered = json.loads(ORJSONRenderer().render(data))
+        self.assertEqual(rendered, {**expected, "numpy": 3})
+        self.assertTrue(rendered["quando"].endswith("Z"))
+
+    def test_list_is_rendered_with_orjson(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(response.accepted_renderer, ORJSONRenderer)
+        self.assertEqual(json.loads(response.content), json.loads(JSONRenderer().render(response.data)))
+
+    def test_invalid_json_body(self):
+        response = self.client.post(self.url, data=b"{nao e json", content_type="application/json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_negotiate_encoding(self):
+        self.assertEqual(negotiate_encoding("gzip"), "gzip")
+        self.assertEqual(negotiate_encoding("gzip;q=0, deflate"), None)
+        self.assertEqual(negotiate_encoding(""), None)
+        if brotli is not None:
+            self.assertEqual(negotiate_encoding("gzip, deflate, br"), "br")
+            self.assertEqual(negotiate_encoding("br;q=0.5, gzip"), "gzip")
+            self.assertEqual(negotiate_encoding("*"), "br")
+
+    def test_gzip_response(self):
+        plain = self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertLess(len(response.content), len(plain.content))
+        self.assertFalse(plain.has_header("Content-Encoding"))
+
+    @skipUnless(brotli is not None, "brotli não instalado")
+    def test_brotli_response(self):
+        plain = self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip, deflate, br")
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(brotli.decompress(response.content), plain.content)
+
+    @override_settings(RESPONSE_COMPRESSION_MIN_LENGTH=10 ** 9)
+    def test_small_response_is_not_compressed(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+
+class MessagePackTests(APITestCase):
+    """
+    application/msgpack: mesmos dados da representação JSON, nos dois sentidos.
+    """
+
+    def setUp(self):
+        self.po = User.objects.create_user(username="po", email="po@example.com")
+        self.dev = User.objects.create_user(username="dev", email="dev@example.com")
+        self.project = Project.objects.create(name="Projeto msgpack", owner=self.po)
+        ProjectMembership.objects.create(user=self.po, project=self.project, role="PO")
+        ProjectMembership.objects.create(user=self.dev, project=self.project, role="DEV")
+        self.story = UserStory.objects.create(project=self.project, title="US", description="ação", created_by=self.po)
+        self.sprint = Sprint.objects.create(project=self.project, name="S1", start_date="2025-11-10", end_date="2025-11-20")
+        self.item = ProductBacklogItem.objects.create(
+            project=self.project, user_story=self.story, title="Item", description="d", sprint=self.sprint
+        )
+        Task.objects.create(sprint=self.sprint, backlog_item=self.item, description="t", assigned_to=self.dev)
+        self.client.force_authenticate(user=self.po)
+
+    def get_both(self, url):
+        as_json = self.client.get(url, HTTP_ACCEPT="application/json")
+        as_msgpack = self.client.get(url, HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(as_msgpack.status_code, status.HTTP_200_OK)
+        self.assertEqual(as_msgpack["Content-Type"], "application/msgpack")
+        return json.loads(as_json.content), msgpack.unpackb(as_msgpack.content)
+
+    def test_lists_match_json(self):
+        for url in (
+            reverse("projects-list"),
+            reverse("project-user-stories-list", args=[self.project.id]),
+            reverse("project-backlog-list", args=[self.project.id]),
+            reverse("project-sprints-list", args=[self.project.id]),
+            reverse("sprint-tasks-list", args=[self.project.id, self.sprint.id]),
+        ):
+            with self.subTest(url=url):
+                from_json, from_msgpack = self.get_both(url)
+                self.assertTrue(from_json)
+                self.assertEqual(from_msgpack, from_json)
+
+    def test_renderer_round_trip(self):
+        data = {"quando": timezone.now(), "valor": Decimal("2.5"), "lista": (1, "a", None), "dia": timezone.localdate()}
+        self.assertEqual(
+            msgpack.unpackb(MessagePackRenderer().render(data)),
+            json.loads(ORJSONRenderer().render(data)),
+        )
+
+    def test_msgpack_request_body(self):
+        url = reverse("project-user-stories-list", args=[self.project.id])
+        body = msgpack.packb({"title": "Via msgpack", "description": "ção"})
+        response = self.client.post(url, data=body, content_type="application/msgpack", HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        created = msgpack.unpackb(response.content)
+        self.assertEqual(created["title"], "Via msgpack")
+        self.assertEqual(UserStory.objects.get(id=created["id"]).description, "ção")
+
+    def test_invalid_msgpack_body(self):
+        url = reverse("project-user-stories-list", args=[self.project.id])
+        response = self.client.post(url, data=b"\xc1", content_type="application/msgpack")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class FastListTests(APITestCase):
+    """
+    O list dos viewsets monta a resposta de values_list (api.fastlists); a
+    saída tem que ser idêntica à dos serializers, inclusive relações nulas.
+    """
+
+    def setUp(self):
+        self.po = User.objects.create_user(username="po", email="po@example.com", bio="Product Owner")
+        self.dev = User.objects.create_user(username="dev", email="dev@example.com")
+        self.project = Project.objects.create(name="Projeto listas", owner=self.po)
+        ProjectMembership.objects.create(user=self.po, project=self.project, role="PO")
+        ProjectMembership.objects.create(user=self.dev, project=self.project, role="DEV")
+        self.sprint = Sprint.objects.create(
+            project=self.project, name="S1", start_date="2025-11-10", end_date="2025-11-20", objective="Entregar"
+        )
+        Sprint.objects.create(project=self.project, name="S2", start_date="2025-11-21", end_date="2025-11-30")
+
+        with_author = UserStory.objects.create(project=self.project, title="Com autor", description="d", created_by=self.po)
+        without_author = UserStory.objects.create(
+            project=self.project, title="Sem autor", description="d", acceptance_criteria="critérios"
+        )
+        items = [
+            ProductBacklogItem.objects.create(
+                project=self.project, user_story=with_author, title="Alta", description="d", priority="HIGH",
+                sprint=self.sprint, created_by=self.po,
+            ),
+            ProductBacklogItem.objects.create(
+                project=self.project, user_story=without_author, title="Baixa", description="d", priority="LOW"
+            ),
+        ]
+        for i, item in enumerate(items):
+            Task.objects.create(sprint=self.sprint, backlog_item=item, description=f"t{i}", assigned_to=self.dev, created_by=self.dev)
+            Task.objects.create(sprint=self.sprint, backlog_item=item, description=f"livre{i}", status="DONE")
+        fragment_cache.clear()
+        self.client.force_authenticate(user=self.po)
+
+    def cases(self):
+        # (url, queryset equivalente, serializer, consultas com cache de fragmentos frio/quente)
+        return (
+            (reverse("project-user-stories-list", args=[self.project.id]), UserStory.objects.filter(project=self.project).order_by("created_at"), UserStorySerializer, (4, 3)),
+            (reverse("project-backlog-list", args=[self.project.id]), ProductBacklogItem.objects.filter(project=self.project).order_by("priority", "id"), ProductBacklogItemSerializer, (5, 3)),
+            (reverse("project-sprints-list", args=[self.project.id]), Sprint.objects.filter(project=self.project).order_by("-created_at"), SprintSerializer, (3, 3)),
+            (reverse("sprint-tasks-list", args=[self.project.id, self.sprint.id]), Task.objects.filter(sprint=self.sprint).order_by("id"), TaskSerializer, (3, 1)),
+        )
+
+    def test_same_output_as_serializers(self):
+        for _, queryset, serializer_class, _ in self.cases():
+            with self.subTest(serializer=serializer_class.__name__):
+                expected = serializer_class(queryset, many=True).data
+                fast = serialize_values(queryset, serializer_class)
+                self.assertEqual(serialize_values(queryset, serializer_class), fast)  # agora do cache
+                self.assertEqual(fast, json.loads(json.dumps(expected)))
+                # mesmos bytes no JSON, inclusive a ordem das chaves
+                self.assertEqual(ORJSONRenderer().render(fast), ORJSONRenderer().render(expected))
+
+    def test_list_endpoints_use_values(self):
+        for url, queryset, serializer_class, (cold, warm) in self.cases():
+            with self.subTest(url=url):
+                # projeto + membership (exceto tarefas, que checam no JOIN) + a listagem, sem N+1;
+                # com o cache frio, mais uma busca por modelo em cache (história, item)
+                fragment_cache.clear()
+                with self.assertNumQueries(cold):
+                    self.client.get(url)
+                with self.assertNumQueries(warm):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(len(response.data), queryset.count())
+                expected = serializer_class(queryset, many=True).data
+                self.assertEqual(sorted(response.data, key=lambda r: r["id"]), sorted(expected, key=lambda r: r["id"]))
+
+    def test_backlog_keeps_priority_order(self):
+        response = self.client.get(reverse("project-backlog-list", args=[self.project.id]))
+        self.assertEqual([item["priority"] for item in response.data], ["HIGH", "LOW"])
+
+
+class StreamingListTests(APITestCase):
+    """
+    ?stream=1 devolve o mesmo array JSON do list normal, em lotes.
+    """
+
+    def setUp(self):
+        self.po = User.objects.create_user(username="po", email="po@example.com")
+        self.project = Project.objects.create(name="Projeto stream", owner=self.po)
+        ProjectMembership.objects.create(user=self.po, project=self.project, role="PO")
+        story = UserStory.objects.create(project=self.project, title="US", description="d", created_by=self.po)
+        ProductBacklogItem.objects.bulk_create([
+            ProductBacklogItem(project=self.project, user_story=story, title=f"Item {i}", description="d", created_by=self.po)
+            for i in range(7)
+        ])
+        self.client.force_authenticate(user=self.po)
+        self.url = reverse("project-backlog-list", args=[self.project.id])
+
+    @override_settings(LIST_STREAM_CHUNK_SIZE=3)
+    def test_stream_matches_regular_list(self):
+        regular = self.client.get(self.url)
+        response = self.client.get(self.url, {"stream": "1"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/json")
+        chunks = list(response.streaming_content)
+        # '[' + 3 lotes (3, 3, 1) + ']'
+        self.assertEqual(len(chunks), 5)
+        self.assertEqual(b"".join(chunks), regular.content)
+
+    def test_empty_stream(self):
+        ProductBacklogItem.objects.all().delete()
+        response = self.client.get(self.url, {"stream": "true"})
+        self.assertEqual(b"".join(response.streaming_content), b"[]")
+
+    def test_stream_checks_permissions_before_streaming(self):
+        outsider = User.objects.create_user(username="fora", email="fora@example.com")
+        self.client.force_authenticate(user=outsider)
+        response = self.client.get(self.url, {"stream": "1"})
+        self.assertEqual(b"".join(response.streaming_content), b"[]")
+
+        response = self.client.get(reverse("project-backlog-list", args=[9999]), {"stream": "1"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_msgpack_is_not_streamed(self):
+        response = self.client.get(self.url, {"stream": "1"}, HTTP_ACCEPT="application/msgpack")
+        self.assertFalse(response.streaming)
+        self.assertEqual(len(msgpack.unpackb(response.content)), 7)
+
+    def test_stream_is_compressed(self):
+        response = self.client.get(self.url, {"stream": "1"}, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        body = gzip.decompress(b"".join(response.streaming_content))
+        self.assertEqual(len(json.loads(body)), 7)
+
+
+class FragmentCacheTests(APITestCase):
+    """
+    Fragmentos de histórias e itens reaproveitados entre listagens, com a
+    versão (updated_at) na chave e tamanho limitado.
+    """
+
+    def setUp(self):
+        self.po = User.objects.create_user(username="po", email="po@example.com")
+        self.dev = User.objects.create_user(username="dev", email="dev@example.com")
+        self.project = Project.objects.create(name="Projeto fragmentos", owner=self.po)
+        ProjectMembership.objects.create(user=self.po, project=self.project, role="PO")
+        ProjectMembership.objects.create(user=self.dev, project=self.project, role="DEV")
+        self.story = UserStory.objects.create(project=self.project, title="Original", description="d", created_by=self.po)
+        self.sprint = Sprint.objects.create(project=self.project, name="S1", start_date="2025-11-10", end_date="2025-11-20")
+        self.item = ProductBacklogItem.objects.create(project=self.project, user_story=self.story, title="Item", description="d")
+        for i in range(3):
+            Task.objects.create(sprint=self.sprint, backlog_item=self.item, description=f"t{i}")
+        fragment_cache.clear()
+        self.tasks_url = reverse("sprint-tasks-list", args=[self.project.id, self.sprint.id])
+
+    def test_nested_fragments_are_shared(self):
+        self.client.force_authenticate(user=self.dev)
+        self.client.get(self.tasks_url)
+        # 3 tarefas com o mesmo item e a mesma história: um fragmento de cada
+        self.assertEqual(fragment_cache.stats()["entries"], 2)
+        self.client.get(self.tasks_url)
+        stats = fragment_cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 2))
+        self.assertEqual(stats["hit_ratio"], 0.5)
+
+    def test_updated_row_is_serialized_again(self):
+        self.client.force_authenticate(user=self.dev)
+        self.client.get(self.tasks_url)
+
+        self.client.force_authenticate(user=self.po)
+        url = reverse("project-user-stories-detail", args=[self.project.id, self.story.id])
+        self.client.put(url, {"title": "Nova", "description": "d"}, format="json")
+
+        self.client.force_authenticate(user=self.dev)
+        response = self.client.get(self.tasks_url)
+        self.assertEqual({t["backlog_item"]["user_story"]["title"] for t in response.data}, {"Nova"})
+
+    def test_bulk_sprint_moves_are_not_cached(self):
+        self.client.force_authenticate(user=self.po)
+        backlog_url = reverse("project-backlog-list", args=[self.project.id])
+        self.assertIsNone(self.client.get(backlog_url).data[0]["sprint"])
+        # UPDATE em massa, sem passar pelo updated_at
+        ProductBacklogItem.objects.update(sprint=self.sprint)
+        self.assertEqual(self.client.get(backlog_url).data[0]["sprint"], self.sprint.id)
+
+    @override_settings(FRAGMENT_CACHE_MAX_ENTRIES=2)
+    def test_lru_is_bounded(self):
+        UserStory.objects.bulk_create([
+            UserStory(project=self.project, title=f"US {i}", description="d") for i in range(4)
+        ])
+        self.client.force_authenticate(user=self.po)
+        response = self.client.get(reverse("project-user-stories-list", args=[self.project.id]))
+        self.assertEqual(len(response.data), 5)
+        stats = fragment_cache.stats()
+        self.assertEqual(stats["entries"], 2)
+        self.assertEqual(stats["evictions"], 3)
+
+    def test_stats_endpoint_is_staff_only(self):
+        url = reverse("fragment-cache-stats")
+        self.client.force_authenticate(user=self.po)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        staff = User.objects.create_user(username="staff", email="staff@example.com", is_staff=True)
+        self.client.force_authenticate(user=staff)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data), {"entries", "max_entries", "hits", "misses", "evictions", "hit_ratio"})
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class ClaimsAuthenticationTests(APITestCase):
+    """
+    JWT confiando nos claims: leituras sem consulta de usuário, escritas e
+    refresh conferindo token_version (revogação).
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="ana", email="ana@example.com", password="senha-forte-123", bio="bio")
+        self.project = Project.objects.create(name="Projeto JWT", owner=self.user)
+        ProjectMembership.objects.create(user=self.user, project=self.project, role="PO")
+        user_cache.clear()
+        self.addCleanup(user_cache.clear)
+        response = self.client.post(reverse("token_obtain_pair"), {"username": "ana", "password": "senha-forte-123"}, format="json")
+        self.access, self.refresh = response.data["access"], response.data["refresh"]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.access}")
+
+    def test_token_carries_claims(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        token = AccessToken(self.access)
+        self.assertEqual(token["username"], "ana")
+        self.assertEqual(token["tv"], 0)
+        self.assertFalse(token["is_superuser"])
+        self.assertNotIn("roles", token)
+
+    def test_get_costs_no_auth_query(self):
+        # só a consulta das tarefas; o usuário vem do token
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("my-tasks"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_writes_use_full_user(self):
+        url = reverse("project-user-stories-list", args=[self.project.id])
+        response = self.client.post(url, {"title": "US", "description": "d"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created_by"]["email"], "ana@example.com")
+
+        response = self.client.get(reverse("me"))
+        self.assertEqual(response.data["bio"], "bio")
+
+    def test_me_patch_keeps_other_fields(self):
+        response = self.client.patch(reverse("me"), {"bio": "nova bio"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.bio, self.user.email), ("nova bio", "ana@example.com"))
+        self.assertTrue(self.user.check_password("senha-forte-123"))
+        self.assertEqual(self.client.get(reverse("me")).data["bio"], "nova bio")
+
+    def test_me_patch_does_not_undo_changes_behind_the_cache(self):
+        # o usuário já está no cache deste processo (escrita anterior)
+        self.client.patch(reverse("me"), {"bio": "primeira"}, format="json")
+        User.objects.filter(pk=self.user.pk).update(
+            is_active=False, token_version=5, password="!trocada", first_name="Ana"
+        )
+
+        response = self.client.patch(reverse("me"), {"bio": "segunda"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual(
+            (self.user.bio, self.user.is_active, self.user.token_version, self.user.password, self.user.first_name),
+            ("segunda", False, 5, "!trocada", "Ana"),
+        )
+        # o cache passa a ter a linha nova: o token antigo cai na próxima escrita
+        response = self.client.patch(reverse("me"), {"bio": "terceira"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revoke_tokens(self):
+        response = self.client.post(reverse("token_revoke"))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        # leituras caem logo depois da revogação, sem escrita no meio
+        url = reverse("project-user-stories-list", args=[self.project.id])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.client.get(reverse("my-tasks")).status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.post(url, {"title": "US", "description": "d"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.credentials()
+        response = self.client.post(reverse("token_refresh"), {"refresh": self.refresh}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        response = self.client.post(reverse("token_obtain_pair"), {"username": "ana", "password": "senha-forte-123"}, format="json")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+    def test_deactivated_user_cannot_read(self):
+        from api.authentication import revoke_tokens
+
+        self.user.is_active = False
+        self.user.save(update_fields=["is_active"])
+        revoke_tokens(self.user)
+        self.assertEqual(self.client.get(reverse("my-tasks")).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_reissues_current_claims(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        User.objects.filter(pk=self.user.pk).update(username="ana.maria", is_staff=True)
+        response = self.client.post(reverse("token_refresh"), {"refresh": self.refresh}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        token = AccessToken(response.data["access"])
+        self.assertEqual((token["username"], token["is_staff"]), ("ana.maria", True))
+
+    def test_token_issued_before_claims_still_works(self):
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+        # caminho antigo: uma consulta do usuário a mais
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("my-tasks"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(JWT_PROJECT_ROLES_CLAIM=True)
+    def test_project_roles_claim(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        response = self.client.post(reverse("token_obtain_pair"), {"username": "ana", "password": "senha-forte-123"}, format="json")
+        self.assertEqual(AccessToken(response.data["access"])["roles"], {str(self.project.id): "PO"})
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"], USER_PROVISION_HASH_WORKERS=0)
+class UserProvisioningTests(APITestCase):
+    """
+    Provisionamento de usuários em massa (endpoint de admin e UserProvisioner em lotes).
+    """
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username="admin", email="admin@example.com", is_staff=True)
+        User.objects.create_user(username="existente", email="existente@example.com")
+        self.url = reverse("provision-users")
+
+    def upload(self, user, content, name="users.csv"):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client.post(self.url, {"file": SimpleUploadedFile(name, content.encode())}, format="multipart")
+
+    def test_admin_provisions_csv_and_gets_row_errors(self):
+        from django.contrib.auth.hashers import make_password
+
+        prehashed = make_password("senha-pronta")
+        content = (
+            "Username,E-mail,Senha,Password Hash,First Name\n"
+            "bia,bia@example.com,senha-da-bia,,Bia\n"
+            f"caio,caio@example.com,,{prehashed},\n"
+            "sem_senha,,,,\n"
+            "existente,outro@example.com,x,,\n"
+            "novo,existente@example.com,x,,\n"
+            "bia,bia2@example.com,x,,\n"
+            "ruim,ruim@example.com,,nao-e-hash,\n"
+            ",vazio@example.com,x,,\n"
+        )
+        response = self.upload(self.admin, content)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data["processed"], response.data["created"]), (8, 3))
+        self.assertEqual(sorted(e["row"] for e in response.data["errors"]), [4, 5, 6, 7, 8])
+
+        bia = User.objects.get(username="bia")
+        self.assertTrue(bia.check_password("senha-da-bia"))
+        self.assertEqual(bia.first_name, "Bia")
+        self.assertEqual(User.objects.get(username="caio").password, prehashed)
+        self.assertFalse(User.objects.get(username="sem_senha").has_usable_password())
+
+    def test_non_admin_cannot_provision(self):
+        response = self.upload(User.objects.get(username="existente"), "username\nzeca\n")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(User.objects.filter(username="zeca").exists())
+
+    def test_one_duplicate_query_and_one_insert_per_batch(self):
+        from api.provisioning import UserProvisioner
+
+        records = [{"username": f"u{i}", "email": f"u{i}@example.com"} for i in range(10)]
+        provisioner = UserProvisioner(batch_size=5)
+        # por lote: duplicados + SAVEPOINT/INSERT/RELEASE da transação
+        with self.assertNumQueries(2 * 4):
+            result = provisioner.run(iter(records))
+        self.assertEqual((result.created, result.error_count), (10, 0))
+
+    def test_duplicates_across_batches(self):
+        from api.provisioning import UserProvisioner
+
+        records = [{"username": "repetido"}, {"username": "outro"}, {"username": "repetido"}]
+        result = UserProvisioner(batch_size=2).run(iter(records))
+        self.assertEqual((result.created, result.error_count), (2, 1))
+
+    def test_process_pool_hashes_passwords(self):
+        from api.provisioning import MIN_PARALLEL_PASSWORDS, UserProvisioner
+
+        records = [{"username": f"p{i}", "password": f"senha-{i}"} for i in range(MIN_PARALLEL_PASSWORDS)]
+        result = UserProvisioner(workers=2).run(iter(records))
+        self.assertEqual(result.created, MIN_PARALLEL_PASSWORDS)
+        user = User.objects.get(username="p3")
+        self.assertTrue(user.password.startswith("md5$"))
+        self.assertTrue(user.check_password("senha-3"))
+
+    def test_process_pool_works_with_spawn(self):
+        import multiprocessing
+
+        from api.provisioning import MIN_PARALLEL_PASSWORDS, UserProvisioner
+
+        records = [{"username": f"s{i}", "password": f"senha-{i}"} for i in range(MIN_PARALLEL_PASSWORDS)]
+        result = UserProvisioner(workers=2, mp_context=multiprocessing.get_context("spawn")).run(iter(records))
+        self.assertEqual((result.created, result.error_count), (MIN_PARALLEL_PASSWORDS, 0))
+        self.assertTrue(User.objects.get(username="s5").check_password("senha-5"))
+
+
+class AddMembersBatchTests(APITestCase):
+    """
+    Convites em lote no add_member: consultas fixas por requisição e resultado por convite.
+    """
+
+    def setUp(self):
+        self.sm = User.objects.create_user(username="sm", email="sm@example.com")
+        self.dev = User.objects.create_user(username="dev", email="dev@example.com")
+        self.project = Project.objects.create(name="Projeto Lote", owner=self.sm)
+        ProjectMembership.objects.create(user=self.sm, project=self.project, role="SM")
+        ProjectMembership.objects.create(user=self.dev, project=self.project, role="DEV")
+        self.project.member_count = 2
+        self.project.save(update_fields=["member_count"])
+        self.url = reverse("add-member", args=[self.project.id])
+        self.client.force_authenticate(user=self.sm)
+
+    def test_fifty_members_in_one_call(self):
+        User.objects.bulk_create([User(username=f"m{i}", email=f"m{i}@example.com") for i in range(50)])
+        members = [{"email": f"m{i}@example.com", "role": "DEV"} for i in range(50)]
+
+        # projeto, SM, usuários, vínculos existentes, SAVEPOINT/INSERT/contador/RELEASE
+        with self.assertNumQueries(8):
+            response = self.client.post(self.url, {"members": members}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["added"], 50)
+        self.assertEqual(ProjectMembership.objects.filter(project=self.project).count(), 52)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.member_count, 52)
+
+    def test_per_entry_results(self):
+        User.objects.create_user(username="po", email="po@example.com")
+        members = [
+            {"email": "po@example.com", "role": "PO"},
+            {"email": "dev@example.com", "role": "DEV"},
+            {"email": "ninguem@example.com", "role": "DEV"},
+            {"email": "po@example.com", "role": "XX"},
+            {"role": "DEV"},
+        ]
+        response = self.client.post(self.url, members, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r["status"] for r in response.data["results"]],
+            ["added", "already_member", "not_found", "invalid", "invalid"],
+        )
+        self.assertEqual(ProjectMembership.objects.get(project=self.project, user__username="po").role, "PO")
+
+    def test_concurrent_invite_is_reported_and_not_counted(self):
+        from unittest import mock
+        from api.views import AddMemberView
+
+        User.objects.bulk_create([User(username=f"r{i}", email=f"r{i}@example.com") for i in range(3)])
+        racer = User.objects.get(username="r1")
+        original = AddMemberView.insert_memberships
+        calls = []
+
+        def insert_memberships(view, project, pending_members):
+            if not calls:
+                # outro convite entra entre a checagem e o INSERT deste lote
+                ProjectMembership.objects.create(user=racer, project=project, role="DEV")
+            calls.append(len(pending_members))
+            return original(view, project, pending_members)
+
+        members = [{"email": f"r{i}@example.com", "role": "DEV"} for i in range(3)]
+        with mock.patch.object(AddMemberView, "insert_memberships", insert_memberships):
+            response = self.client.post(self.url, {"members": members}, format="json")
+
+        self.assertEqual(calls, [3, 2])
+        self.assertEqual(response.data["added"], 2)
+        self.assertEqual([r["status"] for r in response.data["results"]], ["added", "already_member", "added"])
+        self.project.refresh_from_db()
+        # 2 do setUp + 2 do lote; o concorrente (create direto) não passou pelo contador
+        self.assertEqual(self.project.member_count, 4)
+
+    def test_single_invite_keeps_old_responses(self):
+        response = self.client.post(self.url, {"email": "ninguem@example.com", "role": "DEV"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.post(self.url, {"email": "dev@example.com", "role": "DEV"}, format="json")
+        self.assertEqual((response.status_code, response.data["detail"]), (400, "Usuário já é membro do projeto"))
+
+    def test_rejects_bad_batches(self):
+        self.assertEqual(self.client.post(self.url, {"members": []}, format="json").status_code, 400)
+        self.client.force_authenticate(user=self.dev)
+        response = self.client.post(self.url, {"members": [{"email": "sm@example.com", "role": "DEV"}]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class UserLookupTests(APITestCase):
+    """
+    Email único sem diferenciar maiúsculas (índice em lower(email)) e typeahead de usuários.
+    """
+
+    def setUp(self):
+        self.ana = User.objects.create_user(username="Ana", email="Ana.Silva@Example.com")
+        User.objects.create_user(username="anabela", email="bela@example.com")
+        User.objects.create_user(username="bruno", email="anotacoes@example.com")
+        User.objects.create_user(username="antigo", email="antigo@example.com", is_active=False)
+        self.client.force_authenticate(user=self.ana)
+
+    def test_email_unique_ignoring_case(self):
+        from django.db import IntegrityError, transaction
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create_user(username="outra", email="ana.silva@example.COM")
+        # sem email continua permitido para vários usuários
+        User.objects.create_user(username="sem1")
+        User.objects.create_user(username="sem2")
+
+    def test_register_and_invite_ignore_email_case(self):
+        response = self.client.post(
+            reverse("register"), {"username": "nova", "email": "ANA.SILVA@example.com", "password": "x"}, format="json"
+        )
+        self.assertEqual((response.status_code, response.data["detail"]), (400, "Email já está em uso"))
+
+        project = Project.objects.create(name="Projeto", owner=self.ana)
+        ProjectMembership.objects.create(user=self.ana, project=project, role="SM")
+        response = self.client.post(
+            reverse("add-member", args=[project.id]), {"email": "BELA@example.com", "role": "DEV"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(ProjectMembership.objects.filter(project=project, user__username="anabela").exists())
+
+    def test_search_matches_username_or_email_prefix(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("user-search"), {"q": "AN"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([u["username"] for u in response.data], ["Ana", "anabela", "bruno"])
+        self.assertEqual(set(response.data[0]), {"id", "username", "email"})
+
+        response = self.client.get(reverse("user-search"), {"q": "an", "limit": 1})
+        self.assertEqual([u["username"] for u in response.data], ["Ana"])
+
+    def test_non_ascii_emails_are_stored_lowercased(self):
+        from django.db import IntegrityError, transaction
+
+        elise = User.objects.create_user(username="Élise", email="Élise@Exemplo.com")
+        self.assertEqual(elise.email, "élise@exemplo.com")
+        response = self.client.get(reverse("user-search"), {"q": "él"})
+        self.assertEqual([u["username"] for u in response.data], ["Élise"])
+        self.assertEqual(list(User.objects.with_emails(["ÉLISE@exemplo.com"])), [elise])
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create_user(username="elise2", email="ÉLISE@exemplo.com")
+
+        # username continua como veio: só A-Z são convertidos na busca
+        User.objects.create_user(username="Ömer")
+        response = self.client.get(reverse("user-search"), {"q": "Öm"})
+        self.assertEqual([u["username"] for u in response.data], ["Ömer"])
+
+    def test_search_needs_a_short_prefix(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("user-search"), {"q": "a"})
+        self.assertEqual(response.data, [])
+
+
+class IdempotencyTests(APITestCase):
+    """
+    POSTs com Idempotency-Key: repetições recebem a resposta guardada sem tocar nas tabelas.
+    """
+
+    def setUp(self):
+        from django.core.cache import caches
+
+        self.store = caches["idempotency"]
+        self.store.clear()
+        self.addCleanup(self.store.clear)
+        self.sm = User.objects.create_user(username="sm", email="sm@example.com")
+        self.dev = User.objects.create_user(username="dev", email="dev@example.com")
+        self.project = Project.objects.create(name="Projeto Retentativas", owner=self.sm)
+        ProjectMembership.objects.create(user=self.sm, project=self.project, role="SM")
+        ProjectMembership.objects.create(user=self.dev, project=self.project, role="DEV")
+        story = UserStory.objects.create(project=self.project, title="US", description="d")
+        self.sprint = Sprint.objects.create(project=self.project, name="S1", start_date="2025-11-10", end_date="2025-11-20")
+        self.item = ProductBacklogItem.objects.create(project=self.project, user_story=story, title="I", description="d")
+        self.tasks_url = reverse("sprint-tasks-list", args=[self.project.id, self.sprint.id])
+        self.client.force_authenticate(user=self.dev)
+
+    def post_task(self, key, description="t"):
+        return self.client.post(
+            self.tasks_url, {"backlog_item_id": self.item.id, "description": description},
+            format="json", HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_retry_replays_without_queries(self):
+        first = self.post_task("k1")
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        with self.assertNumQueries(0):
+            retry = self.post_task("k1")
+        self.assertEqual((retry.status_code, retry.data), (201, first.data))
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(Task.objects.filter(sprint=self.sprint).count(), 1)
+
+        # outra chave (ou nenhuma) cria de novo
+        self.post_task("k2")
+        self.client.post(self.tasks_url, {"backlog_item_id": self.item.id, "description": "t"}, format="json")
+        self.assertEqual(Task.objects.filter(sprint=self.sprint).count(), 3)
+
+    def test_keys_are_per_user_and_action(self):
+        self.client.force_authenticate(user=self.sm)
+        url = reverse("project-sprints-add-items", args=[self.project.id, self.sprint.id])
+        first = self.client.post(url, {"items": [self.item.id]}, format="json", HTTP_IDEMPOTENCY_KEY="k1")
+        retry = self.client.post(url, {"items": [self.item.id]}, format="json", HTTP_IDEMPOTENCY_KEY="k1")
+        self.assertEqual((retry.status_code, retry.data), (first.status_code, first.data))
+
+        # a mesma chave de outro usuário não enxerga a resposta guardada
+        self.client.force_authenticate(user=self.dev)
+        self.assertEqual(self.post_task("k1").status_code, status.HTTP_201_CREATED)
+
+    def test_reused_key_with_other_body_is_rejected(self):
+        self.post_task("k1")
+        response = self.post_task("k1", description="outra")
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Task.objects.filter(sprint=self.sprint).count(), 1)
+
+    def test_reused_key_with_other_file_of_same_name_is_rejected(self):
+        self.client.force_authenticate(user=self.sm)
+        url = reverse("projects-import-backlog", args=[self.project.id])
+
+        def upload(content):
+            return self.client.post(
+                url, {"file": SimpleUploadedFile("backlog.csv", content)},
+                format="multipart", HTTP_IDEMPOTENCY_KEY="k1",
+            )
+
+        first = upload(b"Issue Type,Summary\nStory,US A\n")
+        self.assertEqual(first.data["created"]["story"], 1)
+        self.assertEqual(upload(b"Issue Type,Summary\nStory,US A\n")["Idempotent-Replayed"], "true")
+        response = upload(b"Issue Type,Summary\nStory,US B\n")
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertFalse(UserStory.objects.filter(title="US B").exists())
+
+    def test_retried_signup_gets_its_tokens_back(self):
+        client = APIClient()
+        body = {"username": "nova", "email": "nova@example.com", "password": "Senha-Forte-123"}
+        first = client.post(reverse("register"), body, format="json", HTTP_IDEMPOTENCY_KEY="k1")
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        retry = client.post(reverse("register"), body, format="json", HTTP_IDEMPOTENCY_KEY="k1")
+        self.assertEqual((retry.status_code, retry.data), (201, first.data))
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+
+        # sem login, rota autenticada continua dando 401 mesmo com a chave
+        response = client.post(self.tasks_url, {"description": "t"}, format="json", HTTP_IDEMPOTENCY_KEY="k1")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_retried_provisioning_replays(self):
+        self.client.force_authenticate(user=User.objects.create_superuser(username="admin", email="a@example.com"))
+        content = b"username,email\nana,ana@example.com\n"
+
+        def upload():
+            return self.client.post(
+                reverse("provision-users"), {"file": SimpleUploadedFile("users.csv", content)},
+                format="multipart", HTTP_IDEMPOTENCY_KEY="k1",
+            )
+
+        first = upload()
+        self.assertEqual(first.data["created"], 1)
+        retry = upload()
+        self.assertEqual((retry.data, retry["Idempotent-Replayed"]), (first.data, "true"))
+        self.assertEqual(User.objects.filter(username="ana").count(), 1)
+
+    def test_errors_are_not_stored(self):
+        response = self.client.post(self.tasks_url, {"description": "t"}, format="json", HTTP_IDEMPOTENCY_KEY="k1")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.post_task("k1").status_code, status.HTTP_201_CREATED)
+
+    def test_in_flight_key_conflicts(self):
+        import hashlib
+
+        digest = hashlib.sha256(b"k1").hexdigest()
+        self.store.set(f"idempotency:{self.dev.pk}:{digest}:lock", True)
+        self.assertEqual(self.post_task("k1").status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(Task.objects.filter(sprint=self.sprint).exists())
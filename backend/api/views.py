@@ -1,40 +1,100 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
 from rest_framework import viewsets, permissions, status
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
-from django.db.models import Q, Case, When, IntegerField
+from django.db import IntegrityError, transaction
+from django.db.models import Q, F, Count
 from django.utils import timezone
-from .models import Project, ProjectMembership, UserStory, ProductBacklogItem, Sprint, Task
+from .models import Project, ProjectDeletion, ProjectMembership, UserStory, ProductBacklogItem, Sprint, SprintSnapshot, Task
 from .serializers import (
-    ProjectSerializer, RegisterSerializer, UserSerializer,
-    UserStorySerializer, ProductBacklogItemSerializer, SprintSerializer, TaskSerializer
+    ProjectSerializer, ProjectDeletionSerializer, RegisterSerializer, UserSerializer,
+    UserStorySerializer, ProductBacklogItemSerializer, SprintSerializer, SprintSnapshotSerializer, TaskSerializer
 )
+from .importers import BacklogImporter, detect_format, iter_records
+from .provisioning import UserProvisioner
+from .idempotency import IdempotencyMixin, idempotent
+from .purge import count_rows, schedule_purge
+from .archive import ArchiveError, ArchivedGraph, archive_project, get_archive, restore_project
+from .snapshots import capture_sprint_snapshot
+from .burndown import burndown_series, record_deleted_tasks, record_transitions, transition
+from .analytics import project_analytics
+from .forecast import ForecastError, forecast_backlog
+from .rollup import archived_story_tree, story_tree
+from .fastlists import iter_values, serialize_values
+from .fragments import fragment_cache
+from .authentication import ClaimsRefreshToken, revoke_tokens, user_cache
+from .renderers import ORJSONRenderer, render_json_stream
+from . import counters
 
 User = get_user_model()
 
-class ProjectViewSet(viewsets.ModelViewSet):
+IMPORT_MAX_REPORTED_ERRORS = 1000
+VELOCITY_DEFAULT_SPRINTS = 10
+VELOCITY_MAX_SPRINTS = 100
+ANALYTICS_DEFAULT_DAYS = 90
+ANALYTICS_MAX_DAYS = 730
+FORECAST_DEFAULT_SIMULATIONS = 10000
+FORECAST_MAX_SIMULATIONS = 50000
+MY_TASKS_DEFAULT_LIMIT = 50
+MY_TASKS_MAX_LIMIT = 200
+USER_SEARCH_MIN_LENGTH = 2
+USER_SEARCH_DEFAULT_LIMIT = 10
+USER_SEARCH_MAX_LIMIT = 50
+ADD_MEMBERS_MAX_BATCH = 500
+# status de cada convite -> código HTTP quando veio um convite só
+ADD_MEMBER_STATUS_CODES = {'added': 200, 'invalid': 400, 'not_found': 404, 'already_member': 400}
+
+class ProjectViewSet(IdempotencyMixin, viewsets.ModelViewSet):
     serializer_class = ProjectSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         user = self.request.user
-        return Project.objects.filter(Q(owner=user) | Q(members=user)).distinct()
+        return Project.objects.live().visible_to(user)
 
     def perform_create(self, serializer):
         project = serializer.save(owner=self.request.user)
         # Garante que o criador seja atribuído como Scrum Master (SM).
         # Usamos update_or_create para sobrescrever qualquer membership pré-existente
         # (por exemplo se um script ou lógica externa criou uma entrada PO).
-        ProjectMembership.objects.update_or_create(
+        _, created = ProjectMembership.objects.update_or_create(
             user=self.request.user,
             project=project,
             defaults={'role': 'SM'}
         )
+        if created:
+            counters.members_changed(project.id, 1)
+
+    def destroy(self, request, *args, **kwargs):
+        """
+        Marca o projeto como em exclusão e responde na hora (202).
+        As linhas são apagadas em lotes por um worker em segundo plano;
+        o progresso fica em GET /api/projects/{id}/deletion/.
+        """
+        project = self.get_object()
+
+        with transaction.atomic():
+            project.status = Project.Status.DELETING
+            project.save(update_fields=["status"])
+            deletion = ProjectDeletion.objects.create(
+                project_id=project.id,
+                project_name=project.name,
+                requested_by=request.user,
+                total_rows=count_rows(project.id),
+            )
+        transaction.on_commit(schedule_purge)
+
+        return Response(ProjectDeletionSerializer(deletion).data, status=status.HTTP_202_ACCEPTED)
 
     @action(detail=True, methods=["post"], url_path="close")
     def close_project(self, request, pk=None):
@@ -59,15 +119,339 @@ class ProjectViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(project)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
-class UserStoryViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=["get"], url_path="summary")
+    def summary(self, request):
+        """
+        Resumo de todos os projetos visíveis ao usuário (histórias, backlog por
+        prioridade, sprint ativa e tarefas por status). Usa uma consulta agrupada
+        por tabela, então o número de consultas não cresce com o de projetos.
+        """
+        from datetime import date
+
+        visible = self.get_queryset().values('id')
+        projects = list(
+            Project.objects.filter(id__in=visible).order_by('-created_at')
+            .values('id', 'name', 'status', 'archived_at')
+        )
+        summary = {
+            p['id']: {
+                "id": p['id'],
+                "name": p['name'],
+                "status": p['status'],
+                "archived": p['archived_at'] is not None,
+                "user_stories": 0,
+                "backlog": {"HIGH": 0, "MEDIUM": 0, "LOW": 0, "total": 0},
+                "active_sprint": None,
+                "tasks": {"TODO": 0, "IN_PROGRESS": 0, "DONE": 0, "total": 0},
+            }
+            for p in projects
+        }
+
+        for row in UserStory.objects.filter(project_id__in=visible).values('project_id').annotate(n=Count('id')).order_by():
+            summary[row['project_id']]["user_stories"] = row['n']
+
+        for row in ProductBacklogItem.objects.filter(project_id__in=visible).values('project_id', 'priority').annotate(n=Count('id')).order_by():
+            backlog = summary[row['project_id']]["backlog"]
+            backlog[row['priority']] = row['n']
+            backlog["total"] += row['n']
+
+        today = date.today()
+        active = Sprint.objects.filter(
+            project_id__in=visible,
+            start_date__lte=today,
+            end_date__gte=today
+        ).exclude(status='COMPLETED').order_by('project_id', '-start_date').values('id', 'project_id', 'name', 'start_date', 'end_date')
+        for sprint in active:
+            entry = summary[sprint['project_id']]
+            if entry["active_sprint"] is None:
+                entry["active_sprint"] = {k: sprint[k] for k in ('id', 'name', 'start_date', 'end_date')}
+
+        for row in Task.objects.filter(project_id__in=visible).values('project_id', 'status').annotate(n=Count('id')).order_by():
+            tasks = summary[row['project_id']]["tasks"]
+            tasks[row['status']] = row['n']
+            tasks["total"] += row['n']
+
+        return Response(list(summary.values()), status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=["post"], url_path="import")
+    def import_backlog(self, request, pk=None):
+        """
+        Importa um CSV/NDJSON (estilo Jira/Trello) com histórias, itens, sprints e tarefas.
+        Espera o arquivo no campo multipart 'file'. Apenas PO ou SM do projeto.
+        Responde com o resumo da importação e os erros por linha.
+        """
+        project = self.get_object()
+
+        if project.status == Project.Status.CONCLUDED:
+            return Response(
+                {"detail": "Projetos encerrados não aceitam importações."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if not ProjectMembership.objects.filter(user=request.user, project=project, role__in=['PO', 'SM']).exists():
+            return Response(
+                {"detail": "Apenas o Product Owner ou o Scrum Master podem importar o backlog."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        upload = request.FILES.get("file")
+        if not upload:
+            return Response({"detail": "Envie o arquivo no campo 'file'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Guarda só os primeiros erros na resposta; a contagem total vem no resumo
+        errors = []
+
+        def on_error(row, message):
+            if len(errors) < IMPORT_MAX_REPORTED_ERRORS:
+                errors.append({"row": row, "error": message})
+
+        importer = BacklogImporter(project, request.user, on_error=on_error)
+        fmt = detect_format(upload.name, request.data.get("format"))
+        result = importer.run(iter_records(upload, fmt))
+
+        return Response({**result.as_dict(), "errors": errors}, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=["get"], url_path="velocity")
+    def velocity(self, request, pk=None):
+        """
+        Histórico de velocidade das últimas N sprints encerradas (?sprints=N),
+        lido direto dos snapshots gravados em end_sprint.
+        """
+        project = self.get_object()
+
+        try:
+            limit = int(request.query_params.get("sprints", VELOCITY_DEFAULT_SPRINTS))
+        except ValueError:
+            return Response({"detail": "'sprints' deve ser um número inteiro."}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, VELOCITY_MAX_SPRINTS))
+
+        snapshots = list(SprintSnapshot.objects.filter(project=project).order_by('-closed_at')[:limit])
+        snapshots.reverse()
+        done = [s.items_done for s in snapshots]
+
+        return Response({
+            "sprints": SprintSnapshotSerializer(snapshots, many=True).data,
+            "average_items_done": round(sum(done) / len(done), 2) if done else 0,
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=["get"], url_path="analytics")
+    def analytics(self, request, pk=None):
+        """
+        Fluxo cumulativo (CFD), WIP diário e percentis de lead time e cycle time
+        de tarefas e itens do backlog. Janela do CFD em ?days=N (padrão 90).
+        """
+        project = self.get_object()
+
+        try:
+            days = int(request.query_params.get("days", ANALYTICS_DEFAULT_DAYS))
+        except ValueError:
+            return Response({"detail": "'days' deve ser um número inteiro."}, status=status.HTTP_400_BAD_REQUEST)
+        days = max(1, min(days, ANALYTICS_MAX_DAYS))
+
+        return Response(project_analytics(project.id, days), status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=["get"], url_path="forecast")
+    def forecast(self, request, pk=None):
+        """
+        Previsão Monte Carlo de quantas sprints faltam para o backlog restante.
+        Filtros opcionais: ?priority=HIGH,MEDIUM e ?simulations=N.
+        """
+        project = self.get_object()
+
+        priorities = [p for p in request.query_params.get("priority", "").upper().split(",") if p]
+        valid = {choice for choice, _ in ProductBacklogItem.PRIORITY_CHOICES}
+        if any(p not in valid for p in priorities):
+            return Response({"detail": "Prioridade inválida. Use HIGH, MEDIUM ou LOW."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            simulations = int(request.query_params.get("simulations", FORECAST_DEFAULT_SIMULATIONS))
+        except ValueError:
+            return Response({"detail": "'simulations' deve ser um número inteiro."}, status=status.HTTP_400_BAD_REQUEST)
+        simulations = max(100, min(simulations, FORECAST_MAX_SIMULATIONS))
+
+        try:
+            result = forecast_backlog(project, priorities, simulations)
+        except ForecastError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(result, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=["post"], url_path="archive")
+    def archive_project(self, request, pk=None):
+        """
+        Move histórias, sprints, itens e tarefas de um projeto encerrado para o
+        arquivo compactado. As rotas GET continuam funcionando, só que somente leitura.
+        """
+        project = self.get_object()
+
+        if project.owner != request.user:
+            return Response(
+                {"detail": "Somente o criador do projeto pode arquivá-lo."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        try:
+            archive_project(project)
+        except ArchiveError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(self.get_serializer(project).data, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=["post"], url_path="restore")
+    def restore_project(self, request, pk=None):
+        """
+        Devolve as linhas arquivadas para as tabelas vivas.
+        """
+        project = self.get_object()
+
+        if project.owner != request.user:
+            return Response(
+                {"detail": "Somente o criador do projeto pode restaurá-lo."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        try:
+            restore_project(project)
+        except ArchiveError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(self.get_serializer(project).data, status=status.HTTP_200_OK)
+
+
+class ProjectScopedMixin:
+    """
+    Projeto da URL e membership do usuário carregados uma única vez por
+    requisição e reaproveitados pela checagem de permissão, pelo queryset e
+    pelos serializers (em vez de cada um buscar de novo).
+    """
+
+    def load_project(self):
+        if not hasattr(self, '_project'):
+            self._project = Project.objects.live().filter(id=self.kwargs.get('project_pk')).first()
+        return self._project
+
+    def get_project(self):
+        project = self.load_project()
+        if project is None:
+            raise Http404
+        return project
+
+    def get_membership(self):
+        if not hasattr(self, '_membership'):
+            project = self.load_project()
+            self._membership = project and ProjectMembership.objects.filter(user=self.request.user, project=project).first()
+        return self._membership
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.request is not None and self.request.method not in permissions.SAFE_METHODS:
+            # escritas já carregaram os dois na checagem de permissão
+            context['project'] = self.load_project()
+            context['membership'] = self.get_membership()
+        return context
+
+
+class ValuesListMixin:
+    """
+    list monta a resposta direto de values_list (api.fastlists), com a mesma
+    saída do serializer_class. Com paginação configurada, volta ao caminho normal.
+
+    ?stream=1 (exportações, clientes de admin) devolve o mesmo array JSON em
+    streaming, lote a lote (LIST_STREAM_CHUNK_SIZE linhas) a partir de um
+    cursor no servidor: a memória não cresce com o resultado e os primeiros
+    bytes saem antes da consulta terminar. Só vale para JSON e projetos vivos.
+    """
+
+    def wants_stream(self, request):
+        if request.query_params.get('stream', '').lower() not in ('1', 'true'):
+            return False
+        if not isinstance(request.accepted_renderer, ORJSONRenderer):
+            return False
+        project = self.load_project()
+        return project is not None and project.archived_at is None
+
+    def list(self, request, *args, **kwargs):
+        if self.paginator is not None:
+            return super().list(request, *args, **kwargs)
+        # permissões e 404 acontecem aqui, antes do primeiro byte
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.wants_stream(request):
+            batches = iter_values(queryset, self.get_serializer_class(), settings.LIST_STREAM_CHUNK_SIZE)
+            return StreamingHttpResponse(render_json_stream(batches), content_type=ORJSONRenderer.media_type)
+        return Response(serialize_values(queryset, self.get_serializer_class()))
+
+
+class ArchivedProjectMixin(ProjectScopedMixin):
+    """
+    Projetos arquivados não têm mais linhas nas tabelas vivas. Para eles,
+    list/retrieve leem do arquivo (só quando a consulta normal volta vazia,
+    então projetos vivos não pagam nada a mais) e qualquer escrita é recusada.
+    """
+
+    # Atributo do ArchivedGraph com as linhas desta rota (ex.: 'user_stories').
+    # Subclasses definem a chave e, se precisarem filtrar ou ordenar como o
+    # get_queryset, sobrescrevem get_archived_rows chamando o super().
+    archived_rows_key = None
+
+    def get_archived_rows(self, graph):
+        if self.archived_rows_key is None:
+            raise ImproperlyConfigured(
+                f"{type(self).__name__} precisa definir archived_rows_key ou sobrescrever get_archived_rows(graph)."
+            )
+        return getattr(graph, self.archived_rows_key)
+
+    def get_archived_graph(self):
+        project = self.load_project()
+        if project is None or project.archived_at is None or not self.get_membership():
+            return None
+        return ArchivedGraph(get_archive(project))
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method not in permissions.SAFE_METHODS:
+            project = self.load_project()
+            if project is not None and project.archived_at:
+                raise PermissionDenied("Projetos arquivados são somente leitura. Restaure o projeto para editá-lo.")
+
+    def list(self, request, *args, **kwargs):
+        try:
+            response = super().list(request, *args, **kwargs)
+        except Http404:
+            response = None
+
+        # streaming só acontece em projeto vivo, não há o que buscar no arquivo
+        if response is None or (not response.streaming and not response.data):
+            graph = self.get_archived_graph()
+            if graph is not None:
+                serializer = self.get_serializer(self.get_archived_rows(graph), many=True)
+                return Response(serializer.data)
+        if response is None:
+            raise Http404
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            graph = self.get_archived_graph()
+            if graph is None:
+                raise
+            lookup = str(self.kwargs[self.lookup_url_kwarg or self.lookup_field])
+            for obj in self.get_archived_rows(graph):
+                if str(obj.pk) == lookup:
+                    return Response(self.get_serializer(obj).data)
+            raise
+
+
+class UserStoryViewSet(IdempotencyMixin, ArchivedProjectMixin, ValuesListMixin, viewsets.ModelViewSet):
     serializer_class = UserStorySerializer
+    archived_rows_key = 'user_stories'
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        project_id = self.kwargs.get('project_pk')  
-        project = get_object_or_404(Project, id=project_id)
-        if ProjectMembership.objects.filter(user=self.request.user, project=project).exists():
-            return UserStory.objects.filter(project=project)
+        project = self.get_project()
+        if self.get_membership():
+            return UserStory.objects.filter(project=project).order_by('created_at')
         return UserStory.objects.none()
 
     def get_serializer_context(self):
@@ -78,68 +462,103 @@ class UserStoryViewSet(viewsets.ModelViewSet):
         return context
 
     def destroy(self, request, *args, **kwargs):
-        project_id = self.kwargs.get('project_pk')
-        project = get_object_or_404(Project, id=project_id)
-        membership = ProjectMembership.objects.filter(
-            user=request.user,
-            project=project,
-            role='PO'
-        ).first()
+        self.get_project()
+        membership = self.get_membership()
 
-        if not membership:
+        if not membership or membership.role != 'PO':
             return Response({"detail": "Apenas o Product Owner pode remover histórias de usuário"}, status=status.HTTP_403_FORBIDDEN)
 
         return super().destroy(request, *args, **kwargs)
 
-class ProductBacklogItemViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=["get"], url_path="tree")
+    def tree(self, request, project_pk=None):
+        """
+        Histórias com seus itens de backlog, contagem de tarefas por status e
+        percentual concluído em cada nível (projeto, história, item).
+        """
+        project = self.get_project()
+        if not self.get_membership():
+            raise PermissionDenied("Você não é membro deste projeto.")
+
+        if project.archived_at:
+            return Response(archived_story_tree(ArchivedGraph(get_archive(project))), status=status.HTTP_200_OK)
+        return Response(story_tree(project.id), status=status.HTTP_200_OK)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            # as tarefas somem em cascata; o burndown precisa saber disso
+            record_deleted_tasks(Task.objects.filter(backlog_item__user_story=instance), instance.project_id, self.request.user)
+            # e os itens de backlog da história também
+            sprint_counts = dict(
+                ProductBacklogItem.objects.filter(user_story=instance).values_list('sprint_id').annotate(n=Count('id')).order_by()
+            )
+            counters.items_removed(instance.project_id, sum(sprint_counts.values()), sprint_counts)
+            instance.delete()
+
+class ProductBacklogItemViewSet(IdempotencyMixin, ArchivedProjectMixin, ValuesListMixin, viewsets.ModelViewSet):
     serializer_class = ProductBacklogItemSerializer
+    archived_rows_key = 'backlog'
     permission_classes = [permissions.IsAuthenticated]
     def get_queryset(self):
         project_id = self.kwargs.get('project_pk')
         if not project_id:
             return ProductBacklogItem.objects.none()
 
-        project = get_object_or_404(Project, id=project_id)
-        if ProjectMembership.objects.filter(user=self.request.user, project=project).exists():
-            # HIGH -> MEDIUM -> LOW
-            return ProductBacklogItem.objects.filter(project=project).annotate(
-                priority_order=Case(
-                    When(priority='HIGH', then=0),
-                    When(priority='MEDIUM', then=1),
-                    When(priority='LOW', then=2),
-                    output_field=IntegerField(),
-                )
-            ).order_by('priority_order', '-created_at')
+        project = self.get_project()
+        if self.get_membership():
+            # HIGH -> MEDIUM -> LOW, lido na ordem do índice pbi_project_priority_idx
+            return ProductBacklogItem.objects.filter(project=project).order_by('priority_rank', '-created_at')
         return ProductBacklogItem.objects.none()
 
+    def get_archived_rows(self, graph):
+        order = {'HIGH': 0, 'MEDIUM': 1, 'LOW': 2}
+        items = sorted(super().get_archived_rows(graph), key=lambda item: item.created_at, reverse=True)
+        return sorted(items, key=lambda item: order.get(item.priority, 3))
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
-        project_id = self.kwargs.get('project_pk')
-        context['project'] = get_object_or_404(Project, id=project_id)
+        context['project'] = self.get_project()
         context['request'] = self.request
         return context
 
     def perform_create(self, serializer):
-        project_id = self.kwargs.get('project_pk')
-        project = get_object_or_404(Project, id=project_id)
-        membership = ProjectMembership.objects.filter(
-            user=self.request.user,
-            project=project,
-            role='PO'
-        ).first()
+        project = self.get_project()
+        membership = self.get_membership()
         
-        if not membership:
+        if not membership or membership.role != 'PO':
             raise PermissionDenied("Apenas o Product Owner pode gerenciar o backlog")
         
-        serializer.save(project=project, created_by=self.request.user)
+        with transaction.atomic():
+            item = serializer.save(project=project, created_by=self.request.user)
+            counters.items_added(project.id, 1, {item.sprint_id: 1})
+
+    def perform_update(self, serializer):
+        old_sprint_id = serializer.instance.sprint_id
+        with transaction.atomic():
+            item = serializer.save()
+            counters.item_moved(old_sprint_id, item.sprint_id)
 
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            # as tarefas somem em cascata; o burndown precisa saber disso
+            record_deleted_tasks(Task.objects.filter(backlog_item=instance), instance.project_id, self.request.user)
+            counters.items_removed(instance.project_id, 1, {instance.sprint_id: 1})
+            instance.delete()
 
 
-class AddMemberView(APIView):
+
+class AddMemberView(IdempotencyMixin, APIView):
+    """
+    Adiciona membros a um projeto. Aceita um convite ({'email', 'role'}) ou
+    vários de uma vez ({'members': [{'email', 'role'}, ...]}); no lote, os
+    usuários e os vínculos já existentes saem de uma consulta cada e os
+    vínculos novos entram num único bulk_create. Lotes respondem 200 com o
+    resultado de cada convite.
+    """
     permission_classes = [IsAuthenticated]
 
     def post(self, request, project_id):
-        project = get_object_or_404(Project, id=project_id)
+        project = get_object_or_404(Project.objects.live(), id=project_id)
 
         if project.status == Project.Status.CONCLUDED:
             return Response(
@@ -160,41 +579,114 @@ class AddMemberView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        email = request.data.get("email")
-        role = request.data.get("role")
+        members = request.data if isinstance(request.data, list) else request.data.get("members")
+        if members is None:
+            result = self.add_members(project, [request.data])[0]
+            return Response({"detail": result["detail"]}, status=ADD_MEMBER_STATUS_CODES[result["status"]])
 
-        if not email or not role:
+        if not isinstance(members, list) or not members:
+            return Response({"detail": "'members' deve ser uma lista de {email, role}."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(members) > ADD_MEMBERS_MAX_BATCH:
             return Response(
-                {"detail": "Informe o email do usuário e o papel (role)"},
-                status=400
+                {"detail": f"No máximo {ADD_MEMBERS_MAX_BATCH} membros por requisição."},
+                status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Permitir também atribuir Product Owner (PO) via convite
-        if role not in ['PO', 'SM', 'DEV']:
-            return Response(
-                {"detail": "Papel inválido. Use 'PO' para Product Owner, 'SM' para Scrum Master ou 'DEV' para Developer"},
-                status=400
-            )
+        results = self.add_members(project, members)
+        return Response({
+            "added": sum(1 for r in results if r["status"] == "added"),
+            "results": results,
+        }, status=status.HTTP_200_OK)
+
+    def add_members(self, project, entries):
+        results = []
+        pending = []
+        for entry in entries:
+            email = entry.get("email") if isinstance(entry, dict) else None
+            role = entry.get("role") if isinstance(entry, dict) else None
+            result = {"email": email, "role": role}
+            results.append(result)
+            if not email or not role or not isinstance(email, str):
+                result.update(status="invalid", detail="Informe o email do usuário e o papel (role)")
+            # Permitir também atribuir Product Owner (PO) via convite
+            elif role not in ['PO', 'SM', 'DEV']:
+                result.update(
+                    status="invalid",
+                    detail="Papel inválido. Use 'PO' para Product Owner, 'SM' para Scrum Master ou 'DEV' para Developer"
+                )
+            else:
+                pending.append(result)
+        if not pending:
+            return results
+
+        # Uma consulta para os usuários e outra para os vínculos que já existem
+        users = {}
+        for user in User.objects.with_emails(r["email"] for r in pending).order_by('id').only('id', 'username', 'email'):
+            users.setdefault(user.email.lower(), user)
+        already = set(
+            ProjectMembership.objects.filter(project=project, user_id__in=[u.id for u in users.values()])
+            .values_list('user_id', flat=True)
+        )
 
-        try:
-            added_user = User.objects.get(email=email)
-        except User.DoesNotExist:
-            return Response({"detail": "Usuário não encontrado"}, status=404)
+        pending_members = []
+        for result in pending:
+            user = users.get(result["email"].lower())
+            if user is None:
+                result.update(status="not_found", detail="Usuário não encontrado")
+            elif user.id in already:
+                result.update(status="already_member", detail="Usuário já é membro do projeto")
+            else:
+                already.add(user.id)
+                pending_members.append((ProjectMembership(user=user, project=project, role=result["role"]), result))
+
+        if pending_members:
+            try:
+                self.insert_memberships(project, pending_members)
+            except IntegrityError:
+                # um convite concorrente inseriu alguém do lote entre a checagem e o
+                # INSERT: quem já entrou vira already_member e o resto tenta de novo
+                raced = set(ProjectMembership.objects.filter(
+                    project=project, user_id__in=[m.user_id for m, _ in pending_members]
+                ).values_list('user_id', flat=True))
+                for membership, result in pending_members:
+                    if membership.user_id in raced:
+                        result.update(status="already_member", detail="Usuário já é membro do projeto")
+                self.insert_memberships(project, [(m, r) for m, r in pending_members if m.user_id not in raced])
+
+        for membership, result in pending_members:
+            if result.get("status") is None:
+                result.update(
+                    status="added",
+                    detail=f"{membership.user.username} adicionado como {result['role']} ao projeto {project.name}"
+                )
+        return results
 
-        if ProjectMembership.objects.filter(user=added_user, project=project).exists():
-            return Response({"detail": "Usuário já é membro do projeto"}, status=400)
+    def insert_memberships(self, project, pending_members):
+        if not pending_members:
+            return
+        with transaction.atomic():
+            ProjectMembership.objects.bulk_create([membership for membership, _ in pending_members])
+            counters.members_changed(project.id, len(pending_members))
 
-        ProjectMembership.objects.create(
-            user=added_user,
-            project=project,
-            role=role
-        )
 
-        return Response(
-            {"detail": f"{added_user.username} adicionado como {role} ao projeto {project.name}"},
-            status=200
-        )
-class RemoveMemberView(APIView):
+class ProjectDeletionView(APIView):
+    """
+    Progresso da exclusão de um projeto. Só quem pediu a exclusão consegue ver.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, project_id):
+        deletion = ProjectDeletion.objects.filter(
+            project_id=project_id,
+            requested_by=request.user
+        ).order_by('-created_at').first()
+
+        if not deletion:
+            return Response({"detail": "Nenhuma exclusão encontrada para este projeto."}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response(ProjectDeletionSerializer(deletion).data, status=status.HTTP_200_OK)
+
+class RemoveMemberView(IdempotencyMixin, APIView):
     """
     View personalizada para remover um membro de um projeto.
     Espera um POST com {'user_id': <id_do_usuario>}
@@ -203,7 +695,7 @@ class RemoveMemberView(APIView):
 
     def post(self, request, project_id):
         # 1. Encontra o projeto
-        project = get_object_or_404(Project, id=project_id)
+        project = get_object_or_404(Project.objects.live(), id=project_id)
 
         if project.status == Project.Status.CONCLUDED:
             return Response(
@@ -231,29 +723,31 @@ class RemoveMemberView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # 4. Impede a remoção do owner do projeto (dono real)
         # 4. Impede a remoção do owner do projeto (dono real)
         try:
             target_id_int = int(user_id_to_remove)
         except (TypeError, ValueError):
             return Response({"detail": "'user_id' inválido."}, status=status.HTTP_400_BAD_REQUEST)
 
-        if project.owner and project.owner.id == target_id_int:
+        if project.owner_id == target_id_int:
             return Response(
                 {"detail": "O owner do projeto não pode ser removido."},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # 5. Encontra o usuário que será removido
-        user_to_remove = get_object_or_404(User, id=user_id_to_remove)
+        # 5. Encontra o 'vínculo' (ProjectMembership); o usuário só é
+        # consultado à parte quando não há vínculo (para o 404 certo)
+        membership = ProjectMembership.objects.filter(project=project, user_id=target_id_int).first()
+        if membership is None:
+            get_object_or_404(User, id=target_id_int)
 
-        # 6. Encontra o 'vínculo' (ProjectMembership) e o deleta
+        # 6. Deleta o vínculo
         try:
-            membership = ProjectMembership.objects.get(
-                project=project,
-                user=user_to_remove
-            )
-            membership.delete()
+            if membership is None:
+                raise ProjectMembership.DoesNotExist
+            with transaction.atomic():
+                membership.delete()
+                counters.members_changed(project.id, -1)
             return Response(
                 {"detail": "Membro removido com sucesso."},
                 status=status.HTTP_200_OK
@@ -269,13 +763,14 @@ class RemoveMemberView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-class SprintViewSet(viewsets.ModelViewSet):
+class SprintViewSet(IdempotencyMixin, ArchivedProjectMixin, ValuesListMixin, viewsets.ModelViewSet):
     """
     ViewSet responsável por gerenciar Sprints.
     Permite listar, criar, atualizar e remover sprints de um projeto.
     Somente o Scrum Master (SM) pode criar novas sprints e adicionar itens.
     """
     serializer_class = SprintSerializer
+    archived_rows_key = 'sprints'
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
@@ -286,14 +781,17 @@ class SprintViewSet(viewsets.ModelViewSet):
         if not project_id:
             return Sprint.objects.none()
         
-        project = get_object_or_404(Project, id=project_id)
+        project = self.get_project()
         
         # Verifica se o usuário é membro do projeto
-        if ProjectMembership.objects.filter(user=self.request.user, project=project).exists():
+        if self.get_membership():
             return Sprint.objects.filter(project=project).order_by('-created_at')
         
         return Sprint.objects.none()
 
+    def get_archived_rows(self, graph):
+        return sorted(super().get_archived_rows(graph), key=lambda sprint: sprint.created_at, reverse=True)
+
     def get_serializer_context(self):
         """
         Adiciona o project_id ao contexto do serializer.
@@ -306,19 +804,18 @@ class SprintViewSet(viewsets.ModelViewSet):
         """
         Cria uma nova sprint apenas se o usuário for Scrum Master (SM) do projeto.
         """
-        project_id = self.kwargs.get('project_pk')
-        project = get_object_or_404(Project, id=project_id)
+        project = self.get_project()
         # Agora permitimos que qualquer membro do projeto crie/edite sprints.
-        membership = ProjectMembership.objects.filter(
-            user=self.request.user,
-            project=project
-        ).first()
-
-        if not membership:
+        if not self.get_membership():
             raise PermissionDenied("Apenas membros do projeto podem criar sprints neste projeto.")
 
         serializer.save(project=project, created_by=self.request.user)
 
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            counters.sprint_removed(instance)
+            instance.delete()
+
     @action(detail=False, methods=["get"], url_path="active")
     def active_sprints(self, request, project_pk=None):
         """
@@ -329,7 +826,7 @@ class SprintViewSet(viewsets.ModelViewSet):
         """
         from datetime import date
         
-        project = get_object_or_404(Project, id=project_pk)
+        project = get_object_or_404(Project.objects.live(), id=project_pk)
         
         # Verifica se o usuário é membro do projeto
         if not ProjectMembership.objects.filter(user=request.user, project=project).exists():
@@ -359,8 +856,22 @@ class SprintViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(user_sprints, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @action(detail=True, methods=["get"], url_path="burndown")
+    def burndown(self, request, project_pk=None, pk=None):
+        """
+        Série diária de tarefas por status (burndown), já pré-calculada a
+        partir do histórico de status; não percorre as tarefas da sprint.
+        """
+        sprint = self.get_object()
+        return Response({
+            "sprint": sprint.id,
+            "start_date": sprint.start_date,
+            "end_date": sprint.end_date,
+            "series": burndown_series(sprint),
+        }, status=status.HTTP_200_OK)
+
     @action(detail=True, methods=["post"], url_path="add-items")
-    def add_items(self, request, pk=None):
+    def add_items(self, request, project_pk=None, pk=None):
         """
         Adiciona itens do Product Backlog ao Sprint Backlog.
         Apenas o Scrum Master do projeto pode executar essa ação.
@@ -370,11 +881,10 @@ class SprintViewSet(viewsets.ModelViewSet):
             "items": [1, 2, 3]
         }
         """
-        sprint = get_object_or_404(Sprint, pk=pk)
-        project = sprint.project
+        sprint = get_object_or_404(Sprint.objects.only('id', 'project_id'), pk=pk)
 
         # Verifica se o usuário é Scrum Master do projeto
-        if not ProjectMembership.objects.filter(user=request.user, project=project, role="SM").exists():
+        if not ProjectMembership.objects.filter(user=request.user, project_id=sprint.project_id, role="SM").exists():
             return Response(
                 {"detail": "Apenas o Scrum Master pode adicionar itens à sprint."},
                 status=status.HTTP_403_FORBIDDEN
@@ -390,18 +900,21 @@ class SprintViewSet(viewsets.ModelViewSet):
         # Seleciona apenas itens válidos (pertencentes ao projeto e sem sprint associada)
         backlog_items = ProductBacklogItem.objects.filter(
             id__in=items,
-            project=project,
+            project_id=sprint.project_id,
             sprint__isnull=True
         )
 
-        if not backlog_items.exists():
+        # o próprio UPDATE diz quantos itens eram válidos
+        with transaction.atomic():
+            count = backlog_items.update(sprint=sprint)
+            counters.item_moved(None, sprint.id, count)
+
+        if not count:
             return Response(
                 {"detail": "Nenhum item válido encontrado para adicionar."},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        count = backlog_items.update(sprint=sprint)
-
         return Response(
             {"detail": f"{count} item(s) adicionados ao Sprint Backlog com sucesso."},
             status=status.HTTP_200_OK
@@ -418,13 +931,9 @@ class SprintViewSet(viewsets.ModelViewSet):
         from datetime import date
         
         sprint = self.get_object()
-        project = sprint.project
 
         # Verifica se o usuário é membro do projeto
-        membership = ProjectMembership.objects.filter(
-            user=request.user,
-            project=project
-        ).first()
+        membership = self.get_membership()
 
         if not membership:
             return Response(
@@ -449,12 +958,17 @@ class SprintViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Remove a associação dos itens de backlog com a sprint
-        ProductBacklogItem.objects.filter(sprint=sprint).update(sprint=None)
-        
-        # Marca a sprint como concluída
-        sprint.status = 'COMPLETED'
-        sprint.save()
+        with transaction.atomic():
+            # Guarda o que foi entregue antes de desfazer a associação
+            capture_sprint_snapshot(sprint)
+
+            # Remove a associação dos itens de backlog com a sprint
+            count = ProductBacklogItem.objects.filter(sprint=sprint).update(sprint=None)
+            counters.item_moved(sprint.id, None, count)
+
+            # Marca a sprint como concluída
+            sprint.status = 'COMPLETED'
+            sprint.save()
 
         return Response(
             {"detail": f"Sprint '{sprint.name}' encerrada com sucesso."},
@@ -462,30 +976,37 @@ class SprintViewSet(viewsets.ModelViewSet):
         )
 
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(IdempotencyMixin, ArchivedProjectMixin, ValuesListMixin, viewsets.ModelViewSet):
     """
     ViewSet responsável por gerenciar Tasks (Tarefas) dentro de uma Sprint.
     Apenas desenvolvedores (DEV) podem criar tarefas.
     """
     serializer_class = TaskSerializer
+    archived_rows_key = 'tasks'
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         """
-        Retorna apenas as tarefas da sprint específica.
+        Retorna apenas as tarefas da sprint específica. A checagem de membro
+        vai no mesmo SELECT das tarefas (via Task.project), sem carregar a
+        sprint e o projeto antes.
         """
         sprint_id = self.kwargs.get('sprint_pk')
         if not sprint_id:
             return Task.objects.none()
-        
-        sprint = get_object_or_404(Sprint, id=sprint_id)
-        project = sprint.project
-        
-        # Verifica se o usuário é membro do projeto
-        if ProjectMembership.objects.filter(user=self.request.user, project=project).exists():
-            return Task.objects.filter(sprint=sprint).order_by('-created_at')
-        
-        return Task.objects.none()
+
+        return Task.objects.filter(
+            sprint_id=sprint_id,
+            project_id=self.kwargs.get('project_pk'),
+            project__members=self.request.user,
+        ).select_related(
+            'assigned_to', 'created_by', 'backlog_item__created_by', 'backlog_item__user_story__created_by'
+        ).order_by('-created_at')
+
+    def get_archived_rows(self, graph):
+        sprint_id = str(self.kwargs.get('sprint_pk'))
+        tasks = [task for task in super().get_archived_rows(graph) if str(task.sprint_id) == sprint_id]
+        return sorted(tasks, key=lambda task: task.created_at, reverse=True)
 
     def get_serializer_context(self):
         """
@@ -500,51 +1021,149 @@ class TaskViewSet(viewsets.ModelViewSet):
         """
         Cria uma nova tarefa apenas se o usuário for um Desenvolvedor (DEV).
         """
-        sprint_id = self.kwargs.get('sprint_pk')
-        sprint = get_object_or_404(Sprint, id=sprint_id)
-        project = sprint.project
-        
-        # Verifica se o usuário é desenvolvedor do projeto
-        membership = ProjectMembership.objects.filter(
-            user=self.request.user,
-            project=project,
-            role='DEV'
-        ).first()
+        # a sprint já foi carregada (só id e projeto) na validação do serializer
+        sprint = serializer.validated_data['sprint']
+        if str(sprint.project_id) != str(self.kwargs.get('project_pk')):
+            raise Http404
 
-        if not membership:
+        # Verifica se o usuário é desenvolvedor do projeto
+        membership = self.get_membership()
+        if not membership or membership.role != 'DEV':
             raise PermissionDenied("Apenas desenvolvedores podem criar tarefas.")
 
-        serializer.save()
+        with transaction.atomic():
+            task = serializer.save()
+            record_transitions([transition(task, task.project_id, None, task.status, self.request.user)])
 
     def perform_update(self, serializer):
         """
-        Permite que qualquer membro do projeto edite a tarefa.
+        Permite que qualquer membro do projeto edite a tarefa (o get_queryset
+        só encontra a tarefa se o usuário for membro).
         """
-        task = self.get_object()
-        project = task.sprint.project
-        
-        if not ProjectMembership.objects.filter(user=self.request.user, project=project).exists():
-            raise PermissionDenied("Você não é membro deste projeto.")
-        
-        serializer.save()
+        old_status = serializer.instance.status
+        with transaction.atomic():
+            task = serializer.save()
+            record_transitions([transition(task, task.project_id, old_status, task.status, self.request.user)])
 
     def perform_destroy(self, instance):
         """
         Permite que apenas desenvolvedores excluam tarefas.
         """
-        project = instance.sprint.project
-        membership = ProjectMembership.objects.filter(
-            user=self.request.user,
-            project=project,
-            role='DEV'
-        ).first()
-
-        if not membership:
+        membership = self.get_membership()
+        if not membership or membership.role != 'DEV':
             raise PermissionDenied("Apenas desenvolvedores podem excluir tarefas.")
-        
-        instance.delete()
+
+        with transaction.atomic():
+            record_transitions([transition(instance, instance.project_id, instance.status, None, self.request.user)])
+            instance.delete()
+
+
+def _encode_cursor(created_at, pk):
+    return urlsafe_b64encode(f"{created_at.isoformat()}|{pk}".encode()).decode()
 
 
+def _decode_cursor(cursor):
+    created_at, pk = urlsafe_b64decode(cursor.encode()).decode().split("|")
+    return datetime.fromisoformat(created_at), int(pk)
+
+
+def my_tasks_queryset(user, statuses, after=None):
+    """
+    Página de "minhas tarefas" em (-created_at, -id), lida já na ordem do
+    índice (assigned_to, created_at, id): status vira filtro sobre as linhas
+    lidas, sem ordenar num B-tree temporário todas as tarefas do usuário.
+    """
+    tasks = Task.objects.filter(assigned_to=user).exclude(project__status=Project.Status.DELETING)
+    if statuses:
+        tasks = tasks.filter(status__in=statuses)
+    if after:
+        created_at, pk = after
+        tasks = tasks.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    return tasks.order_by('-created_at', '-id').values(
+        'id', 'description', 'status', 'created_at',
+        'backlog_item_id', 'sprint_id', 'project_id',
+        sprint_name=F('sprint__name'),
+        project_name=F('project__name'),
+        backlog_item_title=F('backlog_item__title'),
+    )
+
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+def my_tasks_view(request):
+    """
+    Tarefas atribuídas ao usuário em todos os projetos, numa única consulta
+    (com sprint e projeto já no join). Paginação por cursor (created_at, id):
+    ?status=TODO,IN_PROGRESS&limit=50&cursor=<next_cursor da página anterior>
+    """
+    statuses = [s for s in request.query_params.get("status", "").upper().split(",") if s]
+    valid = {choice for choice, _ in Task.STATUS_CHOICES}
+    if any(s not in valid for s in statuses):
+        return Response({"detail": "Status inválido. Use TODO, IN_PROGRESS ou DONE."}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        limit = max(1, min(int(request.query_params.get("limit", MY_TASKS_DEFAULT_LIMIT)), MY_TASKS_MAX_LIMIT))
+    except ValueError:
+        return Response({"detail": "'limit' deve ser um número inteiro."}, status=status.HTTP_400_BAD_REQUEST)
+
+    after = None
+    cursor = request.query_params.get("cursor")
+    if cursor:
+        try:
+            after = _decode_cursor(cursor)
+        except (ValueError, UnicodeDecodeError):
+            return Response({"detail": "Cursor inválido."}, status=status.HTTP_400_BAD_REQUEST)
+
+    rows = list(my_tasks_queryset(request.user, statuses, after)[:limit + 1])
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1]['created_at'], rows[-1]['id'])
+
+    return Response({"results": rows, "next_cursor": next_cursor}, status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAdminUser])
+def fragment_cache_stats_view(request):
+    """
+    Acertos/faltas do cache de fragmentos das listagens. O cache é por
+    processo: os números são do processo que atendeu a requisição.
+    """
+    return Response(fragment_cache.stats(), status=status.HTTP_200_OK)
+
+
+@idempotent()
+@api_view(["POST"])
+@permission_classes([permissions.IsAdminUser])
+def provision_users_view(request):
+    """
+    Cria usuários em massa a partir de um CSV/NDJSON no campo multipart 'file'
+    (colunas username, email, password ou password_hash...). Apenas administradores.
+    As senhas em texto são hasheadas aqui mesmo, uma a uma.
+    Responde com o resumo e os erros por linha.
+    """
+    upload = request.FILES.get("file")
+    if not upload:
+        return Response({"detail": "Envie o arquivo no campo 'file'."}, status=status.HTTP_400_BAD_REQUEST)
+
+    errors = []
+
+    def on_error(row, message):
+        if len(errors) < IMPORT_MAX_REPORTED_ERRORS:
+            errors.append({"row": row, "error": message})
+
+    # sem pool de processos dentro da requisição; arquivos grandes vão pelo
+    # comando provision_users (que hasheia em paralelo) ou com password_hash
+    provisioner = UserProvisioner(workers=0, on_error=on_error)
+    fmt = detect_format(upload.name, request.data.get("format"))
+    result = provisioner.run(iter_records(upload, fmt))
+
+    return Response({**result.as_dict(), "errors": errors}, status=status.HTTP_200_OK)
+
+
+@idempotent(anonymous=True)
 @api_view(["POST"])
 @permission_classes([permissions.AllowAny])
 def register_view(request):
@@ -553,13 +1172,13 @@ def register_view(request):
     
     if User.objects.filter(username=username).exists():
         return Response({"detail": "Username já está em uso"}, status=400)
-    if User.objects.filter(email=email).exists():
+    if email and User.objects.with_emails([email]).exists():
         return Response({"detail": "Email já está em uso"}, status=400)
 
     serializer = RegisterSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.save()
-        refresh = RefreshToken.for_user(user)
+        refresh = ClaimsRefreshToken.for_user(user)
         return Response({
             "user": UserSerializer(user).data,
             "access": str(refresh.access_token),
@@ -567,23 +1186,52 @@ def register_view(request):
         }, status=201)
     return Response(serializer.errors, status=400)
 
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+def user_search_view(request):
+    """
+    Typeahead do seletor de membros: ?q= é prefixo do username ou do email,
+    sem diferenciar maiúsculas. Devolve só id, username e email, até ?limit=.
+    """
+    term = request.query_params.get("q", "").strip()
+    try:
+        limit = int(request.query_params.get("limit", USER_SEARCH_DEFAULT_LIMIT))
+    except ValueError:
+        return Response({"detail": "'limit' deve ser um número inteiro."}, status=status.HTTP_400_BAD_REQUEST)
+    limit = max(1, min(limit, USER_SEARCH_MAX_LIMIT))
+
+    if len(term) < USER_SEARCH_MIN_LENGTH:
+        return Response([], status=status.HTTP_200_OK)
+    return Response(User.objects.prefix_search(term, limit), status=status.HTTP_200_OK)
+
+
+@idempotent()
+@api_view(["POST"])
+@permission_classes([permissions.IsAuthenticated])
+def revoke_tokens_view(request):
+    """Sai de todos os dispositivos: todos os tokens emitidos até agora deixam de valer."""
+    revoke_tokens(request.user)
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 @api_view(["GET", "PATCH"])
 @permission_classes([permissions.IsAuthenticated])
 def me_view(request):
-    user = request.user
-    
-    # GET: Retorna os dados do usuário
+    # GET: Retorna os dados do usuário (o request.user das leituras só tem os
+    # campos do token; a linha completa vem do cache de usuários)
     if request.method == "GET":
-        serializer = UserSerializer(user)
+        serializer = UserSerializer(user_cache.get(request.user.pk))
         return Response(serializer.data, status=status.HTTP_200_OK)
     
-    # PATCH: Atualiza os dados do usuário
+    # PATCH: Atualiza os dados do usuário. Nas escritas o request.user é uma
+    # cópia do cache (até AUTH_USER_CACHE_TIMEOUT de idade): a linha vem do banco
     elif request.method == "PATCH":
-        serializer = UserSerializer(user, data=request.data, partial=True)
+        serializer = UserSerializer(User.objects.get(pk=request.user.pk), data=request.data, partial=True)
         
         # Valida e salva as alterações
         if serializer.is_valid():
             user = serializer.save()
+            user_cache.set(user)
             return Response(UserSerializer(user).data, status=status.HTTP_200_OK)
         
         # Se os dados forem inválidos, retorna os erros
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark da listagem de projetos (visibilidade por dono ou membro).
+
+Cria um banco de teste descartável (nunca toca no db.sqlite3), popula com
+projetos e memberships aleatórios e compara a consulta antiga (JOIN + DISTINCT)
+com EXISTS correlacionado e Project.objects.visible_to(). Rodar a partir de backend/:
+
+    python scripts/bench_project_listing.py --projects 10000 --memberships 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "ucpm_backend.settings")
+
+import django
+
+django.setup()
+
+from django.db import connection
+from django.db.models import Exists, OuterRef, Q
+from django.test.utils import setup_test_environment
+
+from api.models import Project, ProjectMembership, User
+
+
+def populate(n_users, n_projects, n_memberships, heavy_users, seed):
+    rng = random.Random(seed)
+    User.objects.bulk_create([User(username=f"u{i}", email=f"u{i}@example.com") for i in range(n_users)], batch_size=2000)
+    user_ids = list(User.objects.values_list("id", flat=True))
+
+    Project.objects.bulk_create(
+        [Project(name=f"p{i}", owner_id=rng.choice(user_ids)) for i in range(n_projects)], batch_size=2000
+    )
+    project_ids = list(Project.objects.values_list("id", flat=True))
+
+    # alguns usuários participam de muitos projetos: é o caso que o DISTINCT sofre
+    pairs = set()
+    for user_id in user_ids[:heavy_users]:
+        for project_id in rng.sample(project_ids, min(len(project_ids), n_memberships // (heavy_users * 10))):
+            pairs.add((user_id, project_id))
+    while len(pairs) < n_memberships:
+        pairs.add((rng.choice(user_ids), rng.choice(project_ids)))
+    ProjectMembership.objects.bulk_create(
+        [ProjectMembership(user_id=u, project_id=p, role="DEV") for u, p in pairs], batch_size=5000
+    )
+    return User.objects.filter(id__in=user_ids[:heavy_users]), User.objects.filter(id__in=user_ids[-heavy_users:])
+
+
+def timed(queryset, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = len(list(queryset.all()))
+        best = min(best, time.perf_counter() - start)
+    return best, rows
+
+
+def explain(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--projects", type=int, default=10000)
+    parser.add_argument("--memberships", type=int, default=100000)
+    parser.add_argument("--heavy-users", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        start = time.perf_counter()
+        heavy, light = populate(args.users, args.projects, args.memberships, args.heavy_users, args.seed)
+        print(f"dados: {args.projects} projetos, {args.memberships} memberships ({time.perf_counter() - start:.1f}s)")
+
+        queries = {
+            "JOIN + DISTINCT": lambda user: Project.objects.live().filter(Q(owner=user) | Q(members=user)).distinct(),
+            "EXISTS correlacionado": lambda user: Project.objects.live().filter(
+                Q(owner=user) | Exists(ProjectMembership.objects.filter(project=OuterRef("pk"), user=user))
+            ),
+            "visible_to (IN)": lambda user: Project.objects.live().visible_to(user),
+        }
+        for label, users in (("usuários com muitos projetos", heavy), ("usuários comuns", light)):
+            print(f"\n{label}:")
+            for name, build in queries.items():
+                total = 0.0
+                for user in users:
+                    elapsed, rows = timed(build(user), args.repeat)
+                    total += elapsed
+                print(f"  {name:<22} {1000 * total / len(users):8.2f} ms/consulta ({rows} projetos no último)")
+
+        user = heavy.first()
+        for name, build in queries.items():
+            print(f"\nplano - {name}:")
+            for line in explain(build(user)):
+                print(f"  {line}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
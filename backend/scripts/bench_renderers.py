@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark de serialização das maiores listagens: tempo de codificação e de
+decodificação (JSON do DRF x orjson x MessagePack) e bytes trafegados (sem
+compressão, gzip e brotli, com os níveis configurados no settings).
+
+Cria um banco de teste descartável (nunca toca no db.sqlite3) com um projeto
+grande e pega o response.data de cada endpoint uma vez; só a etapa de render e
+de compressão é cronometrada. Rodar a partir de backend/:
+
+    python scripts/bench_renderers.py --stories 500 --items 5000 --tasks 20000
+"""
+import argparse
+import gzip
+import io
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "ucpm_backend.settings")
+
+import django
+
+django.setup()
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import setup_test_environment
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from api.middleware import brotli
+from api.models import ProductBacklogItem, Project, ProjectMembership, Sprint, Task, User, UserStory
+from api.parsers import MessagePackParser, ORJSONParser
+from api.renderers import MessagePackRenderer, ORJSONRenderer
+
+
+def populate(n_stories, n_items, n_tasks, seed):
+    rng = random.Random(seed)
+    user = User.objects.create_user(username="bench", email="bench@example.com")
+    project = Project.objects.create(name="Projeto benchmark", owner=user)
+    ProjectMembership.objects.create(user=user, project=project, role="DEV")
+    sprint = Sprint.objects.create(project=project, name="Sprint 1", start_date="2025-01-06", end_date="2025-01-17")
+
+    UserStory.objects.bulk_create([
+        UserStory(project=project, title=f"História {i}", description="Como usuário, quero algo. " * 4, created_by=user)
+        for i in range(n_stories)
+    ], batch_size=2000)
+    story_ids = list(UserStory.objects.filter(project=project).values_list("id", flat=True))
+
+    ProductBacklogItem.objects.bulk_create([
+        ProductBacklogItem(
+            project=project, user_story_id=rng.choice(story_ids), title=f"Item {i}",
+            description="Detalhes do item. " * 6, priority=rng.choice(["LOW", "MEDIUM", "HIGH"]),
+            sprint=sprint if i % 4 == 0 else None, created_by=user,
+        )
+        for i in range(n_items)
+    ], batch_size=2000)
+    item_ids = list(ProductBacklogItem.objects.filter(project=project).values_list("id", flat=True))
+
+    Task.objects.bulk_create([
+        Task(
+            sprint=sprint, project=project, backlog_item_id=rng.choice(item_ids), description=f"Tarefa {i}",
+            status=rng.choice(["TODO", "IN_PROGRESS", "DONE"]), assigned_to=user, created_by=user,
+        )
+        for i in range(n_tasks)
+    ], batch_size=2000)
+    return user, project, sprint
+
+
+def best_of(repeat, func):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stories", type=int, default=500)
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--tasks", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        start = time.perf_counter()
+        user, project, sprint = populate(args.stories, args.items, args.tasks, args.seed)
+        print(f"dados: {args.stories} histórias, {args.items} itens, {args.tasks} tarefas ({time.perf_counter() - start:.1f}s)")
+
+        client = APIClient()
+        client.force_authenticate(user=user)
+        endpoints = {
+            "histórias": reverse("project-user-stories-list", args=[project.id]),
+            "backlog": reverse("project-backlog-list", args=[project.id]),
+            "tarefas da sprint": reverse("sprint-tasks-list", args=[project.id, sprint.id]),
+            "minhas tarefas": reverse("my-tasks"),
+        }
+        formats = {
+            "JSON (DRF)": (JSONRenderer(), json.loads),
+            "JSON (orjson)": (ORJSONRenderer(), lambda body: ORJSONParser().parse(io.BytesIO(body))),
+            "MessagePack": (MessagePackRenderer(), lambda body: MessagePackParser().parse(io.BytesIO(body))),
+        }
+
+        for name, url in endpoints.items():
+            data = client.get(url).data
+            print(f"\n{name} ({url}):")
+            print(f"  {'formato':<16} {'encode':>10} {'decode':>10} {'bytes':>10} {'gzip':>10} {'brotli':>10}")
+            for label, (renderer, decode) in formats.items():
+                encode_time, body = best_of(args.repeat, lambda: renderer.render(data))
+                decode_time, _ = best_of(args.repeat, lambda: decode(body))
+                gzipped = len(gzip.compress(body, compresslevel=settings.RESPONSE_GZIP_LEVEL))
+                brotlied = len(brotli.compress(body, quality=settings.RESPONSE_BROTLI_QUALITY)) if brotli else "-"
+                print(
+                    f"  {label:<16} {1000 * encode_time:7.2f} ms {1000 * decode_time:7.2f} ms"
+                    f" {len(body):>10} {gzipped:>10} {brotlied:>10}"
+                )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
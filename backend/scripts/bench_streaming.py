@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark da listagem de tarefas com e sem ?stream=1: tempo até o primeiro
+lote de linhas, tempo total e pico de memória Python (tracemalloc) para
+consumir a resposta inteira.
+
+Usa um banco de teste descartável (nunca toca no db.sqlite3) populado como em
+bench_renderers.py. Rodar a partir de backend/:
+
+    python scripts/bench_streaming.py --tasks 50000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "ucpm_backend.settings")
+
+import django
+
+django.setup()
+
+from django.db import connection
+from django.test.utils import setup_test_environment
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from bench_renderers import populate
+
+
+def consume(client, url, params):
+    """(segundos até o primeiro lote, segundos no total, bytes, pico de memória)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    response = client.get(url, params)
+    first = None
+    size = 0
+    if response.streaming:
+        for chunk in response.streaming_content:
+            if first is None and chunk != b"[":
+                first = time.perf_counter() - start
+            size += len(chunk)
+    else:
+        first = time.perf_counter() - start
+        size = len(response.content)
+    total = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first, total, size, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stories", type=int, default=200)
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--tasks", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        user, project, sprint = populate(args.stories, args.items, args.tasks, args.seed)
+        client = APIClient()
+        client.force_authenticate(user=user)
+        url = reverse("sprint-tasks-list", args=[project.id, sprint.id])
+
+        print(f"{args.tasks} tarefas ({url})")
+        for label, params in (("lista completa", {}), ("?stream=1", {"stream": "1"})):
+            first, total, size, peak = consume(client, url, params)
+            print(
+                f"  {label:<16} primeiro lote {1000 * first:8.1f} ms  total {1000 * total:8.1f} ms"
+                f"  {size / 2 ** 20:7.1f} MiB  pico {peak / 2 ** 20:7.1f} MiB"
+            )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark do typeahead de usuários (/api/users/search/).
+
+Cria um banco de teste descartável (nunca toca no db.sqlite3), popula com
+usuários e compara um icontains/istartswith (varre a tabela) com
+User.objects.prefix_search() (faixas nos índices de lower(username) e
+lower(email)). Rodar a partir de backend/:
+
+    python scripts/bench_user_search.py --users 300000
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "ucpm_backend.settings")
+
+import django
+
+django.setup()
+
+from django.db import connection
+from django.db.models import Q
+from django.test.utils import setup_test_environment
+
+from api.models import User
+
+
+def populate(n_users, seed):
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < n_users:
+        names.add("".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 10))))
+    names = sorted(names)
+    User.objects.bulk_create(
+        [User(username=name.capitalize(), email=f"{name}@Example.com") for name in names], batch_size=5000
+    )
+    return names
+
+
+def best_of(run, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = len(run())
+        best = min(best, time.perf_counter() - start)
+    return best, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=300000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--terms", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        start = time.perf_counter()
+        names = populate(args.users, args.seed)
+        print(f"dados: {args.users} usuários ({time.perf_counter() - start:.1f}s)")
+
+        rng = random.Random(args.seed)
+        terms = [name[:rng.randint(2, 4)].upper() for name in rng.sample(names, args.terms)]
+        searches = {
+            "istartswith (OR)": lambda term: list(
+                User.objects.filter(Q(username__istartswith=term) | Q(email__istartswith=term), is_active=True)
+                .order_by("username").values("id", "username", "email")[:args.limit]
+            ),
+            "prefix_search": lambda term: User.objects.prefix_search(term, args.limit),
+        }
+        for name, run in searches.items():
+            total = 0.0
+            for term in terms:
+                elapsed, rows = best_of(lambda: run(term), args.repeat)
+                total += elapsed
+            print(f"  {name:<18} {1000 * total / len(terms):8.2f} ms/busca ({rows} no último)")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+from datetime import timedelta
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -47,6 +48,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -59,13 +61,77 @@ MIDDLEWARE = [
 CORS_ALLOW_ALL_ORIGINS = True
 
 REST_FRAMEWORK = {
+    # JWT confiando nos claims assinados: leituras não consultam o usuário
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "api.authentication.ClaimsJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
     ),
+    # JSON com orjson (mesma saída do JSONRenderer, bem mais rápido em listas grandes);
+    # clientes de automação podem pedir application/msgpack no Accept/Content-Type
+    "DEFAULT_RENDERER_CLASSES": (
+        "api.renderers.ORJSONRenderer",
+        "api.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "api.parsers.ORJSONParser",
+        "api.parsers.MessagePackParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
+}
+
+SIMPLE_JWT = {
+    # Leituras confiam nos claims do access (api/authentication.py): em outros
+    # processos, um token revogado ou usuário desativado só para de ler quando o access expira
+    "ACCESS_TOKEN_LIFETIME": timedelta(minutes=5),
+    "TOKEN_OBTAIN_SERIALIZER": "api.authentication.ClaimsTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "api.authentication.ClaimsTokenRefreshSerializer",
+}
+
+# Usuários completos em cache por processo (escritas e /api/users/me/), em segundos.
+# Também é o atraso máximo para um token revogado parar de escrever em outro processo.
+AUTH_USER_CACHE_TIMEOUT = 60
+AUTH_USER_CACHE_MAX_ENTRIES = 10000
+# Mapa {projeto: papel} dentro do token (para o front; a API confere no banco)
+JWT_PROJECT_ROLES_CLAIM = False
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Respostas guardadas por Idempotency-Key (api/idempotency.py), por 24h.
+    # Com vários processos/servidores, apontar para um cache compartilhado (Redis, Memcached).
+    "idempotency": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "idempotency",
+        "TIMEOUT": 60 * 60 * 24,
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
 }
+IDEMPOTENCY_CACHE = "idempotency"
+
+# Provisionamento em massa (api/provisioning.py): processos que hasheiam as
+# senhas em paralelo; None usa um por CPU, 0 hasheia no próprio processo
+USER_PROVISION_HASH_WORKERS = None
+
+# Compressão das respostas (api.middleware.CompressionMiddleware): brotli ou gzip
+# conforme o Accept-Encoding, só a partir de RESPONSE_COMPRESSION_MIN_LENGTH bytes.
+RESPONSE_COMPRESSION_MIN_LENGTH = 1024
+RESPONSE_GZIP_LEVEL = 6
+RESPONSE_BROTLI_QUALITY = 5
+
+# Listagens com ?stream=1: linhas por lote lido do cursor e enviado ao cliente
+LIST_STREAM_CHUNK_SIZE = 1000
+
+# Fragmentos serializados de histórias e itens (api/fragments.py), por processo; 0 desliga
+FRAGMENT_CACHE_MAX_ENTRIES = 50000
+
+# Exclusão de projetos: as linhas são apagadas em lotes por uma thread em segundo plano.
+# Desligando, a fila fica para o comando `python manage.py purge_deleted_projects`.
+PROJECT_PURGE_IN_BACKGROUND = True
+PROJECT_PURGE_BATCH_SIZE = 500
 
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",  
@@ -161,8 +227,14 @@ INSTALLED_APPS: Apps padrões: admin, auth, sessions…
     api: o literalmente tudo de models, views e serializers
 
 REST_FRAMEWORK: Define autenticação e permissões globais
-    JWTAuthentication - todas as rotas protegidas vão aceitar tokens JWT
+    ClaimsJWTAuthentication - todas as rotas protegidas vão aceitar tokens JWT
+        (ver api/authentication.py: o usuário vem dos claims, sem consulta nas leituras)
     IsAuthenticated - por padrão, só usuários logados podem acessar as rotas
+    ORJSONRenderer/ORJSONParser - JSON com orjson em vez do json da biblioteca padrão
+    MessagePackRenderer/MessagePackParser - application/msgpack como alternativa ao JSON
+
+CACHES: "idempotency" guarda as respostas dos POSTs com Idempotency-Key
+    (retentativas do app recebem a mesma resposta em vez de duplicar registros)
 
 ROOT_URLCONF = 'ucpm_backend.urls'
 ROOT_URLCONF - aponta pro arquivo urls.py, que define todas as rotas
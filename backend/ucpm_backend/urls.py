@@ -3,9 +3,10 @@ from django.urls import path, include
 from rest_framework import routers
 from rest_framework_nested import routers as nested_routers
 from api.views import (
-    ProjectViewSet, AddMemberView, register_view, me_view,
+    ProjectViewSet, AddMemberView, register_view, me_view, my_tasks_view, fragment_cache_stats_view,
+    revoke_tokens_view, provision_users_view, user_search_view,
     UserStoryViewSet, ProductBacklogItemViewSet,
-    RemoveMemberView, SprintViewSet, TaskViewSet
+    RemoveMemberView, SprintViewSet, TaskViewSet, ProjectDeletionView
 )
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
@@ -28,12 +29,18 @@ urlpatterns = [
     path('api/auth/register/', register_view, name='register'),
     path('api/auth/login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/auth/revoke/', revoke_tokens_view, name='token_revoke'),
     path('api/users/me/', me_view, name='me'),
+    path('api/users/me/tasks/', my_tasks_view, name='my-tasks'),
+    path('api/users/provision/', provision_users_view, name='provision-users'),
+    path('api/users/search/', user_search_view, name='user-search'),
     path('api/', include(router.urls)),
     path('api/', include(projects_router.urls)),
     path('api/', include(sprints_router.urls)),
     path("api/projects/<int:project_id>/add_member/", AddMemberView.as_view(), name="add-member"),
-    path("api/projects/<int:project_id>/remove_member/", RemoveMemberView.as_view(), name="remove-member")
+    path("api/projects/<int:project_id>/remove_member/", RemoveMemberView.as_view(), name="remove-member"),
+    path("api/projects/<int:project_id>/deletion/", ProjectDeletionView.as_view(), name="project-deletion"),
+    path('api/metrics/fragment-cache/', fragment_cache_stats_view, name='fragment-cache-stats'),
 ]
 
 